@@ -6,11 +6,14 @@ from config import config
 from app.extensions import cors, db_service # Import only necessary instances
 from app.tasks import start_background_tasks
 from app.errors import register_error_handlers
+from app.uploads import StreamingUploadRequest
 
 def create_app(config_object=config):
     """Factory to create and configure the Flask application."""
     app = Flask(__name__)
     app.config.from_object(config_object)
+    # Stream uploaded files to disk with an incremental checksum
+    app.request_class = StreamingUploadRequest
 
     # Initialize extensions
     cors.init_app(app) # Configure specific origins in config if needed
@@ -23,6 +26,7 @@ def create_app(config_object=config):
     from app.routes.calls import calls_bp
     from app.routes.categories import categories_bp
     from app.routes.daily_summary import summary_bp
+    from app.routes.processing import processing_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(users_bp)
@@ -31,6 +35,7 @@ def create_app(config_object=config):
     app.register_blueprint(calls_bp)
     app.register_blueprint(categories_bp)
     app.register_blueprint(summary_bp)
+    app.register_blueprint(processing_bp)
 
     # Register error handlers
     register_error_handlers(app)
@@ -45,8 +50,11 @@ def create_app(config_object=config):
     app.logger.info(f"Debug mode: {app.debug}")
 
     # App context needed for tasks that might access app config/logger indirectly
-    with app.app_context():
-        start_background_tasks()
-        app.logger.info("Background tasks started.")
+    if app.config['RUN_ANALYSIS_WORKERS']:
+        with app.app_context():
+            start_background_tasks()
+            app.logger.info("Background tasks started.")
+    else:
+        app.logger.info("Analysis workers disabled in this process; jobs are processed by worker.py.")
 
     return app
\ No newline at end of file
@@ -0,0 +1,207 @@
+import asyncio
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from asgiref.sync import async_to_sync, sync_to_async
+from flask import Flask, request
+from werkzeug.exceptions import ClientDisconnected, RequestEntityTooLarge
+
+from app.extensions import db_service, async_db
+from app.tasks import stop_background_tasks
+
+logger = logging.getLogger(__name__)
+
+# Read buffer of the request body stream handed to the WSGI app
+REQUEST_BODY_BUFFER_BYTES = 64 * 1024
+
+
+class RequestBodyStream(io.RawIOBase):
+    """
+    The body of an ASGI request as a blocking WSGI input stream. Chunks are pulled from the
+    server's `receive` (wrapped with async_to_sync) only when the app reads, so an upload is
+    streamed straight to its destination and a body over max_length is refused with a 413
+    without receiving the rest of it. It can only be read on the request's pool thread.
+    """
+
+    def __init__(self, receive, max_length: Optional[int] = None):
+        self._receive = receive
+        self.max_length = max_length
+        self.bytes_received = 0
+        self._chunk = memoryview(b"")
+        self._more_body = True
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._chunk and self._more_body:
+            self._chunk = memoryview(self._receive_body())
+        # A body that reached the limit has to end there: werkzeug stops reading at MAX_CONTENT_LENGTH,
+        # so without this check a longer chunked body would reach the app truncated instead of refused
+        while self._more_body and self.max_length is not None and self.bytes_received >= self.max_length:
+            self._receive_body()
+        n = min(len(buffer), len(self._chunk))
+        buffer[:n] = self._chunk[:n]
+        self._chunk = self._chunk[n:]
+        return n
+
+    def _receive_body(self) -> bytes:
+        message = self._receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnected()
+        body = message.get("body", b"")
+        self._more_body = message.get("more_body", False)
+        self.bytes_received += len(body)
+        if self.max_length is not None and self.bytes_received > self.max_length:
+            self._more_body = False
+            raise RequestEntityTooLarge()
+        return body
+
+
+class FlaskAsgiApp:
+    """
+    Serves the Flask app to an ASGI server (uvicorn) and handles its lifespan events.
+
+    Each request runs the WSGI app on a bounded thread pool; the async views it dispatches to
+    are scheduled on the server's event loop (asgiref hands them to the running loop), so their
+    database and network awaits overlap instead of each getting a private loop. asgiref's own
+    WsgiToAsgi would run every request on one shared thread (thread_sensitive=True).
+    Since async views can't block the loop on the request body, it is read before the view runs:
+    form uploads are parsed into their destination files, other bodies are cached.
+    On shutdown the analysis workers of this process (if it runs any) are drained before the
+    database closes.
+    """
+
+    def __init__(self, flask_app: Flask, threads: int, shutdown_drain_seconds: float):
+        self.flask_app = flask_app
+        self.shutdown_drain_seconds = shutdown_drain_seconds
+        self._executor = ThreadPoolExecutor(max(1, threads), thread_name_prefix="asgi")
+        flask_app.before_request(self._read_request_body)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type '{scope['type']}'")
+        run_wsgi_app = sync_to_async(self._run_wsgi_app, thread_sensitive=False, executor=self._executor)
+        await run_wsgi_app(scope, async_to_sync(receive), async_to_sync(send))
+
+    @staticmethod
+    def _read_request_body():
+        """Reads the request body on the pool thread (before_request hooks run there, async views don't)."""
+        if request.mimetype in ("multipart/form-data", "application/x-www-form-urlencoded"):
+            request.form
+        else:
+            request.get_data()
+
+    @staticmethod
+    def _build_environ(scope, body) -> dict:
+        """The WSGI environ of an HTTP request scope (PEP 3333: str values are latin-1 decoded bytes)."""
+        script_name = scope.get("root_path", "").encode("utf8").decode("latin1")
+        path_info = scope["path"].encode("utf8").decode("latin1")
+        if path_info.startswith(script_name):
+            path_info = path_info[len(script_name):]
+        server_name, server_port = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": script_name,
+            "PATH_INFO": path_info,
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+            "SERVER_NAME": server_name,
+            "SERVER_PORT": str(server_port),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            # The stream ends with the last body message, so it can be read without a Content-Length
+            # (chunked uploads)
+            "wsgi.input_terminated": True,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        if scope.get("client"):
+            environ["REMOTE_ADDR"] = scope["client"][0]
+            environ["REMOTE_PORT"] = str(scope["client"][1])
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin1")
+            if name == "content-length":
+                key = "CONTENT_LENGTH"
+            elif name == "content-type":
+                key = "CONTENT_TYPE"
+            else:
+                key = f"HTTP_{name.upper().replace('-', '_')}"
+            value = value.decode("latin1")
+            # Repeated headers are folded into one comma-separated value
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _run_wsgi_app(self, scope, receive, send):
+        """
+        Runs the WSGI app for one request on a pool thread; the body is read through the server's
+        `receive` and the response sent through its `send` (both wrapped with async_to_sync). The
+        response start is sent with the first body chunk, so start_response can still be called
+        again with exc_info until then.
+        """
+        response_start = None
+        started = False
+
+        def start_response(status, headers, exc_info=None):
+            nonlocal response_start
+            if exc_info is not None and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            if response_start is not None and exc_info is None:
+                raise RuntimeError("start_response called a second time without exc_info")
+            response_start = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin1"), value.encode("latin1")) for name, value in headers],
+            }
+
+        body = io.BufferedReader(
+            RequestBodyStream(receive, self.flask_app.config.get("MAX_CONTENT_LENGTH")),
+            buffer_size=REQUEST_BODY_BUFFER_BYTES
+        )
+        response = self.flask_app.wsgi_app(self._build_environ(scope, body), start_response)
+        try:
+            for chunk in response:
+                if not chunk:
+                    continue
+                if not started:
+                    send(response_start)
+                    started = True
+                send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            # Lets streamed responses release what they hold (e.g. an export's database connection)
+            if hasattr(response, "close"):
+                response.close()
+        if not started:
+            send(response_start)
+        send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+                except Exception as e:
+                    logger.error(f"Error during shutdown: {e}", exc_info=True)
+                    await send({"type": "lifespan.shutdown.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def shutdown(self):
+        """Runs after the server stopped accepting requests and finished the open ones."""
+        stop_background_tasks(self.shutdown_drain_seconds)
+        self._executor.shutdown(wait=True)
+        async_db.close()
+        db_service.close()
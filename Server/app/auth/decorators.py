@@ -4,8 +4,7 @@ from datetime import datetime, timezone
 from flask import request, jsonify, g, current_app
 import jwt
 
-from app.extensions import db_service
-from app.utils import run_blocking_io
+from app.extensions import db_service, async_db
 
 def token_required(f):
     @wraps(f)
@@ -37,7 +36,13 @@ def token_required(f):
             token_issued_at_ts = payload.get('iat')
 
             if username and token_issued_at_ts:
-                user_last_updated = await run_blocking_io(db_service.get_user_last_updated, username)
+                # Served from the lookup cache without a thread hop while it is known to be current;
+                # otherwise the database call first syncs it with other processes' writes
+                hit = False
+                if db_service.lookup_caches_current():
+                    hit, user_last_updated = db_service.user_last_updated_cache.lookup(username)
+                if not hit:
+                    user_last_updated = await async_db.get_user_last_updated(username, use_cache=False)
                 if user_last_updated:
                     token_issued_at_dt = datetime.fromtimestamp(token_issued_at_ts, timezone.utc)
 
@@ -133,10 +138,14 @@ def check_admin_of_employee_company(employee_id_arg_name='employee_id'):
             except ValueError:
                 return jsonify({"error": f"Invalid Employee ID format: '{employee_id_from_path}'"}), 400
 
-            employee_company_id = await run_blocking_io(
-                db_service.get_company_id_by_employee_id,
-                employee_id=employee_id_int
-            )
+            hit = False
+            if db_service.lookup_caches_current():
+                hit, employee_company_id = db_service.employee_company_cache.lookup(employee_id_int)
+            if not hit:
+                employee_company_id = await async_db.get_company_id_by_employee_id(
+                    employee_id=employee_id_int,
+                    use_cache=False
+                )
 
             if employee_company_id is None:
                 return jsonify({"error": f"Employee with ID {employee_id_int} not found."}), 404
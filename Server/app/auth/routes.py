@@ -3,8 +3,7 @@ from flask import Blueprint, request, jsonify, g, current_app
 import jwt
 from datetime import datetime, timedelta, timezone
 
-from app.extensions import db_service
-from app.utils import run_blocking_io
+from app.extensions import async_db
 from app.auth.decorators import token_required
 
 # Remove the url_prefix
@@ -21,8 +20,7 @@ async def login():
     username = data['username']
     password_attempt = data['password']
 
-    user_details = await run_blocking_io(
-        db_service.get_user_details_for_login,
+    user_details = await async_db.get_user_details_for_login(
         username=username,
         password_attempt=password_attempt
     )
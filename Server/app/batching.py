@@ -0,0 +1,108 @@
+# app/batching.py
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects items submitted by many threads into micro-batches.
+
+    A batch is processed as soon as it holds max_batch_size items, or when
+    max_wait_seconds have passed since its first item arrived. Each submitter
+    gets a Future resolved with its own result.
+
+    With a fixed number of producers that each block on their future, no item can
+    arrive once all of them are waiting: a batch is processed right away when it holds
+    an item of every producer not blocked on a batch already being processed.
+    """
+
+    def __init__(
+            self,
+            process_batch: Callable[[List], List],
+            max_batch_size: int,
+            max_wait_seconds: float,
+            concurrency: int = 1,
+            producers: Optional[int] = None,
+            name: str = "MicroBatcher"
+    ):
+        self._process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max_wait_seconds
+        self.producers = producers
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        # Items of the batches being processed; their producers can't submit until they are resolved
+        self._processing = 0
+        # One batch is collected at a time, so its limit accounts for every item taken from the queue
+        self._collect_lock = threading.Lock()
+
+        # One thread per batch that may be processed concurrently (e.g. per pool process)
+        for i in range(max(1, concurrency)):
+            threading.Thread(target=self._run, daemon=True, name=f"{name}-{i}").start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "average_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "waiting": self._queue.qsize(),
+            }
+
+    def _batch_limit(self) -> int:
+        """Size at which the batch being collected is processed."""
+        if not self.producers:
+            return self.max_batch_size
+        with self._stats_lock:
+            free_producers = self.producers - self._processing
+        return max(1, min(self.max_batch_size, free_producers))
+
+    def _collect_batch(self) -> list:
+        with self._collect_lock:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_seconds
+            while len(batch) < self._batch_limit():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            with self._stats_lock:
+                self._processing += len(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            items = [item for item, _ in batch]
+            try:
+                results = self._process_batch(items)
+            except Exception as e:
+                logger.error(f"Batch of {len(items)} items failed: {e}")
+                with self._stats_lock:
+                    self._processing -= len(items)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._stats_lock:
+                self._processing -= len(items)
+                self._batches += 1
+                self._items += len(items)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
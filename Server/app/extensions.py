@@ -1,31 +1,110 @@
 # app/extensions.py
 import queue
 import sys
+import threading
 from flask_cors import CORS
 
 from db.database import Database
-from tools.speech_to_text import SpeechToTextService
+from db.async_database import AsyncDatabase
+from tools.speech_to_text import (
+    ENGINES as STT_ENGINES,
+    SpeechToTextService,
+    WhisperEngine,
+    azure_session_factory,
+    local_session_factory,
+    whisper_session_factory
+)
 from tools.conflict_detection import ConflictDetector
 from config import config
 
-import google.generativeai as genai
 import os
 
 cors = CORS()
 
-db_service = Database(db_path=config.DATABASE_PATH, schema_path=config.SCHEMA_PATH)
+db_service = Database(
+    db_path=config.DATABASE_PATH,
+    schema_path=config.SCHEMA_PATH,
+    read_pool_size=config.DB_READ_POOL_SIZE,
+    busy_timeout_ms=config.DB_BUSY_TIMEOUT_MS,
+    cache_size_kb=config.DB_CACHE_SIZE_KB,
+    mmap_size_bytes=config.DB_MMAP_SIZE_MB * 1024 * 1024,
+    lookup_cache_ttl_seconds=config.AUTH_CACHE_TTL_SECONDS,
+    lookup_cache_max_entries=config.AUTH_CACHE_MAX_ENTRIES,
+    lookup_cache_sync_seconds=config.AUTH_CACHE_SYNC_SECONDS
+)
+# Awaitable view of db_service for the async routes; db_service itself stays synchronous
+async_db = AsyncDatabase(db_service, max_workers=config.DB_EXECUTOR_WORKERS)
 
-if config.AZURE_SPEECH_API_KEY and config.AZURE_SERVICE_REGION:
+if config.STT_ENGINE not in STT_ENGINES:
+    raise ValueError(f"Unknown STT_ENGINE '{config.STT_ENGINE}'. Expected one of: {', '.join(STT_ENGINES)}")
+
+speech_session_factory = None
+if config.STT_ENGINE == 'whisper':
+    # The Whisper model is loaded by the first transcription, not at import
+    speech_session_factory = whisper_session_factory(WhisperEngine(
+        config.STT_WHISPER_MODEL,
+        compute_type=config.STT_WHISPER_COMPUTE_TYPE,
+        cpu_threads=config.STT_WHISPER_CPU_THREADS or max(1, (os.cpu_count() or 1) // max(1, config.STT_MAX_SESSIONS)),
+        num_workers=config.STT_MAX_SESSIONS,
+        batch_size=config.STT_WHISPER_BATCH_SIZE,
+        beam_size=config.STT_WHISPER_BEAM_SIZE,
+        language=config.SPEECH_LANG,
+        download_root=config.STT_WHISPER_MODEL_DIR
+    ))
+elif config.STT_ENGINE == 'local':
+    speech_session_factory = local_session_factory(config.STT_LOCAL_REALTIME_FACTOR,
+                                                   diarization=config.STT_DIARIZATION)
+elif config.AZURE_SPEECH_API_KEY and config.AZURE_SERVICE_REGION:
+    speech_session_factory = azure_session_factory(
+        config.AZURE_SPEECH_API_KEY, config.AZURE_SERVICE_REGION, config.SPEECH_LANG,
+        diarization=config.STT_DIARIZATION
+    )
+
+if speech_session_factory is not None:
     speech_recognition_service = SpeechToTextService(
-        config.AZURE_SPEECH_API_KEY, config.AZURE_SERVICE_REGION, config.SPEECH_LANG
+        speech_session_factory,
+        max_sessions=config.STT_MAX_SESSIONS,
+        session_timeout_seconds=config.STT_SESSION_TIMEOUT_SECONDS
     )
 else:
     speech_recognition_service = None
-    print("Warning: Azure Speech API Key or Region not configured. Speech-to-text functionality will be disabled.", file=sys.stderr)
+    print("Warning: Azure Speech API Key or Region not configured and no local STT_ENGINE selected. "
+          "Speech-to-text functionality will be disabled.", file=sys.stderr)
+
+# The conflict detection models and the Gemini client are created on first use, so that
+# importing the app (and serving requests) neither loads the models nor imports torch.
+_conflict_analysis_service = None
+_gemini = None
+_lazy_init_lock = threading.Lock()
+
+
+def get_conflict_analysis_service() -> ConflictDetector:
+    """Returns the in-process ConflictDetector, loading its models on the first call."""
+    global _conflict_analysis_service
+    with _lazy_init_lock:
+        if _conflict_analysis_service is None:
+            _conflict_analysis_service = ConflictDetector(
+                max_batch_size=config.CONFLICT_BATCH_SIZE,
+                max_chunk_tokens=config.CONFLICT_CHUNK_MAX_TOKENS,
+                backend=config.CONFLICT_INFERENCE_BACKEND,
+                onnx_model_dir=config.ONNX_MODEL_DIR
+            )
+        return _conflict_analysis_service
 
-conflict_analysis_service = ConflictDetector()
 
-genai.configure(api_key=config.GEMINI_API_KEY)
-gemini = genai.GenerativeModel('gemini-1.5-flash') 
+def get_gemini():
+    """Returns the Gemini model client, or None if no API key is configured."""
+    global _gemini
+    if not config.GEMINI_API_KEY:
+        return None
+    with _lazy_init_lock:
+        if _gemini is None:
+            import google.generativeai as genai
+            genai.configure(api_key=config.GEMINI_API_KEY)
+            _gemini = genai.GenerativeModel(config.GEMINI_GENERATIVE_MODEL)
+        return _gemini
 
-audio_queue = queue.Queue()
\ No newline at end of file
+# Local buffer of jobs claimed from the analysis_jobs table, drained by the worker threads
+audio_queue = queue.Queue()
+# Set by the upload route to wake the job dispatcher without waiting for the next poll
+job_available = threading.Event()
\ No newline at end of file
@@ -0,0 +1,44 @@
+# app/metrics.py
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageMetrics:
+    """Thread-safe timing statistics per pipeline stage (count, errors, total/average/max time)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.monotonic()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.record(stage, time.monotonic() - start, failed)
+
+    def record(self, stage: str, seconds: float, failed: bool = False):
+        with self._lock:
+            stats = self._stages.setdefault(stage, {"count": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["errors"] += int(failed)
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                stage: {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "avg_ms": round(stats["total_seconds"] / stats["count"] * 1000, 1),
+                    "max_ms": round(stats["max_seconds"] * 1000, 1),
+                }
+                for stage, stats in self._stages.items()
+            }
@@ -1,16 +1,21 @@
 # app/routes/calls.py
+import csv
+import io
+import json
 import os
 import ntpath
+import sqlite3
 import uuid
 import time
 from flask import (
-    Blueprint, request, jsonify, g, current_app, send_from_directory
+    Blueprint, Response, request, jsonify, g, current_app, send_from_directory
 )
 from datetime import datetime
+from functools import partial
+from typing import Iterator, List, Optional, Tuple
 from werkzeug.utils import secure_filename
-from pydub import AudioSegment # Requires ffmpeg
 
-from app.extensions import db_service, audio_queue
+from app.extensions import db_service, async_db, job_available
 from config import config
 from app.utils import run_blocking_io, is_allowed_audio_file
 from app.auth.decorators import (
@@ -19,10 +24,20 @@ from app.auth.decorators import (
     admin_only,
     check_company_admin
 )
-from tools.audio_utils import convert_m4a_to_wav
+from app.uploads import HashingUploadFile
+from app.storage import archive_path_for
 
 calls_bp = Blueprint('calls', __name__)
 
+# Page sizes for GET /companies/<id>/call_records when paginated with limit/cursor
+CALL_RECORDS_DEFAULT_PAGE_SIZE = 100
+CALL_RECORDS_MAX_PAGE_SIZE = 500
+# Formats of GET /companies/<id>/call_records/export
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+# Result page sizes of GET /companies/<id>/call_records/search
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 200
+
 @calls_bp.route('/call_records', methods=['POST'])
 @token_required
 @employee_only
@@ -57,72 +72,57 @@ async def api_add_call_record():
     saved_path = os.path.join(config.RECORDINGS_DIR, f"{base_name}.{file_ext}")
 
     try:
-        await run_blocking_io(audio_file.save, saved_path)
+        if isinstance(audio_file.stream, HashingUploadFile):
+            # Already streamed to disk while the request was parsed; just move it into place
+            audio_sha256 = audio_file.stream.hexdigest()
+            await run_blocking_io(audio_file.stream.persist, saved_path)
+        else:
+            await run_blocking_io(audio_file.save, saved_path)
+            audio_sha256 = None
     except Exception as e:
          current_app.logger.error(f"Failed to save uploaded audio file {saved_path}: {e}", exc_info=True)
          return jsonify({"error": f"Failed to save audio file on server."}), 500
 
-    path_for_processing = saved_path
-    path_for_duration_calc = saved_path
-    converted_to_wav = False
-    wav_path = None # Define wav_path outside the if block
-
-    if file_ext == 'm4a':
-        wav_path = os.path.join(config.RECORDINGS_DIR, f"{base_name}.wav")
-        current_app.logger.info(f"Converting M4A file {saved_path} to {wav_path}")
-        try:
-            converted_path = await run_blocking_io(convert_m4a_to_wav, saved_path, wav_path)
-            if converted_path and os.path.exists(converted_path):
-                path_for_processing = converted_path
-                path_for_duration_calc = converted_path
-                converted_to_wav = True
-                # Optional: remove original m4a file here if desired
-            else:
-                 raise RuntimeError(f"Conversion function did not return a valid path or file not found: {converted_path}")
-        except Exception as e:
-            current_app.logger.error(f"Audio conversion from M4A failed for {saved_path}: {e}", exc_info=True)
-            if os.path.exists(saved_path): os.remove(saved_path)
-            if wav_path and os.path.exists(wav_path): os.remove(wav_path)
-            return jsonify({"error": f"Audio conversion failed: {e}"}), 500
-
-    call_duration_seconds = None
-    try:
-        audio_segment = await run_blocking_io(AudioSegment.from_file, path_for_duration_calc)
-        duration_ms = len(audio_segment)
-        call_duration_seconds = int(duration_ms / 1000)
-    except Exception as e:
-        current_app.logger.error(f"Failed to calculate audio duration for {path_for_duration_calc}: {e}", exc_info=True)
-        if os.path.exists(saved_path): os.remove(saved_path)
-        if converted_to_wav and os.path.exists(path_for_processing): os.remove(path_for_processing)
-        return jsonify({"error": "Could not calculate audio duration."}), 500
-
     try:
-        await run_blocking_io(
-            db_service.add_call_record,
+        # The duration is measured by the analysis pipeline; 0 until then
+        job_id = await async_db.add_call_record(
             employee_id,
             call_timestamp_str,
-            call_duration_seconds,
+            0,
             None,
-            path_for_processing,
-            None
+            saved_path,
+            None,
+            audio_sha256,
+            os.path.getsize(saved_path)
         )
     except Exception as e:
-        current_app.logger.error(f"Failed to add initial call record to DB for {path_for_processing}: {e}", exc_info=True)
+        current_app.logger.error(f"Failed to add initial call record to DB for {saved_path}: {e}", exc_info=True)
         if os.path.exists(saved_path): os.remove(saved_path)
-        if converted_to_wav and os.path.exists(path_for_processing): os.remove(path_for_processing)
         return jsonify({"error": "Failed to save call record metadata."}), 500
 
-    audio_queue.put(path_for_processing)
-    current_app.logger.info(f"Enqueued {path_for_processing} for background processing. Queue size: {audio_queue.qsize()}")
+    job_available.set()
+    current_app.logger.info(f"Enqueued {saved_path} for background processing as job {job_id}.")
 
     elapsed = time.monotonic() - start_time
     current_app.logger.info(f"Call record POST request completed in {elapsed:.2f} seconds for {original_filename}")
 
     return jsonify({
         "message": "Call record received successfully. Transcription and analysis pending.",
-        "processed_filename": ntpath.basename(path_for_processing),
-        "call_duration_seconds": call_duration_seconds,
-    }), 201
+        "job_id": job_id,
+        "processed_filename": ntpath.basename(saved_path),
+        "sha256": audio_sha256,
+    }), 202
+
+
+@calls_bp.route('/call_records/jobs/<int:job_id>', methods=['GET'])
+@token_required
+@employee_only
+async def api_get_call_record_job(job_id: int):
+    """Returns the analysis status of a call uploaded by the authenticated employee."""
+    job = await async_db.get_analysis_job(job_id)
+    if not job or str(job['employee_id']) != str(g.current_user.get('employee_id')):
+        return jsonify({"error": f"Job {job_id} not found."}), 404
+    return jsonify(job), 200
 
 
 @calls_bp.route('/companies/<int:company_id>/call_records', methods=['GET'])
@@ -151,24 +151,217 @@ async def api_get_call_records(company_id: int):
             return jsonify({"error": "Invalid 'employee_id' filter. Must be an integer."}), 400
 
     try:
-        records = await run_blocking_io(
-            db_service.get_call_records,
-            company_id, start_time_str, end_time_str, employee_id_filter
-        )
-
-        sanitized_records = []
-        for record in records:
-            if record.get('audio_file_path'):
-                record['audio_filename'] = ntpath.basename(record['audio_file_path'])
-            record.pop('audio_file_path', None)
-            sanitized_records.append(record)
+        fields = _parse_fields(request.args.get('fields'))
+        after = _decode_cursor(request.args.get('cursor'))
+        negative_role = _parse_negative_role(request.args.get('negative_role'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Pagination is opt-in so existing clients keep receiving the whole range as one array
+    paginate = 'limit' in request.args or 'cursor' in request.args
+    limit = None
+    if paginate:
+        try:
+            limit = int(request.args.get('limit', CALL_RECORDS_DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "Invalid 'limit'. Must be an integer."}), 400
+        if not 1 <= limit <= CALL_RECORDS_MAX_PAGE_SIZE:
+            return jsonify({"error": f"'limit' must be between 1 and {CALL_RECORDS_MAX_PAGE_SIZE}."}), 400
 
-        return jsonify(sanitized_records), 200
+    try:
+        records = await async_db.get_call_records(
+            company_id, start_time_str, end_time_str, employee_id_filter, fields, after, limit, negative_role
+        )
+        sanitized_records = [_sanitize_record(record) for record in records]
+
+        if not paginate:
+            return jsonify(sanitized_records), 200
+        next_cursor = None
+        if len(records) == limit:
+            next_cursor = _encode_cursor(records[-1]['call_ts'], records[-1]['call_id'])
+        return jsonify({"records": sanitized_records, "next_cursor": next_cursor}), 200
     except Exception as e:
          current_app.logger.error(f"Error retrieving call records for company {company_id}: {e}", exc_info=True)
          return jsonify({"error": "Failed to retrieve call records."}), 500
 
 
+@calls_bp.route('/companies/<int:company_id>/call_records/export', methods=['GET'])
+@check_company_admin(company_id_arg_name='company_id')
+async def api_export_call_records(company_id: int):
+    """
+    Streams every call record of a company in a time range as NDJSON (default) or CSV.
+    Rows are read and written in batches, so memory use does not grow with the range.
+    """
+    start_time_str = request.args.get('start_time')
+    end_time_str = request.args.get('end_time')
+    employee_id_filter_str = request.args.get('employee_id')
+    export_format = request.args.get('format', 'ndjson').lower()
+
+    if not start_time_str or not end_time_str:
+        return jsonify({"error": "Missing required query parameters: 'start_time' and 'end_time'"}), 400
+    try:
+        datetime.fromisoformat(start_time_str.replace("Z", "+00:00"))
+        datetime.fromisoformat(end_time_str.replace("Z", "+00:00"))
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid date format for start_time or end_time. Use ISO 8601."}), 400
+    employee_id_filter = None
+    if employee_id_filter_str:
+        try:
+            employee_id_filter = int(employee_id_filter_str)
+        except ValueError:
+            return jsonify({"error": "Invalid 'employee_id' filter. Must be an integer."}), 400
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Invalid 'format'. Allowed values: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        fields = _parse_fields(request.args.get('fields'))
+        negative_role = _parse_negative_role(request.args.get('negative_role'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    batches = db_service.iter_call_records(company_id, start_time_str, end_time_str, employee_id_filter, fields,
+                                           negative_role=negative_role)
+    if export_format == 'csv':
+        columns = ['call_id', 'call_ts'] + [f for f in (fields or db_service.CALL_RECORD_FIELDS)
+                                            if f not in ('call_id', 'call_ts')]
+        columns = ['audio_filename' if c == 'audio_file_path' else c for c in columns]
+        body = _csv_lines(batches, columns)
+    else:
+        body = _ndjson_lines(batches)
+
+    filename = f"call_records_{company_id}.{export_format}"
+    return Response(body, mimetype=EXPORT_FORMATS[export_format],
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
+def _ndjson_lines(batches: Iterator[List[dict]]) -> Iterator[str]:
+    for batch in batches:
+        yield "".join(json.dumps(_sanitize_record(record), default=str) + "\n" for record in batch)
+
+
+def _csv_lines(batches: Iterator[List[dict]], columns: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    # The header goes out before the first query results
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_sanitize_record(record) for record in batch)
+        yield buffer.getvalue()
+
+
+@calls_bp.route('/companies/<int:company_id>/call_records/search', methods=['GET'])
+@check_company_admin(company_id_arg_name='company_id')
+async def api_search_call_records(company_id: int):
+    """Searches a company's call transcriptions, best matches first, with optional time/employee filters."""
+    search_query = (request.args.get('q') or '').strip()
+    start_time_str = request.args.get('start_time')
+    end_time_str = request.args.get('end_time')
+    employee_id_filter_str = request.args.get('employee_id')
+
+    if not search_query:
+        return jsonify({"error": "Missing required query parameter: 'q'"}), 400
+    try:
+        for time_str in filter(None, (start_time_str, end_time_str)):
+            datetime.fromisoformat(time_str.replace("Z", "+00:00"))
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid date format for start_time or end_time. Use ISO 8601."}), 400
+    try:
+        employee_id_filter = int(employee_id_filter_str) if employee_id_filter_str else None
+        limit = int(request.args.get('limit', SEARCH_DEFAULT_LIMIT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({"error": "'employee_id', 'limit' and 'offset' must be integers."}), 400
+    if not 1 <= limit <= SEARCH_MAX_LIMIT or offset < 0:
+        return jsonify({"error": f"'limit' must be between 1 and {SEARCH_MAX_LIMIT} and 'offset' >= 0."}), 400
+
+    try:
+        results = await async_db.search_call_transcriptions(
+            company_id, search_query, start_time_str, end_time_str, employee_id_filter, limit, offset
+        )
+    except sqlite3.OperationalError as e:
+        # FTS5 query syntax errors (e.g. unbalanced quotes)
+        return jsonify({"error": f"Invalid search query: {e}"}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error searching call records for company {company_id}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to search call records."}), 500
+
+    return jsonify({"query": search_query, "limit": limit, "offset": offset, "results": results}), 200
+
+
+@calls_bp.route('/companies/<int:company_id>/call_records/<int:call_id>/transcription', methods=['GET'])
+@check_company_admin(company_id_arg_name='company_id')
+async def api_get_call_transcription(company_id: int, call_id: int):
+    """Retrieves the transcription of a single call, for list views that omit it."""
+    try:
+        transcription = await async_db.get_call_transcription(company_id, call_id)
+    except Exception as e:
+        current_app.logger.error(f"Error retrieving transcription of call {call_id}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to retrieve the transcription."}), 500
+    if not transcription:
+        return jsonify({"error": f"Call {call_id} not found."}), 404
+    return jsonify(transcription), 200
+
+
+@calls_bp.route('/companies/<int:company_id>/call_records/<int:call_id>/segments', methods=['GET'])
+@check_company_admin(company_id_arg_name='company_id')
+async def api_get_call_segments(company_id: int, call_id: int):
+    """Retrieves the speaker turns of a call with their role, time in the recording and sentiment."""
+    try:
+        segments = await async_db.get_call_segments(company_id, call_id)
+    except Exception as e:
+        current_app.logger.error(f"Error retrieving segments of call {call_id}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to retrieve the call segments."}), 500
+    if segments is None:
+        return jsonify({"error": f"Call {call_id} not found."}), 404
+    return jsonify({"call_id": call_id, "segments": segments}), 200
+
+
+def _parse_fields(fields_arg: Optional[str]) -> Optional[List[str]]:
+    """Parses the comma-separated `fields` projection; `audio_filename` selects the recording name."""
+    if not fields_arg:
+        return None
+    requested = [f.strip() for f in fields_arg.split(',') if f.strip()]
+    # The server-side path is never exposed; clients ask for the recording's file name instead
+    allowed = set(db_service.CALL_RECORD_FIELDS) - {'audio_file_path'} | {'audio_filename'}
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Invalid 'fields': {', '.join(unknown)}. Allowed fields: {', '.join(sorted(allowed))}")
+    return ['audio_file_path' if f == 'audio_filename' else f for f in requested]
+
+
+def _parse_negative_role(role_arg: Optional[str]) -> Optional[str]:
+    """Parses the `negative_role` filter: only calls where that speaker had a Negative turn."""
+    if not role_arg:
+        return None
+    if role_arg not in db_service.SPEAKER_ROLES:
+        raise ValueError(f"Invalid 'negative_role'. Allowed values: {', '.join(db_service.SPEAKER_ROLES)}")
+    return role_arg
+
+
+def _encode_cursor(call_ts: int, call_id: int) -> str:
+    return f"{call_ts}_{call_id}"
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[int, int]]:
+    if not cursor:
+        return None
+    try:
+        call_ts, call_id = cursor.split('_')
+        return int(call_ts), int(call_id)
+    except ValueError:
+        raise ValueError("Invalid 'cursor'. Use the 'next_cursor' value of the previous page.")
+
+
+def _sanitize_record(record: dict) -> dict:
+    """Replaces the server-side recording path with the file name served by /recordings."""
+    audio_file_path = record.pop('audio_file_path', None)
+    if audio_file_path:
+        record['audio_filename'] = ntpath.basename(audio_file_path)
+    return record
+
+
 @calls_bp.route('/companies/<int:company_id>/call_records/stats', methods=['GET'])
 @check_company_admin(company_id_arg_name='company_id')
 async def api_get_call_record_stats(company_id: int):
@@ -191,30 +384,36 @@ async def api_get_call_record_stats(company_id: int):
         except ValueError:
             return jsonify({"error": "Invalid 'employee_id' filter. Must be an integer."}), 400
 
-    try:
-        # Consider optimizing this by calculating stats in the DB directly
-        records = await run_blocking_io(
-            db_service.get_call_records,
-            company_id, start_time_str, end_time_str, employee_id_filter
-        )
+    group_by = request.args.get('group_by')
+    if group_by is not None and group_by not in db_service.STATS_GROUPS:
+        allowed_str = ", ".join(db_service.STATS_GROUPS)
+        return jsonify({"error": f"Invalid 'group_by'. Allowed values: {allowed_str}"}), 400
 
+    try:
         filters_applied = {
             "company_id": company_id,
             "start_time": start_time_str,
             "end_time": end_time_str,
-            "employee_id": employee_id_filter
+            "employee_id": employee_id_filter,
+            "group_by": group_by
         }
 
-        if not records:
-            stats = {"total_calls": 0, "total_duration_seconds": 0, "conflict_percentage": 0.0,
-                     "filters_applied": filters_applied}
-        else:
-            stats = {
-                "total_calls": db_service.count_calls(records),
-                "total_duration_seconds": db_service.sum_call_durations(records),
-                "conflict_percentage": db_service.calculate_conflict_percentage(records),
-                "filters_applied": filters_applied
-            }
+        # Totals and groups are read in one hop, from the same snapshot
+        queries = [partial(db_service.get_call_record_stats, company_id, start_time_str, end_time_str,
+                           employee_id_filter)]
+        if group_by:
+            queries.append(partial(db_service.get_call_record_stats, company_id, start_time_str, end_time_str,
+                                   employee_id_filter, group_by))
+        results = await async_db.batch(*queries)
+        totals = results[0][0]
+        stats = {
+            "total_calls": totals['total_calls'],
+            "total_duration_seconds": totals['total_duration_seconds'],
+            "conflict_percentage": totals['conflict_percentage'],
+            "filters_applied": filters_applied
+        }
+        if group_by:
+            stats["groups"] = results[1]
         return jsonify(stats), 200
 
     except Exception as e:
@@ -222,6 +421,61 @@ async def api_get_call_record_stats(company_id: int):
          return jsonify({"error": "Failed to calculate call statistics."}), 500
 
 
+@calls_bp.route('/companies/<int:company_id>/call_records/speaker_stats', methods=['GET'])
+@check_company_admin(company_id_arg_name='company_id')
+async def api_get_speaker_stats(company_id: int):
+    """Conflict metrics per speaker role (agent, customer) over the company's diarized calls."""
+    start_time_str = request.args.get('start_time')
+    end_time_str = request.args.get('end_time')
+    employee_id_filter_str = request.args.get('employee_id')
+
+    if not start_time_str or not end_time_str:
+        return jsonify({"error": "Missing required query parameters: 'start_time' and 'end_time'"}), 400
+    try:
+        datetime.fromisoformat(start_time_str.replace("Z", "+00:00"))
+        datetime.fromisoformat(end_time_str.replace("Z", "+00:00"))
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid date format for start_time or end_time. Use ISO 8601."}), 400
+    employee_id_filter = None
+    if employee_id_filter_str:
+        try:
+            employee_id_filter = int(employee_id_filter_str)
+        except ValueError:
+            return jsonify({"error": "Invalid 'employee_id' filter. Must be an integer."}), 400
+
+    try:
+        speakers = await async_db.get_speaker_conflict_metrics(company_id, start_time_str, end_time_str,
+                                                               employee_id_filter)
+    except Exception as e:
+        current_app.logger.error(f"Error calculating speaker stats for company {company_id}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to calculate speaker statistics."}), 500
+    return jsonify({
+        "speakers": speakers,
+        "filters_applied": {
+            "company_id": company_id,
+            "start_time": start_time_str,
+            "end_time": end_time_str,
+            "employee_id": employee_id_filter
+        }
+    }), 200
+
+
+@calls_bp.route('/companies/<int:company_id>/storage', methods=['GET'])
+@check_company_admin(company_id_arg_name='company_id')
+async def api_get_storage_usage(company_id: int):
+    """Reports the disk space used by a company's recordings, per storage tier."""
+    try:
+        tiers = await async_db.get_storage_usage(company_id)
+        return jsonify({
+            "company_id": company_id,
+            "total_size_bytes": sum(tier['size_bytes'] for tier in tiers),
+            "tiers": tiers
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error computing storage usage for company {company_id}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to compute storage usage."}), 500
+
+
 @calls_bp.route('/recordings/<path:filename>', methods=['GET'])
 @token_required
 @admin_only # Assuming only admins can download
@@ -237,6 +491,12 @@ async def serve_recording(filename: str):
          current_app.logger.warning(f"Attempted directory traversal: {filename}")
          return jsonify({"error": "Access denied to the requested file path."}), 403
 
+    if not os.path.exists(requested_path_abs):
+        # Links to the uploaded file keep working once it has been archived as Opus
+        archived_path_abs = archive_path_for(requested_path_abs)
+        if os.path.exists(archived_path_abs):
+            filename = os.path.relpath(archived_path_abs, recordings_dir_abs)
+
     # Optional: Add check if admin's company owns this recording
     # Requires DB lookup based on filename -> company_id comparison
     try:
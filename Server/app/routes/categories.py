@@ -1,7 +1,6 @@
 from flask import Blueprint, request, jsonify, g, current_app
 
-from app.extensions import db_service
-from app.utils import run_blocking_io
+from app.extensions import async_db
 from app.auth.decorators import check_company_admin
 
 categories_bp = Blueprint('categories', __name__)
@@ -21,8 +20,7 @@ async def api_add_category(company_id: int):
     category_description = data.get('category_description') # Optional
 
     try:
-        await run_blocking_io(
-            db_service.add_category,
+        await async_db.add_category(
             company_id,
             category_name,
             category_description
@@ -43,7 +41,7 @@ async def api_get_categories_by_company(company_id: int):
     Only the company's admin can perform this action.
     """
     try:
-        categories = await run_blocking_io(db_service.get_categories_by_company, company_id=company_id)
+        categories = await async_db.get_categories_by_company(company_id=company_id)
         return jsonify(categories), 200
     except Exception as e:
         current_app.logger.error(f"Error retrieving categories for company {company_id}: {e}", exc_info=True)
@@ -61,7 +59,7 @@ async def api_delete_category(company_id: int, category_id: int):
     try:
         # The db_service function should verify that the category_id belongs to the company_id
         # as a security measure before deleting.
-        await run_blocking_io(db_service.delete_category, category_id=category_id, company_id=company_id)
+        await async_db.delete_category(category_id=category_id, company_id=company_id)
         return jsonify({"message": f"Category {category_id} deleted successfully"}), 200
     except ValueError as e:
         # This error is raised from db_service if the category is not found or doesn't belong to the company
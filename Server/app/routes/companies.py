@@ -2,8 +2,7 @@
 from flask import Blueprint, request, jsonify, g, current_app
 from datetime import datetime
 
-from app.extensions import db_service
-from app.utils import run_blocking_io
+from app.extensions import async_db
 from app.auth.decorators import token_required, admin_only
 
 companies_bp = Blueprint('companies', __name__, url_prefix='/companies')
@@ -25,14 +24,13 @@ async def api_add_company():
         return jsonify({"error": "Invalid date format for subscription_expiration. Use YYYY-MM-DD."}), 400
 
     try:
-        await run_blocking_io(
-            db_service.add_company,
+        await async_db.add_company(
             data['company_name'],
             data['subscription_expiration'],
             data['admin_username'],
             data['admin_password']
         )
-        created_company = await run_blocking_io(db_service.get_company_by_admin, admin_username=data['admin_username'])
+        created_company = await async_db.get_company_by_admin(admin_username=data['admin_username'])
         if created_company:
             return jsonify({"message": "Company registered successfully", "company": created_company}), 201
         else:
@@ -56,7 +54,7 @@ async def api_get_my_company_details():
         current_app.logger.error("Critical: Admin username ('sub') missing in token payload despite passing decorators.")
         return jsonify({"error": "Internal server error: Cannot identify admin user."}), 500
 
-    company = await run_blocking_io(db_service.get_company_by_admin, admin_username=admin_username_from_token)
+    company = await async_db.get_company_by_admin(admin_username=admin_username_from_token)
 
     if company:
         return jsonify(company), 200
@@ -1,6 +1,5 @@
 from flask import Blueprint, request, jsonify, current_app
-from app.extensions import db_service
-from app.utils import run_blocking_io
+from app.extensions import async_db
 from datetime import datetime, date, timezone
 from typing import List, Dict
 from app.tasks import summarize_with_llm
@@ -47,8 +46,7 @@ async def api_add_summary():
         start_of_day = datetime.combine(summary_day.date(), datetime.min.time(), tzinfo=timezone.utc)
         end_of_day = datetime.combine(summary_day.date(), datetime.max.time(), tzinfo=timezone.utc)
 
-        records = await run_blocking_io(
-            db_service.get_call_records,
+        records = await async_db.get_call_records(
             company_id,
             start_of_day.isoformat(),
             end_of_day.isoformat()
@@ -61,8 +59,7 @@ async def api_add_summary():
         summary_text = summarize_with_llm(formatted_text)
 
         # Use the upsert method to replace the summary if it already exists
-        await run_blocking_io(
-            db_service.add_or_update_daily_summary,
+        await async_db.add_or_update_daily_summary(
             company_id,
             summary_day_str,
             summary_text
@@ -91,8 +88,7 @@ async def api_get_summary(company_id: int, summary_date: str):
         return jsonify({"error": "Invalid date format. Use ISO 8601 format like YYYY-MM-DD."}), 400
 
     try:
-        summary_text = await run_blocking_io(
-            db_service.get_summary_at_day,
+        summary_text = await async_db.get_summary_at_day(
             company_id=company_id,
             summary_day=summary_date
         )
@@ -2,8 +2,7 @@
 from flask import Blueprint, request, jsonify, g, current_app
 from datetime import datetime
 
-from app.extensions import db_service
-from app.utils import run_blocking_io
+from app.extensions import async_db
 from app.auth.decorators import (
     token_required,
     admin_only,
@@ -34,8 +33,7 @@ async def api_add_employee(company_id: int):
             return jsonify({"error": "Invalid date format for birthdate. Use YYYY-MM-DD."}), 400
 
     try:
-        await run_blocking_io(
-            db_service.add_employee,
+        await async_db.add_employee(
             company_id, data['username'], data['password'], data['first_name'],
             data['last_name'], gender, birthdate
         )
@@ -52,7 +50,7 @@ async def api_add_employee(company_id: int):
 async def api_get_employees_by_company(company_id: int):
     """Retrieves a list of employees for the specified company."""
     try:
-        employees = await run_blocking_io(db_service.get_employees_by_company, company_id=company_id)
+        employees = await async_db.get_employees_by_company(company_id=company_id)
         return jsonify(employees), 200
     except Exception as e:
         current_app.logger.error(f"Error retrieving employees for company {company_id}: {e}", exc_info=True)
@@ -85,8 +83,7 @@ async def api_update_employee(employee_id: int):
              return jsonify({"error": "Invalid date format for birthdate. Use YYYY-MM-DD."}), 400
 
     try:
-        await run_blocking_io(
-            db_service.update_employee,
+        await async_db.update_employee(
             employee_id,
             username,
             new_password,
@@ -110,7 +107,7 @@ async def api_update_employee(employee_id: int):
 async def api_delete_employee(employee_id: int):
     """Deletes a specific employee."""
     try:
-        await run_blocking_io(db_service.delete_employee, employee_id=employee_id)
+        await async_db.delete_employee(employee_id=employee_id)
         return jsonify({"message": f"Employee {employee_id} deleted successfully"}), 200
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
@@ -0,0 +1,21 @@
+# app/routes/processing.py
+from flask import Blueprint, jsonify
+
+from app.extensions import db_service, async_db
+from app.tasks import get_processing_stats
+from app.auth.decorators import token_required, admin_only
+
+processing_bp = Blueprint('processing', __name__, url_prefix='/processing')
+
+@processing_bp.route('/stats', methods=['GET'])
+@token_required
+@admin_only
+async def api_get_processing_stats():
+    """
+    Returns the analysis queue depth, the number of calls being processed, this process's lookup
+    cache hit rates and the load on its database executor.
+    """
+    stats = get_processing_stats()
+    stats["lookup_caches"] = db_service.cache_stats()
+    stats["db_executor"] = async_db.stats()
+    return jsonify(stats), 200
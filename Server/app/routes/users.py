@@ -3,8 +3,7 @@
 
 from flask import Blueprint, request, jsonify, current_app
 
-from app.extensions import db_service
-from app.utils import run_blocking_io
+from app.extensions import async_db
 
 users_bp = Blueprint('users', __name__, url_prefix='/users')
 
@@ -20,7 +19,7 @@ async def api_add_user():
     password = data['password']
 
     try:
-        await run_blocking_io(db_service.add_user, username, password)
+        await async_db.add_user(username, password)
         return jsonify({"message": f"User '{username}' created successfully."}), 201
     except Exception as e:
         current_app.logger.error(f"Error adding user {username}: {e}")
@@ -33,7 +32,7 @@ async def api_add_user():
 @users_bp.route('/<username>', methods=['GET'])
 async def api_get_user(username: str):
     """Retrieves basic information for a specific user."""
-    user_info = await run_blocking_io(db_service.get_user, username) # Assumes password excluded
+    user_info = await async_db.get_user(username) # Assumes password excluded
     if user_info:
         return jsonify(user_info), 200
     else:
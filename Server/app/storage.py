@@ -0,0 +1,134 @@
+# app/storage.py
+import glob
+import logging
+import os
+import time
+from typing import Optional
+
+from app.extensions import db_service
+from config import config
+from tools.audio_utils import transcode_to_opus
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_EXTENSION = ".ogg"
+# Maximum number of recordings handled per tier in one sweep
+SWEEP_BATCH_SIZE = 200
+# A recording claimed by a process that died while moving it is retried after this long
+STORAGE_CLAIM_SECONDS = 3600
+
+
+def archive_path_for(audio_path: str) -> str:
+    """Archived masters keep the stem of the uploaded file, so old file names can still be resolved."""
+    return os.path.splitext(audio_path)[0] + ARCHIVE_EXTENSION
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _transcode_in_place(source_path: str, target_path: str, bitrate: str) -> int:
+    """Encodes source to target through a temporary file and returns the size of the result."""
+    tmp_path = f"{target_path}.{os.getpid()}.part"
+    try:
+        transcode_to_opus(source_path, tmp_path, bitrate=bitrate)
+        os.replace(tmp_path, target_path)
+    finally:
+        _remove_quietly(tmp_path)
+    return os.path.getsize(target_path)
+
+
+def _move_claimed(call_id: int, audio_path: str, tier: str, action):
+    """
+    Runs `action` on a recording once this process holds its claim, so concurrent sweeps (one per
+    worker process) and the analysis pipeline never work on the same file.
+
+    Returns:
+        The result of `action`, or None if the recording left `tier` or another process claimed it.
+    """
+    if not db_service.claim_recording(call_id, tier, STORAGE_CLAIM_SECONDS):
+        return None
+    try:
+        return action(call_id, audio_path)
+    except Exception:
+        db_service.release_recording_claim(call_id)
+        raise
+
+
+def archive_recording(call_id: int, audio_path: str) -> Optional[str]:
+    """
+    Replaces an analyzed recording with its Opus master and deletes the upload and
+    every intermediate file derived from it (e.g. the 16 kHz WAV used for transcription).
+
+    Returns:
+        Optional[str]: Path of the archived recording, or None if another process is archiving it.
+    """
+    return _move_claimed(call_id, audio_path, "original", _archive)
+
+
+def _archive(call_id: int, audio_path: str) -> str:
+    archived_path = archive_path_for(audio_path)
+    size = _transcode_in_place(audio_path, archived_path, config.RECORDING_OPUS_BITRATE)
+    db_service.update_recording_storage(call_id, archived_path, size, "opus")
+
+    stem = os.path.splitext(audio_path)[0]
+    for leftover in glob.glob(glob.escape(stem) + ".*") + glob.glob(glob.escape(stem) + "_16k.*"):
+        if leftover != archived_path:
+            _remove_quietly(leftover)
+    return archived_path
+
+
+def _move_to_cold_tier(call_id: int, audio_path: str):
+    size = _transcode_in_place(audio_path, audio_path, config.RECORDING_COLD_OPUS_BITRATE)
+    db_service.update_recording_storage(call_id, audio_path, size, "opus-cold")
+    return audio_path
+
+
+def _delete_recording(call_id: int, audio_path: str):
+    _remove_quietly(audio_path)
+    db_service.update_recording_storage(call_id, audio_path, 0, "deleted")
+    return audio_path
+
+
+def apply_retention_tiers() -> dict:
+    """
+    Runs one storage sweep: archives analyzed recordings still stored as uploaded,
+    re-encodes old masters at the cold bitrate and deletes recordings past retention.
+
+    Returns:
+        dict: Number of recordings moved into each tier.
+    """
+    moved = {"opus": 0, "opus-cold": 0, "deleted": 0}
+    steps = [("original", "opus", db_service.get_recordings_to_archive, (SWEEP_BATCH_SIZE,), _archive)]
+    if config.RECORDING_COLD_AFTER_DAYS > 0:
+        steps.append(("opus", "opus-cold", db_service.get_recordings_older_than,
+                      ("opus", config.RECORDING_COLD_AFTER_DAYS, SWEEP_BATCH_SIZE), _move_to_cold_tier))
+    if config.RECORDING_RETENTION_DAYS > 0:
+        for tier in ("original", "opus", "opus-cold"):
+            steps.append((tier, "deleted", db_service.get_recordings_older_than,
+                          (tier, config.RECORDING_RETENTION_DAYS, SWEEP_BATCH_SIZE), _delete_recording))
+
+    for source_tier, target_tier, select, args, action in steps:
+        for record in select(*args):
+            try:
+                if _move_claimed(record['call_id'], record['audio_file_path'], source_tier, action) is not None:
+                    moved[target_tier] += 1
+            except Exception as e:
+                logger.error(f"Could not move recording {record['audio_file_path']} to tier {target_tier}: {e}")
+    return moved
+
+
+def retention_sweeper():
+    """Periodically applies the storage tiers to the recordings directory."""
+    interval = max(60.0, config.RECORDING_SWEEP_INTERVAL_HOURS * 3600)
+    while True:
+        try:
+            moved = apply_retention_tiers()
+            if any(moved.values()):
+                logger.info(f"Recording storage sweep: {moved}")
+        except Exception as e:
+            logger.error(f"Recording storage sweep failed: {e}", exc_info=True)
+        time.sleep(interval)
@@ -1,75 +1,324 @@
 import threading
+import functools
 import logging
 import json
 import os
+import time
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
 from app.extensions import (
     audio_queue,
+    job_available,
     db_service,
     speech_recognition_service,
-    conflict_analysis_service,
-    gemini
+    get_conflict_analysis_service,
+    get_gemini
 )
+from config import config
+from app.batching import MicroBatcher
+from app.metrics import StageMetrics
+from app.storage import archive_recording, retention_sweeper
+from tools.audio_utils import convert_to_wav, probe_duration_seconds, remove_silence, speech_time_to_source
+from tools.speech_to_text import TranscriptTurn, assign_speaker_roles
+from tools.conflict_detection import init_conflict_worker, analyze_batch_in_worker, warm_up_worker
 
 logger = logging.getLogger(__name__)
 
+# Process pool for CPU-bound conflict detection (None when running inline)
+conflict_executor = None
+# Groups transcriptions from the worker threads into batches for the conflict detector
+conflict_batcher = None
+# Groups (company_id, transcription) pairs into batches categorized with one LLM request per company
+category_batcher = None
+
+# Prompt templates of the LLM requests, read once per process
+PROMPT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'prompt')
+
+# Answer format of the categorization requests: one category id per numbered call
+CATEGORIZATION_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"call": {"type": "INTEGER"}, "category_id": {"type": "INTEGER"}},
+        "required": ["call", "category_id"],
+    },
+}
+
+# LLM requests made by this process and the tokens they used
+_llm_usage = {"requests": 0, "prompt_tokens": 0, "output_tokens": 0}
+_llm_usage_lock = threading.Lock()
+
+# Whether this process runs the analysis workers (web processes may only enqueue)
+_workers_started = False
+
+# Number of audio files currently being processed by the worker threads
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+# Timing of each stage of the analysis pipeline
+stage_metrics = StageMetrics()
+
+# Jobs claimed by this process (buffered in audio_queue or in flight) whose leases must be renewed
+_held_job_ids = set()
+_held_job_ids_lock = threading.Lock()
+
+# Set by stop_background_tasks: the dispatcher stops claiming jobs and the worker threads exit
+# once the jobs already buffered in audio_queue are processed
+_stopping = threading.Event()
+# Held while claiming and queueing jobs, so no job lands behind the workers' stop markers
+_claim_lock = threading.Lock()
+_worker_threads = []
+
+
+def _set_in_flight(delta: int):
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += delta
+
+
+def get_processing_stats() -> dict:
+    """Returns a snapshot of the background processing pool state."""
+    with _in_flight_lock:
+        in_flight = _in_flight
+    return {
+        "queue_depth": audio_queue.qsize(),
+        "in_flight": in_flight,
+        "worker_threads": max(1, config.AUDIO_WORKER_THREADS) if _workers_started else 0,
+        "conflict_detection_processes": config.CONFLICT_DETECTION_PROCESSES if conflict_executor else 0,
+        "jobs": db_service.count_analysis_jobs_by_status(),
+        "conflict_batches": conflict_batcher.stats() if conflict_batcher else None,
+        "category_batches": category_batcher.stats() if category_batcher else None,
+        "llm": _get_llm_usage(),
+        "speech_sessions": speech_recognition_service.stats() if speech_recognition_service else None,
+        "stages": stage_metrics.snapshot(),
+    }
+
+
+def _analyze_conflict_batch(transcriptions: list) -> list:
+    """Runs batched conflict analysis in the process pool, or inline if no pool is configured."""
+    if conflict_executor is not None:
+        return conflict_executor.submit(analyze_batch_in_worker, transcriptions).result()
+    return get_conflict_analysis_service().analyze_batch(transcriptions)
+
+
+def analyze_conflict(transcription_text: str, turns: Optional[List[str]] = None):
+    """
+    Queues a transcription for the next conflict detection micro-batch and waits for its
+    ConflictAnalysis. With the texts of its turns, their sentiment is computed in the same pass.
+    """
+    return conflict_batcher.submit(turns if turns else transcription_text).result()
+
+
+def categorize_call(company_id: int, transcription_text: str) -> Optional[int]:
+    """Queues a transcription for the next categorization batch and waits for its category id (None if uncategorized)."""
+    return category_batcher.submit((company_id, transcription_text)).result()
+
+
+def _categorize_batch(items: List[Tuple[int, str]]) -> List[Optional[int]]:
+    """
+    Categorizes a batch of (company_id, transcription) pairs with one LLM request per company.
+    The requests of the companies in the batch are sent concurrently.
+    """
+    by_company = {}
+    for i, (company_id, _) in enumerate(items):
+        by_company.setdefault(company_id, []).append(i)
+
+    def categorize_company(company_id: int, indices: List[int]) -> List[Optional[int]]:
+        categories = db_service.get_categories_by_company(company_id)
+        if not categories:
+            return [None] * len(indices)
+        # Reformat categories for the LLM prompt
+        llm_categories = [
+            {"id": cat["category_id"], "name": cat["category_name"], "description": cat["category_description"]}
+            for cat in categories
+        ]
+        return categorize_call_transcriptions_with_llm(llm_categories, [items[i][1] for i in indices])
+
+    results = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=len(by_company), thread_name_prefix="CategoryRequest") as executor:
+        futures = {executor.submit(categorize_company, company_id, indices): indices
+                   for company_id, indices in by_company.items()}
+        for future, indices in futures.items():
+            for i, category_id in zip(indices, future.result()):
+                results[i] = category_id
+    return results
+
+
+def build_call_segments(turns: List[TranscriptTurn], conflict_analysis) -> List[dict]:
+    """The call_segments rows of a call's turns, with their speaker roles and sentiment (if analyzed)."""
+    sentiments = (conflict_analysis.turn_sentiments if conflict_analysis and conflict_analysis.turn_sentiments
+                  else [(None, None)] * len(turns))
+    return [
+        {
+            "text": turn.text,
+            "speaker": turn.speaker,
+            "role": role,
+            "start_ms": int(turn.start * 1000) if turn.start is not None else None,
+            "end_ms": int(turn.end * 1000) if turn.end is not None else None,
+            "sentiment": sentiment,
+            "negative_score": negative_score,
+        }
+        for turn, role, (sentiment, negative_score) in zip(turns, assign_speaker_roles(turns), sentiments)
+    ]
+
+
+def _release_job(job_id: int):
+    with _held_job_ids_lock:
+        _held_job_ids.discard(job_id)
+
+
+def job_dispatcher():
+    """
+    Claims analysis jobs from the database in batches and feeds them to the worker threads.
+    Keeps the local buffer small so unclaimed jobs stay available to other worker processes,
+    and renews the leases of every job this process still holds.
+    """
+    logger.info("Job dispatcher started.")
+    buffer_size = max(1, config.AUDIO_WORKER_THREADS) + config.JOB_CLAIM_BATCH_SIZE
+    renew_interval = config.JOB_LEASE_SECONDS / 3
+    last_renewal = time.monotonic()
+    while True:
+        claimed = []
+        try:
+            free_slots = buffer_size - audio_queue.qsize()
+            with _claim_lock:
+                if free_slots > 0 and not _stopping.is_set():
+                    claimed = db_service.claim_analysis_jobs(
+                        min(free_slots, config.JOB_CLAIM_BATCH_SIZE), config.JOB_LEASE_SECONDS
+                    )
+                    for job in claimed:
+                        with _held_job_ids_lock:
+                            _held_job_ids.add(job['job_id'])
+                        audio_queue.put(job)
+            if claimed:
+                logger.info(f"Claimed {len(claimed)} analysis jobs. Queue size: {audio_queue.qsize()}")
+
+            if time.monotonic() - last_renewal >= renew_interval:
+                with _held_job_ids_lock:
+                    held = list(_held_job_ids)
+                db_service.renew_analysis_job_leases(held, config.JOB_LEASE_SECONDS)
+                last_renewal = time.monotonic()
+        except Exception as e:
+            logger.error(f"Job dispatcher error: {e}", exc_info=True)
+
+        # A full batch means more work is probably waiting; otherwise sleep until notified or polled
+        if len(claimed) < config.JOB_CLAIM_BATCH_SIZE:
+            job_available.wait(timeout=config.JOB_POLL_INTERVAL_SECONDS)
+            job_available.clear()
+
+
+def prepare_audio_for_transcription(call_id: int, audio_path: str) -> Tuple[Optional[str], Optional[list]]:
+    """
+    Converts an upload to 16 kHz mono WAV for the speech recognizer and, with STT_VAD_ENABLED,
+    cuts it down to its speech, recording the call's talk time. The conversion runs at most once
+    per recording: it is written to a temporary name and reused if the job is retried.
+
+    Returns:
+        (wav_path, kept_ranges): wav_path is None if the recording has no speech to transcribe.
+            kept_ranges maps times in the WAV back to the recording (see speech_time_to_source);
+            None when the WAV is not cut.
+    """
+    wav_path = os.path.splitext(audio_path)[0] + '_16k.wav'
+    # The kept ranges are saved next to the cut WAV, for retries that reuse it
+    ranges_path = os.path.splitext(wav_path)[0] + '.json'
+    kept_ranges = None
+    if not os.path.exists(wav_path):
+        partial_path = wav_path + '.part'
+        convert_to_wav(audio_path, partial_path, sample_rate=config.STT_SAMPLE_RATE, channels=1)
+        if config.STT_VAD_ENABLED:
+            with stage_metrics.time("vad"):
+                talk_seconds, total_seconds, kept_ranges = remove_silence(
+                    partial_path, partial_path,
+                    silence_thresh_dbfs=config.STT_VAD_SILENCE_THRESH_DBFS,
+                    min_silence_ms=config.STT_VAD_MIN_SILENCE_MS,
+                    padding_ms=config.STT_VAD_PADDING_MS
+                )
+            with open(ranges_path, 'w') as f:
+                json.dump(kept_ranges, f)
+            db_service.update_call_talk_duration(call_id, int(round(talk_seconds)))
+            logger.info(f"Voice activity in {audio_path}: {talk_seconds:.1f}s of {total_seconds:.1f}s")
+        os.replace(partial_path, wav_path)
+    elif os.path.exists(ranges_path):
+        with open(ranges_path) as f:
+            kept_ranges = json.load(f)
+    if kept_ranges is not None and not kept_ranges:
+        return None, kept_ranges
+    return wav_path, kept_ranges
+
 
 def audio_processing_worker():
     """Continuously process queued audio files for transcription, conflict detection, and categorization."""
     logger.info("Audio processing worker started.")
     while True:
         # Blocks here until an item is available
-        audio_path = audio_queue.get()
+        job = audio_queue.get()
+        if job is None:
+            # Stop marker queued by stop_background_tasks behind the remaining jobs
+            audio_queue.task_done()
+            return
+        audio_path = job['audio_file_path']
+        _set_in_flight(1)
         logger.info(f"Processing audio file: {audio_path}")
 
         transcription_text = None
+        turns = []
         sentiment_value = None
+        conflict_analysis = None
         category_id = None
 
         try:
-            # 1. Transcribe
+            # 1. Measure the duration from the container headers
+            with stage_metrics.time("probe"):
+                call_duration_seconds = int(probe_duration_seconds(audio_path))
+                db_service.update_call_duration(job['call_id'], call_duration_seconds)
+
+            # 2. Transcribe
             if speech_recognition_service:
-                raw_text, error_code = speech_recognition_service.speech_to_text_from_file(audio_path)
-                if error_code:
-                    logger.error(f"Transcription error for {audio_path}: {error_code}")
-                transcription_text = raw_text or ""
+                with stage_metrics.time("convert"):
+                    wav_path, kept_ranges = prepare_audio_for_transcription(job['call_id'], audio_path)
+                if wav_path is None:
+                    logger.info(f"No speech detected in {audio_path}, skipping transcription.")
+                    transcription_text = ""
+                else:
+                    with stage_metrics.time("transcribe"):
+                        raw_text, error_code, turns = speech_recognition_service.transcribe(wav_path).result()
+                    if error_code:
+                        logger.error(f"Transcription error for {audio_path}: {error_code}")
+                    transcription_text = raw_text or ""
+                    if kept_ranges:
+                        # Turn times are positions in the cut audio; store them as times in the recording
+                        turns = [turn._replace(start=speech_time_to_source(turn.start, kept_ranges),
+                                               end=speech_time_to_source(turn.end, kept_ranges))
+                                 if turn.start is not None else turn
+                                 for turn in turns]
             else:
                 logger.warning(f"Speech recognition service not available for {audio_path}")
                 transcription_text = None
 
             # Check if a transcription was successfully generated
             if transcription_text is not None and transcription_text.strip():
-                # 2. Conflict detection
+                # 3. Conflict detection
                 try:
-                    sentiment_value = conflict_analysis_service.detect_conflict(transcription_text)
-                    logger.info(f"Conflict detection result for {audio_path}: {sentiment_value}")
+                    with stage_metrics.time("conflict_detection"):
+                        conflict_analysis = analyze_conflict(transcription_text, [turn.text for turn in turns])
+                    sentiment_value = conflict_analysis.label
+                    logger.info(f"Conflict detection result for {audio_path}: {sentiment_value} "
+                                f"({conflict_analysis.chunk_count} chunks)")
                 except Exception as conflict_e:
                     logger.error(f"Conflict detection error for {audio_path}: {conflict_e}")
                     sentiment_value = None
+                    conflict_analysis = None
 
-                # 3. Categorize
+                # 4. Categorize
                 try:
                     employee_id = int(os.path.basename(audio_path).split('_')[0])
                     company_id = db_service.get_company_id_by_employee_id(employee_id)
                     if company_id:
-                        categories = db_service.get_categories_by_company(company_id)
-                        # Reformat categories for the LLM prompt
-                        llm_categories = [
-                            {"id": cat["category_id"], "name": cat["category_name"],
-                             "description": cat["category_description"]}
-                            for cat in categories
-                        ]
-
-                        llm_response_text = categorize_call_transcription_with_llm(llm_categories, transcription_text)
-
-                        category_id = None
-                        try:
-                            category_id = int(llm_response_text)
-                            if category_id == 0:
-                                category_id = None
-                        except json.JSONDecodeError:
-                            print(f"Could not convert '{llm_response_text}' to an integer. Setting category_id to None.")
-
+                        with stage_metrics.time("categorize"):
+                            category_id = categorize_call(company_id, transcription_text)
                         logger.info(f"Categorization result for {audio_path}: {category_id}")
                     else:
                         logger.warning(f"Company ID not found for employee {employee_id}, skipping categorization.")
@@ -80,38 +329,191 @@ def audio_processing_worker():
             else:
                 logger.info(f"Skipping analysis for {audio_path} due to empty transcription.")
 
-            # 4. Update database record with all analysis results
-            db_service.update_call_analysis(audio_path, transcription_text, sentiment_value, category_id)
+            # 5. Update database record with all analysis results
+            if turns:
+                db_service.replace_call_segments(job['call_id'], build_call_segments(turns, conflict_analysis))
+            db_service.update_call_analysis(
+                job['call_id'], transcription_text, sentiment_value, category_id,
+                conflict_score=conflict_analysis.negative_score if conflict_analysis else None,
+                conflict_segment_start=conflict_analysis.segment_start if conflict_analysis else None,
+                conflict_segment_end=conflict_analysis.segment_end if conflict_analysis else None
+            )
+            db_service.complete_analysis_job(job['job_id'])
             logger.info(f"Database updated for audio file: {audio_path}")
 
+            # 6. Keep only the compact Opus master (the storage sweep retries on failure)
+            try:
+                with stage_metrics.time("archive"):
+                    archive_recording(job['call_id'], audio_path)
+            except Exception as archive_e:
+                logger.error(f"Could not archive {audio_path}: {archive_e}")
+
         except Exception as e:
-            logger.error(f"Unhandled error processing audio {audio_path}: {e}", exc_info=True)
+            logger.error(f"Unhandled error processing audio {audio_path} (attempt {job['attempts']}): {e}",
+                         exc_info=True)
+            try:
+                db_service.fail_analysis_job(job['job_id'], str(e), config.JOB_MAX_ATTEMPTS)
+            except Exception as fail_e:
+                # The lease will expire and the job will be claimed again
+                logger.error(f"Could not record failure of job {job['job_id']}: {fail_e}")
 
         finally:
+            _release_job(job['job_id'])
+            _set_in_flight(-1)
             audio_queue.task_done()
             logger.debug(f"Task done for audio file: {audio_path}")
 
 
+def warm_up_models():
+    """Loads the conflict detection models ahead of the first analysis job."""
+    start = time.monotonic()
+    try:
+        if conflict_executor is not None:
+            # Best effort: the pool decides which process runs each warm-up call
+            futures = [conflict_executor.submit(warm_up_worker) for _ in range(config.CONFLICT_DETECTION_PROCESSES)]
+            warmed = len({future.result() for future in futures})
+        else:
+            get_conflict_analysis_service()
+            warmed = 1
+        logger.info(f"Conflict detection models loaded in {warmed} process(es) in {time.monotonic() - start:.1f}s.")
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {e}", exc_info=True)
+
+
 def start_background_tasks():
-    """Starts the background worker threads."""
-    # daemon=True ensures the thread exits when the main process exits
-    threading.Thread(target=audio_processing_worker, daemon=True, name="AudioWorker").start()
+    """Starts the conflict detection process pool, the job dispatcher, the audio worker threads
+    and the recording storage sweeper."""
+    global conflict_executor, conflict_batcher, category_batcher, _workers_started
+    if _workers_started:
+        return
+    _workers_started = True
+
+    if config.CONFLICT_DETECTION_PROCESSES > 0 and conflict_executor is None:
+        # fork instead of spawn: spawn re-imports the main module (run.py builds the app at import time)
+        conflict_executor = ProcessPoolExecutor(
+            max_workers=config.CONFLICT_DETECTION_PROCESSES,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=init_conflict_worker,
+            initargs=(config.CONFLICT_BATCH_SIZE, config.CONFLICT_CHUNK_MAX_TOKENS,
+                      config.CONFLICT_INFERENCE_BACKEND, config.ONNX_MODEL_DIR)
+        )
+        # With fork the pool processes are created on the first submit; do it now,
+        # before the worker threads exist, so no thread state is forked.
+        conflict_executor.submit(os.getpid)
+
+    if conflict_batcher is None:
+        conflict_batcher = MicroBatcher(
+            _analyze_conflict_batch,
+            max_batch_size=config.CONFLICT_BATCH_SIZE,
+            max_wait_seconds=config.CONFLICT_BATCH_MAX_WAIT_SECONDS,
+            # Keep every pool process busy with its own batch
+            concurrency=max(1, config.CONFLICT_DETECTION_PROCESSES),
+            # Each worker thread waits for its analysis, so a batch never holds more than one call per thread
+            producers=max(1, config.AUDIO_WORKER_THREADS),
+            name="ConflictBatcher"
+        )
+    if category_batcher is None:
+        category_batcher = MicroBatcher(
+            _categorize_batch,
+            max_batch_size=config.CATEGORIZE_BATCH_SIZE,
+            max_wait_seconds=config.CATEGORIZE_BATCH_MAX_WAIT_SECONDS,
+            producers=max(1, config.AUDIO_WORKER_THREADS),
+            name="CategoryBatcher"
+        )
+
+    requeued = db_service.requeue_unfinished_analysis_jobs()
+    if requeued:
+        logger.info(f"Re-enqueued {requeued} call records that were never analyzed.")
+    threading.Thread(target=job_dispatcher, daemon=True, name="JobDispatcher").start()
+
+    for i in range(max(1, config.AUDIO_WORKER_THREADS)):
+        # daemon=True ensures the thread exits when the main process exits
+        worker = threading.Thread(target=audio_processing_worker, daemon=True, name=f"AudioWorker-{i}")
+        worker.start()
+        _worker_threads.append(worker)
+    logger.info(f"Started {max(1, config.AUDIO_WORKER_THREADS)} audio worker threads and "
+                f"{config.CONFLICT_DETECTION_PROCESSES} conflict detection processes.")
+
+    threading.Thread(target=retention_sweeper, daemon=True, name="RetentionSweeper").start()
+
+    if config.WARM_UP_MODELS:
+        threading.Thread(target=warm_up_models, daemon=True, name="ModelWarmUp").start()
+
+
+def stop_background_tasks(timeout_seconds: float):
+    """
+    Graceful shutdown of the analysis workers: stops claiming jobs, lets the worker threads finish
+    the jobs this process already holds for up to timeout_seconds, then returns the jobs nobody
+    started to the queue so another worker picks them up right away. Jobs still running at the
+    deadline are retried by another worker once their lease expires.
+    """
+    if not _workers_started or _stopping.is_set():
+        return
+    with _claim_lock:
+        _stopping.set()
+    logger.info(f"Draining {audio_queue.qsize()} queued analysis jobs (up to {timeout_seconds:.0f}s)...")
+    for _ in _worker_threads:
+        audio_queue.put(None)
+
+    deadline = time.monotonic() + timeout_seconds
+    for worker in _worker_threads:
+        worker.join(max(0.0, deadline - time.monotonic()))
+
+    released = []
+    while True:
+        try:
+            job = audio_queue.get_nowait()
+        except queue.Empty:
+            break
+        if job is not None:
+            released.append(job['job_id'])
+            _release_job(job['job_id'])
+        audio_queue.task_done()
+    if released:
+        db_service.release_analysis_jobs(released)
+
+    with _held_job_ids_lock:
+        unfinished = len(_held_job_ids)
+    logger.info(f"Analysis workers stopped: {len(released)} jobs released to other workers, "
+                f"{unfinished} still running.")
+
+
+@functools.lru_cache(maxsize=None)
+def load_prompt(name: str) -> str:
+    """Reads a prompt template from the prompt directory; each template is read once per process."""
+    with open(os.path.join(PROMPT_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _generate(gemini, prompt: str, **kwargs):
+    """Sends one request to the LLM and records it (and its token counts) in the usage totals."""
+    response = gemini.generate_content(prompt, **kwargs)
+    usage = getattr(response, 'usage_metadata', None)
+    with _llm_usage_lock:
+        _llm_usage["requests"] += 1
+        if usage is not None:
+            _llm_usage["prompt_tokens"] += usage.prompt_token_count or 0
+            _llm_usage["output_tokens"] += usage.candidates_token_count or 0
+    return response
+
+
+def _get_llm_usage() -> dict:
+    with _llm_usage_lock:
+        return dict(_llm_usage)
 
 
 def summarize_with_llm(transcriptions: str) -> str:
+    gemini = get_gemini()
     if not gemini:
         logging.warning("Gemini service is not available or not configured.")
         return "Error"
 
     try:
-
-        with open('/home/pedro-ayon/dev/hackatec/CallConflictDetectionSaaS/Server/prompt/summarize_prompt.md', 'r',
-                  encoding='utf-8') as f:
-            prompt_template = f.read()
+        prompt_template = load_prompt('summarize_prompt.md')
 
         full_prompt = prompt_template.format(transcriptions_text=transcriptions)
 
-        response = gemini.generate_content(full_prompt)
+        response = _generate(gemini, full_prompt)
 
         return response.text
 
@@ -125,31 +527,36 @@ def summarize_with_llm(transcriptions: str) -> str:
         return error_msg
 
 
-def categorize_call_transcription_with_llm(categories, transcription):
+def categorize_call_transcriptions_with_llm(categories: List[dict], transcriptions: List[str]) -> List[Optional[int]]:
+    """
+    Categorizes several calls of one company with a single structured-output request.
+    Returns the category id of each transcription, in order; None when a call fits no category,
+    the answer has no valid id for it, or the request fails.
+    """
+    gemini = get_gemini()
     if not gemini:
         logging.warning("Gemini service is not available or not configured.")
-        return "Error"
+        return [None] * len(transcriptions)
     try:
+        prompt_template = load_prompt('categorize_prompt.md')
 
-        with open('/home/pedro-ayon/dev/hackatec/CallConflictDetectionSaaS/Server/prompt/categorize_prompt.md', 'r',
-                  encoding='utf-8') as f:
-            prompt_template = f.read()
-
-        input = f"""
-        Categories: {json.dumps(categories, indent=2)}
-        Transcription: {transcription}
-        """
+        calls = "\n".join(f"Call {number}: {transcription}"
+                           for number, transcription in enumerate(transcriptions, start=1))
+        input = f"Categories: {json.dumps(categories, ensure_ascii=False)}\n{calls}\n"
         full_prompt = prompt_template + input
 
-        response = gemini.generate_content(full_prompt)
+        response = _generate(gemini, full_prompt, generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": CATEGORIZATION_SCHEMA,
+        })
 
-        return response.text
+        answers = {answer["call"]: answer["category_id"] for answer in json.loads(response.text)}
+        valid_ids = {category["id"] for category in categories}
+        return [answers.get(number) if answers.get(number) in valid_ids else None
+                for number in range(1, len(transcriptions) + 1)]
 
     except FileNotFoundError:
-        error_msg = "Error: No prompt'."
-        logging.error(error_msg)
-        return error_msg
+        logging.error("Error: No prompt'.")
     except Exception as e:
-        error_msg = f"Error: {e}"
-        logging.error(error_msg)
-        return error_msg
+        logging.error(f"Error: {e}")
+    return [None] * len(transcriptions)
@@ -0,0 +1,62 @@
+# app/uploads.py
+import hashlib
+import os
+import tempfile
+
+from flask import Request
+
+from config import config
+
+
+class HashingUploadFile:
+    """
+    Destination for an uploaded file part. Werkzeug streams the part into it chunk by chunk
+    while its SHA-256 is computed, so the upload is written to disk exactly once and never
+    held in memory. The temp file lives in RECORDINGS_DIR, so persist() is a rename.
+    Unless persisted, the temp file is deleted when the request closes its files.
+    """
+
+    def __init__(self, directory: str):
+        # Set first: __del__ still runs (and __getattr__ would recurse on a missing _file) if mkstemp raises
+        self._file = None
+        fd, self.name = tempfile.mkstemp(dir=directory, prefix='.upload-', suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+        self._persisted = False
+
+    def write(self, data: bytes) -> int:
+        self._sha256.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+    def persist(self, path: str):
+        """Moves the uploaded file to its final path."""
+        self._file.close()
+        os.replace(self.name, path)
+        self._persisted = True
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        if not self._persisted and os.path.exists(self.name):
+            os.remove(self.name)
+
+    def __del__(self):
+        # The parser may abort mid-upload (e.g. 413) before the request closes its files
+        self.close()
+
+    def __getattr__(self, name):
+        # read/seek/tell/flush go to the underlying file
+        return getattr(self._file, name)
+
+
+class StreamingUploadRequest(Request):
+    """Request class that streams uploaded files into HashingUploadFile objects."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingUploadFile(config.RECORDINGS_DIR)
@@ -0,0 +1,32 @@
+# asgi.py
+from config import config
+
+if __name__ == '__main__':
+    # Production server: `python asgi.py`. Each of the WEB_WORKERS processes imports this module
+    # and builds its own app; the supervisor process only manages them.
+    import uvicorn
+
+    uvicorn.run(
+        "asgi:application",
+        host=config.HOST,
+        port=config.PORT,
+        workers=config.WEB_WORKERS,
+        # In-flight requests get this long to finish before the analysis queue is drained
+        timeout_graceful_shutdown=30,
+        log_level="debug" if config.DEBUG else "info"
+    )
+else:
+    # Imported by the server (also usable as `uvicorn asgi:application` with other server options)
+    from app import create_app
+    from app.asgi import FlaskAsgiApp
+
+    # Web processes only enqueue analysis jobs: each of the WEB_WORKERS processes would otherwise
+    # start its own conflict detection pool, batchers, dispatcher and models. Run `python worker.py`
+    # next to the server to process the jobs.
+    config.RUN_ANALYSIS_WORKERS = False
+
+    application = FlaskAsgiApp(
+        create_app(config_object=config),
+        threads=config.WEB_THREADS,
+        shutdown_drain_seconds=config.SHUTDOWN_DRAIN_SECONDS
+    )
@@ -11,10 +11,70 @@ class Config:
     SCHEMA_PATH = os.getenv("SCHEMA_PATH", "schema.sql")
     RECORDINGS_DIR = os.getenv("RECORDINGS_DIR", "recordings")
 
+    # --- Database ---
+    # Read-only connections kept open per process (writes share a single connection)
+    DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", 4))
+    # How long a write waits for another process holding the write lock
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+    DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", 16384))
+    DB_MMAP_SIZE_MB = int(os.getenv("DB_MMAP_SIZE_MB", 128))
+    # Threads running database calls for async views; more than the number of pooled
+    # connections only adds threads waiting for a connection
+    DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", DB_READ_POOL_SIZE + 1))
+    # In-process cache of the per-request auth lookups (user last_updated, employee -> company) and
+    # of each company's categories; a TTL of 0 disables it. Writes made by another process (e.g. a
+    # password change served by another web worker) are picked up within AUTH_CACHE_SYNC_SECONDS,
+    # when each process checks the database's change counters (0 = on every lookup).
+    AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", 30))
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 10000))
+    AUTH_CACHE_SYNC_SECONDS = float(os.getenv("AUTH_CACHE_SYNC_SECONDS", 1.0))
+
     # --- Azure Speech ---
     AZURE_SPEECH_API_KEY = os.getenv("AZURE_SPEECH_API_KEY")
     AZURE_SERVICE_REGION = os.getenv("AZURE_SERVICE_REGION")
     SPEECH_LANG = os.getenv("SPEECH_LANG", "en-US")
+    # Uploads are converted to mono WAV at this sample rate before transcription
+    STT_SAMPLE_RATE = int(os.getenv("STT_SAMPLE_RATE", 16000))
+    # Voice activity detection: only the speech of a call is sent to speech-to-text. Frames
+    # quieter than the threshold are silence; silences of at least STT_VAD_MIN_SILENCE_MS are cut,
+    # keeping STT_VAD_PADDING_MS around the speech on each side
+    STT_VAD_ENABLED = os.getenv('STT_VAD_ENABLED', 'True').lower() == 'true'
+    STT_VAD_SILENCE_THRESH_DBFS = float(os.getenv("STT_VAD_SILENCE_THRESH_DBFS", -40.0))
+    STT_VAD_MIN_SILENCE_MS = int(os.getenv("STT_VAD_MIN_SILENCE_MS", 1000))
+    STT_VAD_PADDING_MS = int(os.getenv("STT_VAD_PADDING_MS", 200))
+    # Speech-to-text engine: azure, whisper (local CPU transcription, needs faster-whisper) or
+    # local (an offline stand-in that paces WAV files like the service, for load tests)
+    STT_ENGINE = os.getenv("STT_ENGINE", "azure").lower()
+    # Separate the speakers of a call (azure and local engines): each turn is tagged agent or
+    # customer and gets its own sentiment in call_segments
+    STT_DIARIZATION = os.getenv('STT_DIARIZATION', 'True').lower() == 'true'
+    # Concurrent recognition sessions; transcriptions beyond that wait for a free session
+    STT_MAX_SESSIONS = int(os.getenv("STT_MAX_SESSIONS", 4))
+    # Sessions still running after this long are stopped and the job fails with a timeout
+    STT_SESSION_TIMEOUT_SECONDS = float(os.getenv("STT_SESSION_TIMEOUT_SECONDS", 1800))
+    # Time the local stand-in takes per second of audio (1.0 = real time)
+    STT_LOCAL_REALTIME_FACTOR = float(os.getenv("STT_LOCAL_REALTIME_FACTOR", 1.0))
+    # Whisper model size (tiny, base, small, medium, large-v3, distil-large-v3, ...) or the path of
+    # a CTranslate2 model; downloaded models are cached in STT_WHISPER_MODEL_DIR
+    STT_WHISPER_MODEL = os.getenv("STT_WHISPER_MODEL", "small")
+    STT_WHISPER_MODEL_DIR = os.getenv("STT_WHISPER_MODEL_DIR", "models/whisper")
+    # Weight quantization: int8, int8_float32 or float32
+    STT_WHISPER_COMPUTE_TYPE = os.getenv("STT_WHISPER_COMPUTE_TYPE", "int8")
+    # Threads per concurrent session; 0 splits the CPU cores between the STT_MAX_SESSIONS sessions
+    STT_WHISPER_CPU_THREADS = int(os.getenv("STT_WHISPER_CPU_THREADS", 0))
+    # Speech chunks of one call decoded together, and the beam width (1 = greedy, fastest)
+    STT_WHISPER_BATCH_SIZE = int(os.getenv("STT_WHISPER_BATCH_SIZE", 8))
+    STT_WHISPER_BEAM_SIZE = int(os.getenv("STT_WHISPER_BEAM_SIZE", 1))
+
+    # --- Recording Storage ---
+    # After analysis, recordings are kept as a mono Opus/OGG master and intermediate files are deleted
+    RECORDING_OPUS_BITRATE = os.getenv("RECORDING_OPUS_BITRATE", "32k")
+    # Masters older than this are re-encoded at a lower bitrate
+    RECORDING_COLD_AFTER_DAYS = int(os.getenv("RECORDING_COLD_AFTER_DAYS", 90))
+    RECORDING_COLD_OPUS_BITRATE = os.getenv("RECORDING_COLD_OPUS_BITRATE", "16k")
+    # Recordings older than this are deleted (the call record is kept); 0 keeps them forever
+    RECORDING_RETENTION_DAYS = int(os.getenv("RECORDING_RETENTION_DAYS", 0))
+    RECORDING_SWEEP_INTERVAL_HOURS = float(os.getenv("RECORDING_SWEEP_INTERVAL_HOURS", 24))
 
     # --- File Upload ---
     ALLOWED_AUDIO_EXTENSIONS = {'wav', 'mp3', 'm4a', 'ogg', 'flac', 'aac', 'mp4'}
@@ -29,10 +89,54 @@ class Config:
     DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     HOST = os.getenv('HOST', '0.0.0.0')
     PORT = int(os.getenv('PORT', 5000))
+    # Production server (python asgi.py): worker processes, and threads per process running the
+    # Flask app. Async views run on each process's event loop.
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', 2))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', 16))
 
     # --- Gemini ---
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', None)
     GEMINI_GENERATIVE_MODEL = os.getenv('GEMINI_GENERATIVE_MODEL', 'gemini-1.5-flash')
+    # Calls of the same company are categorized together, in one request of up to
+    # CATEGORIZE_BATCH_SIZE transcriptions (requests of different companies are sent concurrently).
+    # A batch waits at most CATEGORIZE_BATCH_MAX_WAIT_SECONDS to fill, and is sent right away once
+    # every worker thread is waiting on it
+    CATEGORIZE_BATCH_SIZE = int(os.getenv('CATEGORIZE_BATCH_SIZE', 8))
+    CATEGORIZE_BATCH_MAX_WAIT_SECONDS = float(os.getenv('CATEGORIZE_BATCH_MAX_WAIT_SECONDS', 1.0))
+
+    # --- Background Processing ---
+    # Threads draining the audio queue (STT and LLM calls are I/O bound)
+    AUDIO_WORKER_THREADS = int(os.getenv('AUDIO_WORKER_THREADS', 4))
+    # Processes running ConflictDetector inference; 0 runs it inline in the worker threads
+    CONFLICT_DETECTION_PROCESSES = int(os.getenv('CONFLICT_DETECTION_PROCESSES', 1))
+    # Transcriptions are analyzed in micro-batches of up to CONFLICT_BATCH_SIZE texts (also the
+    # inference batch size of the chunks of long transcriptions). A batch waits at most
+    # CONFLICT_BATCH_MAX_WAIT_SECONDS to fill, and is analyzed right away once every worker thread
+    # not blocked on another batch is waiting on it
+    CONFLICT_BATCH_SIZE = int(os.getenv('CONFLICT_BATCH_SIZE', 8))
+    CONFLICT_BATCH_MAX_WAIT_SECONDS = float(os.getenv('CONFLICT_BATCH_MAX_WAIT_SECONDS', 0.5))
+    # Long transcriptions are translated in sentence chunks of at most this many tokens
+    CONFLICT_CHUNK_MAX_TOKENS = int(os.getenv('CONFLICT_CHUNK_MAX_TOKENS', 256))
+    # Inference backend: torch, torch-int8, onnx or onnx-int8 (onnx needs optimum[onnxruntime])
+    CONFLICT_INFERENCE_BACKEND = os.getenv('CONFLICT_INFERENCE_BACKEND', 'torch')
+    ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', 'models/onnx')
+    # Models are loaded on the first analysis job; set to preload them in the background at startup
+    WARM_UP_MODELS = os.getenv('WARM_UP_MODELS', 'False').lower() == 'true'
+
+    # Run the analysis workers inside the development server (run.py). Set to False when running
+    # separate `python worker.py` processes, so the web process only enqueues jobs. The production
+    # server (asgi.py) never runs them: its web processes only enqueue, and worker.py analyzes.
+    RUN_ANALYSIS_WORKERS = os.getenv('RUN_ANALYSIS_WORKERS', 'True').lower() == 'true'
+
+    # --- Analysis Job Queue ---
+    # Jobs are claimed in batches; a claim is a lease renewed while the job is held
+    JOB_CLAIM_BATCH_SIZE = int(os.getenv('JOB_CLAIM_BATCH_SIZE', 8))
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 120))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    JOB_POLL_INTERVAL_SECONDS = float(os.getenv('JOB_POLL_INTERVAL_SECONDS', 5))
+    # On shutdown, workers finish the jobs already claimed for up to this long; jobs not started
+    # by then are handed back to the queue
+    SHUTDOWN_DRAIN_SECONDS = float(os.getenv('SHUTDOWN_DRAIN_SECONDS', 60))
 
     # --- Ensure recordings directory exists ---
     os.makedirs(RECORDINGS_DIR, exist_ok=True)
@@ -0,0 +1,89 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from db.database import Database
+
+
+class AsyncDatabase:
+    """
+    Awaitable access to a Database for async views.
+
+    Every public Database method is available as a coroutine with the same signature, e.g.
+    `await async_db.get_user(username)`. Calls run on a dedicated, bounded thread pool rather
+    than the event loop's default executor, so database work neither competes with other
+    blocking I/O for threads nor piles up more threads than there are pooled connections.
+    batch() runs several calls in a single hop. The wrapped Database stays usable synchronously
+    (analysis worker, seeder, maintenance scripts).
+    """
+
+    def __init__(self, db: Database, max_workers: int = 5):
+        self.db = db
+        self.max_workers = max(1, max_workers)
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._in_flight = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._pid != os.getpid():
+            # Executor threads do not survive a fork; start a new pool in the child
+            self._reset()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="db")
+            return self._executor
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Runs func(*args, **kwargs) on the database executor and returns its result."""
+        executor = self._get_executor()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    async def batch(self, *calls: Callable[[], Any]) -> List[Any]:
+        """
+        Runs zero-argument callables (typically functools.partial of Database methods) one after
+        another on a single executor thread and returns their results in order. Their reads share
+        one pooled connection and a consistent snapshot; an exception aborts the remaining calls.
+        The calls must only read: a write raises RuntimeError (await it separately, before the batch).
+        """
+        def run_all():
+            with self.db.read_snapshot():
+                return [call() for call in calls]
+        return await self.run(run_all)
+
+    def stats(self) -> Dict[str, int]:
+        """Executor size and the number of calls submitted but not yet finished (running or queued)."""
+        with self._lock:
+            return {"workers": self.max_workers, "in_flight": self._in_flight}
+
+    def close(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __getattr__(self, name: str):
+        method = getattr(self.db, name)
+        if name.startswith('_') or not callable(method):
+            raise AttributeError(f"{type(self).__name__} only exposes Database methods; use .db.{name}")
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+
+        # Cache the wrapper so later lookups skip __getattr__
+        setattr(self, name, call)
+        return call
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire `ttl_seconds` after they were stored.
+    A ttl_seconds or max_entries of 0 disables caching (every lookup misses).
+
+    Invalidating bumps the cache's generation: a value read from the database before an
+    invalidation may be stale, so set() drops it when given the generation seen before the read.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """Returns (True, value) for a fresh entry, (False, None) otherwise."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return False, None
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,163 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+
+class ConnectionPool:
+    """
+    Reusable SQLite connections for one database file, split into a single writer and a
+    bounded pool of readers.
+
+    The database runs in WAL mode, so readers see the last committed state and never wait
+    for the writer. Writes are serialized in-process by the writer lock; other processes
+    (e.g. a standalone analysis worker) are arbitrated by SQLite's busy_timeout.
+    Connections are re-created after a fork, since they cannot be shared between processes.
+    """
+
+    def __init__(
+            self,
+            db_path: str,
+            read_pool_size: int = 4,
+            busy_timeout_ms: int = 5000,
+            cache_size_kb: int = 16384,
+            mmap_size_bytes: int = 128 * 1024 * 1024
+    ):
+        self.db_path = db_path
+        self.read_pool_size = max(1, read_pool_size)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size_bytes = mmap_size_bytes
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._readers = queue.LifoQueue()
+        self._readers_created = 0
+        self._readers_lock = threading.Lock()
+        self._all_connections: List[sqlite3.Connection] = []
+        # Reader pinned to a thread by snapshot()
+        self._local = threading.local()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # Inherited connections belong to the parent; drop them without closing
+            self._reset()
+
+    def _connect(self, read_only: bool) -> sqlite3.Connection:
+        conn = self._open(read_only)
+        self._all_connections.append(conn)
+        return conn
+
+    def _open(self, read_only: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA foreign_keys = ON;")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)};")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)};")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size_bytes)};")
+        conn.execute("PRAGMA temp_store = MEMORY;")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON;")
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Exclusive use of the writer connection; commits on success, rolls back on error."""
+        self._check_pid()
+        if getattr(self._local, "reader", None) is not None:
+            # The write would commit outside the snapshot, which later reads in the block can't see
+            raise RuntimeError("Writes are not allowed inside a read snapshot")
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = self._connect(read_only=False)
+            conn = self._writer
+            try:
+                yield conn
+                if conn.in_transaction:
+                    conn.commit()
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """A read-only connection from the pool; blocks while all readers are checked out."""
+        self._check_pid()
+        pinned = getattr(self._local, "reader", None)
+        if pinned is not None:
+            yield pinned
+            return
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._readers_lock:
+                create = self._readers_created < self.read_pool_size
+                if create:
+                    self._readers_created += 1
+            if not create:
+                conn = self._readers.get()
+            else:
+                try:
+                    conn = self._connect(read_only=True)
+                except Exception:
+                    with self._readers_lock:
+                        self._readers_created -= 1
+                    raise
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    @contextmanager
+    def dedicated_reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        A read-only connection of its own, outside the pool, closed when the block exits. For
+        reads paced by a client (e.g. a streamed export), which would otherwise keep a pooled
+        reader checked out and make every other read wait for it.
+        """
+        self._check_pid()
+        conn = self._open(read_only=True)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def snapshot(self) -> Iterator[sqlite3.Connection]:
+        """
+        Pins one reader to the calling thread inside a read transaction: every reader() used in
+        the block returns it, so the reads share one checkout and see the same committed state
+        (the state as of the block's first read). Nested blocks reuse the outer snapshot.
+        The block is read-only: writer() raises RuntimeError inside it.
+        """
+        self._check_pid()
+        pinned = getattr(self._local, "reader", None)
+        if pinned is not None:
+            yield pinned
+            return
+        with self.reader() as conn:
+            conn.execute("BEGIN")
+            self._local.reader = conn
+            try:
+                yield conn
+            finally:
+                self._local.reader = None
+
+    def close(self):
+        """Closes every connection opened by this process."""
+        if self._pid != os.getpid():
+            return
+        with self._writer_lock:
+            for conn in self._all_connections:
+                conn.close()
+            self._reset()
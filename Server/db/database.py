@@ -1,27 +1,171 @@
+import math
+import os
 import sqlite3
+import threading
+import time
 from datetime import datetime, timezone
-from typing import List, Optional, Dict
+from typing import ContextManager, Iterator, List, Optional, Dict, Tuple
 
 from werkzeug.security import generate_password_hash, check_password_hash
 
+from db.cache import TTLCache
+from db.connection_pool import ConnectionPool
+
+# Versioned migrations applied on top of schema.sql, named "<version>_<description>.sql"
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def unix_seconds(timestamp: str) -> int:
+    """
+    Unix epoch seconds (call_ts) of an ISO 8601 timestamp, parsed like the routes validate it:
+    'Z' and offsets such as +0000 are accepted, and times without an offset are UTC (as in
+    SQLite). SQLite's strftime('%s') can't parse every such value, so it is done in Python.
+    Raises ValueError for an invalid timestamp.
+    """
+    moment = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return math.floor(moment.timestamp())
+
+
+def _sql_unix_seconds(timestamp: Optional[str]) -> Optional[int]:
+    """unix_seconds as an SQL function for migrations: NULL instead of an error for invalid values."""
+    try:
+        return unix_seconds(timestamp)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
 
 class Database:
-    def __init__(self, db_path: str = "database.sqlite", schema_path: str = "schema.sql"):
+    def __init__(
+            self,
+            db_path: str = "database.sqlite",
+            schema_path: str = "schema.sql",
+            read_pool_size: int = 4,
+            busy_timeout_ms: int = 5000,
+            cache_size_kb: int = 16384,
+            mmap_size_bytes: int = 128 * 1024 * 1024,
+            lookup_cache_ttl_seconds: float = 30.0,
+            lookup_cache_max_entries: int = 10000,
+            lookup_cache_sync_seconds: float = 1.0
+    ):
         self.db_path = db_path
         self.schema_path = schema_path
+        self._pool = ConnectionPool(db_path, read_pool_size, busy_timeout_ms, cache_size_kb, mmap_size_bytes)
+        # Per-request auth lookups. Writes through this object invalidate them right away; writes
+        # made by other processes (or other Database objects) are picked up by sync_lookup_caches
+        # within lookup_cache_sync_seconds.
+        self.user_last_updated_cache = TTLCache(lookup_cache_max_entries, lookup_cache_ttl_seconds)
+        self.employee_company_cache = TTLCache(lookup_cache_max_entries, lookup_cache_ttl_seconds)
+        # Categories of each company, read for every categorized call
+        self.company_categories_cache = TTLCache(lookup_cache_max_entries, lookup_cache_ttl_seconds)
+        # cache_versions row -> the caches holding rows of that table
+        self._cached_tables = {
+            "users": (self.user_last_updated_cache,),
+            "employees": (self.employee_company_cache,),
+            "categories": (self.company_categories_cache,),
+        }
+        self.lookup_cache_sync_seconds = lookup_cache_sync_seconds
+        self._cache_versions: Dict[str, int] = {}
+        self._caches_synced_at = float("-inf")
+        self._cache_sync_lock = threading.Lock()
         self._init_db()
 
-    def _get_connection(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON;")
-        return conn
+    def _get_connection(self) -> ContextManager[sqlite3.Connection]:
+        """The writer connection: one writer at a time, committed when the block exits."""
+        return self._pool.writer()
+
+    def _get_read_connection(self) -> ContextManager[sqlite3.Connection]:
+        """A pooled read-only connection; reads never wait for the writer (WAL)."""
+        return self._pool.reader()
+
+    def _get_dedicated_read_connection(self) -> ContextManager[sqlite3.Connection]:
+        """A read-only connection outside the pool, for long reads paced by a client."""
+        return self._pool.dedicated_reader()
+
+    def read_snapshot(self) -> ContextManager[sqlite3.Connection]:
+        """Reads made by this thread inside the block share one connection and one consistent snapshot."""
+        return self._pool.snapshot()
+
+    def close(self):
+        self._pool.close()
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        return {
+            "user_last_updated": self.user_last_updated_cache.stats(),
+            "employee_company": self.employee_company_cache.stats(),
+            "company_categories": self.company_categories_cache.stats(),
+        }
+
+    def lookup_caches_current(self) -> bool:
+        """Whether the lookup caches were checked for other processes' writes within lookup_cache_sync_seconds."""
+        return time.monotonic() - self._caches_synced_at < self.lookup_cache_sync_seconds
+
+    def sync_lookup_caches(self, force: bool = False):
+        """
+        Clears the lookup caches of tables written since the last check, by any process: the
+        cache_versions counters are bumped by triggers on every write. Unless forced, checks at
+        most once per lookup_cache_sync_seconds, so a write made elsewhere can be served stale
+        for up to that long (plus the time of a request already past the check).
+        """
+        if not force and self.lookup_caches_current():
+            return
+        with self._cache_sync_lock:
+            if not force and self.lookup_caches_current():
+                return
+            checked_at = time.monotonic()
+            with self._get_read_connection() as conn:
+                rows = conn.execute("SELECT name, version FROM cache_versions").fetchall()
+            versions = {row['name']: row['version'] for row in rows}
+            for name, caches in self._cached_tables.items():
+                if versions.get(name) != self._cache_versions.get(name):
+                    for cache in caches:
+                        cache.clear()
+            self._cache_versions = versions
+            self._caches_synced_at = checked_at
 
     def _init_db(self):
-        conn = self._get_connection()
-        with conn:
+        with self._get_connection() as conn:
             with open(self.schema_path, 'r') as f:
                 conn.executescript(f.read())
+            self._apply_migrations(conn)
+
+    @staticmethod
+    def _split_sql_statements(script: str) -> List[str]:
+        """Splits a SQL script into complete statements (trigger bodies are kept whole)."""
+        statements, current = [], ""
+        for line in script.splitlines(keepends=True):
+            current += line
+            if sqlite3.complete_statement(current):
+                statements.append(current.strip())
+                current = ""
+        if current.strip():
+            statements.append(current.strip())
+        return statements
+
+    def _apply_migrations(self, conn: sqlite3.Connection):
+        """
+        Applies the migrations newer than the database's PRAGMA user_version, each in its own
+        transaction. The write lock is taken before checking the version, so processes starting
+        at the same time never apply a migration twice.
+        """
+        if not os.path.isdir(MIGRATIONS_DIR):
+            return
+        migrations = sorted(
+            (int(name.split('_', 1)[0]), name)
+            for name in os.listdir(MIGRATIONS_DIR) if name.endswith('.sql')
+        )
+        conn.create_function("unix_seconds", 1, _sql_unix_seconds, deterministic=True)
+        for version, name in migrations:
+            with open(os.path.join(MIGRATIONS_DIR, name), 'r') as f:
+                script = f.read()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    continue
+                for statement in self._split_sql_statements(script):
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version}")
 
     def add_user(self, username: str, password: str):
         hashed_password = generate_password_hash(password)
@@ -31,10 +175,11 @@ class Database:
                 "INSERT OR IGNORE INTO users (username, password, last_updated) VALUES (?, ?, ?)",
                 (username, hashed_password, last_updated)
             )
+        self.user_last_updated_cache.invalidate(username)
 
     def get_user(self, username: str) -> Optional[Dict]:
         """Fetches a user by username (only username, no password info). For dev/debug."""
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT username FROM users WHERE username = ?",  # Does not select password
@@ -49,7 +194,7 @@ class Database:
         Verifies password using check_password_hash.
         Returns a dict with username, user_type, company_id, and employee_id (if applicable).
         """
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             # Step 1: Fetch user and their hashed password
             cursor.execute(
@@ -97,7 +242,7 @@ class Database:
             return None
 
     def is_user_admin(self, username: str) -> bool:
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT 1 FROM companies WHERE admin_username = ?",
@@ -106,7 +251,7 @@ class Database:
             return cursor.fetchone() is not None
 
     def get_company_by_id(self, company_id: int) -> Optional[Dict]:
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT company_id FROM companies WHERE company_id = ?", (company_id,)
@@ -116,15 +261,26 @@ class Database:
                 return dict(company_data)
             return None
 
-    def get_company_id_by_employee_id(self, employee_id: int) -> Optional[int]:
-        with self._get_connection() as conn:
+    def get_company_id_by_employee_id(self, employee_id: int, use_cache: bool = True) -> Optional[int]:
+        """use_cache=False skips the cache lookup (the result is still cached)."""
+        self.sync_lookup_caches()
+        if use_cache:
+            hit, company_id = self.employee_company_cache.lookup(employee_id)
+            if hit:
+                return company_id
+        generation = self.employee_company_cache.generation
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT company_id FROM employees WHERE employee_id = ?",
                 (employee_id,)
             )
             row = cursor.fetchone()
-            return row['company_id'] if row else None
+        if not row:
+            # Not cached: the employee may be created later
+            return None
+        self.employee_company_cache.set(employee_id, row['company_id'], generation)
+        return row['company_id']
 
     def add_company(
             self,
@@ -144,9 +300,10 @@ class Database:
                 "INSERT INTO companies (company_name, subscription_expiration, admin_username) VALUES (?, ?, ?)",
                 (name, expiration, admin_username)
             )
+        self.user_last_updated_cache.invalidate(admin_username)
 
     def get_company_by_admin(self, admin_username: str) -> Optional[Dict]:
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT * FROM companies WHERE admin_username = ?",
@@ -179,9 +336,10 @@ class Database:
                 """,
                 (company_id, username, first_name, last_name, gender, birthdate)
             )
+        self.user_last_updated_cache.invalidate(username)
 
     def get_employees_by_company(self, company_id: int) -> List[Dict]:
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
@@ -257,6 +415,9 @@ class Database:
                 tuple(params)
             )
             conn.commit()
+        self.user_last_updated_cache.invalidate(old_username)
+        self.user_last_updated_cache.invalidate(new_username)
+        self.employee_company_cache.invalidate(employee_id)
 
     def delete_employee(self, employee_id: int) -> None:
         with self._get_connection() as conn:
@@ -272,6 +433,8 @@ class Database:
             # For this model, deleting employee also deletes their general user entry.
             conn.execute("DELETE FROM users WHERE username = ?", (username,))
             conn.commit()
+        self.user_last_updated_cache.invalidate(username)
+        self.employee_company_cache.invalidate(employee_id)
 
     def add_category(self, company_id: int, name: str, description: Optional[str]):
         """Adds a new category for a company."""
@@ -280,16 +443,29 @@ class Database:
                 "INSERT INTO categories (company_id, category_name, category_description) VALUES (?, ?, ?)",
                 (company_id, name, description)
             )
+        self.company_categories_cache.invalidate(company_id)
 
-    def get_categories_by_company(self, company_id: int) -> List[Dict]:
-        """Retrieves all categories for a specific company."""
-        with self._get_connection() as conn:
+    def get_categories_by_company(self, company_id: int, use_cache: bool = True) -> List[Dict]:
+        """
+        Retrieves all categories for a specific company.
+        use_cache=False skips the cache lookup (the result is still cached).
+        """
+        self.sync_lookup_caches()
+        if use_cache:
+            hit, categories = self.company_categories_cache.lookup(company_id)
+            if hit:
+                # Copies, so callers cannot alter the cached rows
+                return [dict(category) for category in categories]
+        generation = self.company_categories_cache.generation
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT * FROM categories WHERE company_id = ?",
                 (company_id,)
             )
-            return [dict(row) for row in cursor.fetchall()]
+            categories = [dict(row) for row in cursor.fetchall()]
+        self.company_categories_cache.set(company_id, categories, generation)
+        return [dict(category) for category in categories]
 
     def delete_category(self, company_id: int, category_id: int):
         """Deletes a category for a specific company."""
@@ -301,6 +477,7 @@ class Database:
             )
             if cursor.rowcount == 0:
                 raise ValueError(f"Category ID {category_id} not found or does not belong to company {company_id}.")
+        self.company_categories_cache.invalidate(company_id)
 
     def add_call_record(
             self,
@@ -309,107 +486,739 @@ class Database:
             duration: int,
             transcription: Optional[str],
             audio_path: str,
-            conflict: Optional[bool]
+            conflict: Optional[bool],
+            audio_sha256: Optional[str] = None,
+            audio_size_bytes: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Inserts a call record. Records without a transcription get a pending analysis job
+        in the same transaction, so an accepted upload is never lost. Returns the job id.
+        Raises ValueError if `timestamp` is not ISO 8601.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO call_records (employee_id, category_id, call_timestamp, call_ts, call_duration,
+                                          transcription, audio_file_path, sentiment, audio_sha256,
+                                          audio_size_bytes)
+                VALUES (?, null, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (employee_id, timestamp, unix_seconds(timestamp), duration, transcription, audio_path, conflict, audio_sha256,
+                 audio_size_bytes)
+            )
+            if transcription is not None:
+                return None
+            cursor.execute("INSERT INTO analysis_jobs (call_id) VALUES (?)", (cursor.lastrowid,))
+            return cursor.lastrowid
+
+    def update_call_duration(self, call_id: int, duration: int):
+        """Sets the duration of a call once the analysis pipeline has measured it."""
+        with self._get_connection() as conn:
+            conn.execute("UPDATE call_records SET call_duration = ? WHERE call_id = ?", (duration, call_id))
+
+    def update_call_talk_duration(self, call_id: int, talk_duration: int):
+        """Sets the seconds of speech in a call, measured before transcription."""
+        with self._get_connection() as conn:
+            conn.execute("UPDATE call_records SET talk_duration = ? WHERE call_id = ?", (talk_duration, call_id))
+
+    def update_call_analysis(
+            self,
+            call_id: int,
+            transcription: str,
+            conflict: bool,
+            category_id: int,
+            conflict_score: Optional[float] = None,
+            conflict_segment_start: Optional[int] = None,
+            conflict_segment_end: Optional[int] = None
     ):
+        """
+        Stores the analysis results of a call. conflict_segment_start/end are the character
+        offsets in the transcription of its most negative segment.
+        """
+        with self._get_connection() as conn:
+            conn.execute(
+                """
+                UPDATE call_records
+                SET transcription = ?, sentiment = ?, category_id = ?,
+                    conflict_score = ?, conflict_segment_start = ?, conflict_segment_end = ?
+                WHERE call_id = ?
+                """,
+                (transcription, conflict, category_id,
+                 conflict_score, conflict_segment_start, conflict_segment_end, call_id)
+            )
+
+    def claim_analysis_jobs(self, limit: int, lease_seconds: float) -> List[Dict]:
+        """
+        Atomically claims up to `limit` analysis jobs that are pending or whose lease expired.
+        Each claim increments the job's attempt counter and sets a new lease.
+        """
+        now = time.time()
+        with self._get_connection() as conn:
+            # Take the write lock up front so concurrent workers never claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT j.job_id, j.call_id, j.attempts, cr.audio_file_path
+                FROM analysis_jobs j
+                         JOIN call_records cr ON cr.call_id = j.call_id
+                WHERE j.status = 'pending'
+                   OR (j.status = 'claimed' AND j.lease_expires_at < ?)
+                ORDER BY j.job_id
+                LIMIT ?
+                """,
+                (now, limit)
+            )
+            jobs = [dict(row) for row in cursor.fetchall()]
+            if jobs:
+                conn.executemany(
+                    """
+                    UPDATE analysis_jobs
+                    SET status = 'claimed', attempts = attempts + 1, lease_expires_at = ?,
+                        updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                    WHERE job_id = ?
+                    """,
+                    [(now + lease_seconds, job['job_id']) for job in jobs]
+                )
+            for job in jobs:
+                job['attempts'] += 1
+            return jobs
+
+    def renew_analysis_job_leases(self, job_ids: List[int], lease_seconds: float):
+        """Extends the lease of jobs still held by this worker."""
+        if not job_ids:
+            return
+        lease_expires_at = time.time() + lease_seconds
+        with self._get_connection() as conn:
+            conn.executemany(
+                "UPDATE analysis_jobs SET lease_expires_at = ? WHERE job_id = ? AND status = 'claimed'",
+                [(lease_expires_at, job_id) for job_id in job_ids]
+            )
+
+    def complete_analysis_job(self, job_id: int):
         with self._get_connection() as conn:
             conn.execute(
                 """
-                INSERT INTO call_records (employee_id, category_id, call_timestamp, call_duration, transcription,
-                                          audio_file_path, sentiment)
-                VALUES (?, null, ?, ?, ?, ?, ?)
+                UPDATE analysis_jobs
+                SET status = 'done', lease_expires_at = NULL, last_error = NULL,
+                    updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                WHERE job_id = ?
                 """,
-                (employee_id, timestamp, duration, transcription, audio_path, conflict)
+                (job_id,)
             )
 
-    def update_call_analysis(self, audio_file_path: str, transcription: str, conflict: bool, category_id: int):
+    def fail_analysis_job(self, job_id: int, error: str, max_attempts: int):
+        """Returns a failed job to 'pending' for a retry, or marks it 'failed' once it ran out of attempts."""
         with self._get_connection() as conn:
             conn.execute(
-                "UPDATE call_records SET transcription = ?, sentiment = ?, category_id = ? WHERE audio_file_path = ?",
-                (transcription, conflict, category_id, audio_file_path)
+                """
+                UPDATE analysis_jobs
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    lease_expires_at = NULL, last_error = ?,
+                    updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                WHERE job_id = ?
+                """,
+                (max_attempts, error, job_id)
             )
 
+    def release_analysis_jobs(self, job_ids: List[int]):
+        """Returns claimed jobs that were never started to 'pending', without counting the claim as an attempt."""
+        with self._get_connection() as conn:
+            conn.executemany(
+                """
+                UPDATE analysis_jobs
+                SET status = 'pending', attempts = attempts - 1, lease_expires_at = NULL,
+                    updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                WHERE job_id = ? AND status = 'claimed'
+                """,
+                [(job_id,) for job_id in job_ids]
+            )
+
+    def requeue_unfinished_analysis_jobs(self) -> int:
+        """
+        Creates pending jobs for call records that were never analyzed and have no job
+        (e.g. uploads accepted before the job table existed). Returns the number of jobs created.
+        Claimed jobs of a crashed worker are picked up again once their lease expires.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO analysis_jobs (call_id)
+                SELECT cr.call_id
+                FROM call_records cr
+                WHERE cr.transcription IS NULL
+                  AND NOT EXISTS (SELECT 1 FROM analysis_jobs j WHERE j.call_id = cr.call_id)
+                """
+            )
+            return cursor.rowcount
+
+    def get_analysis_job(self, job_id: int) -> Optional[Dict]:
+        """Fetches an analysis job together with the employee that owns its call."""
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT j.job_id, j.call_id, j.status, j.attempts, j.last_error, j.created_at, j.updated_at,
+                       cr.employee_id
+                FROM analysis_jobs j
+                         JOIN call_records cr ON cr.call_id = j.call_id
+                WHERE j.job_id = ?
+                """,
+                (job_id,)
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def count_analysis_jobs_by_status(self) -> Dict[str, int]:
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT status, COUNT(*) AS total FROM analysis_jobs GROUP BY status")
+            counts = {"pending": 0, "claimed": 0, "done": 0, "failed": 0}
+            counts.update({row['status']: row['total'] for row in cursor.fetchall()})
+            return counts
+
+    def claim_recording(self, call_id: int, tier: str, lease_seconds: float) -> bool:
+        """
+        Atomically claims a recording for moving it out of `tier`. Fails when the recording is no
+        longer in that tier or another process holds an unexpired claim on it.
+        """
+        now = time.time()
+        with self._get_connection() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE call_records SET storage_claimed_until = ?
+                WHERE call_id = ? AND storage_tier = ?
+                  AND (storage_claimed_until IS NULL OR storage_claimed_until < ?)
+                """,
+                (now + lease_seconds, call_id, tier, now)
+            )
+            return cursor.rowcount == 1
+
+    def release_recording_claim(self, call_id: int):
+        """Gives up a claim whose move failed, so the next sweep retries it."""
+        with self._get_connection() as conn:
+            conn.execute("UPDATE call_records SET storage_claimed_until = NULL WHERE call_id = ?", (call_id,))
+
+    def update_recording_storage(self, call_id: int, audio_path: str, size_bytes: int, tier: str):
+        """Records where a call's recording is stored, its size on disk and its storage tier, and releases its claim."""
+        with self._get_connection() as conn:
+            conn.execute(
+                """
+                UPDATE call_records
+                SET audio_file_path = ?, audio_size_bytes = ?, storage_tier = ?, storage_claimed_until = NULL
+                WHERE call_id = ?
+                """,
+                (audio_path, size_bytes, tier, call_id)
+            )
+
+    def get_recordings_to_archive(self, limit: int) -> List[Dict]:
+        """Recordings still stored as uploaded whose analysis is finished (done, failed or never queued)."""
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT cr.call_id, cr.audio_file_path
+                FROM call_records cr
+                WHERE cr.storage_tier = 'original'
+                  AND NOT EXISTS (SELECT 1 FROM analysis_jobs j
+                                  WHERE j.call_id = cr.call_id AND j.status IN ('pending', 'claimed'))
+                LIMIT ?
+                """,
+                (limit,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_recordings_older_than(self, tier: str, days: int, limit: int) -> List[Dict]:
+        """Recordings in the given storage tier whose call is more than `days` days old."""
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT call_id, audio_file_path
+                FROM call_records
+                WHERE storage_tier = ?
+                  AND call_ts < CAST(strftime('%s', 'now', ?) AS INTEGER)
+                LIMIT ?
+                """,
+                (tier, f"-{int(days)} days", limit)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_storage_usage(self, company_id: int) -> List[Dict]:
+        """Disk usage of a company's recordings per storage tier."""
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT cr.storage_tier,
+                       COUNT(*)                             AS recordings,
+                       COALESCE(SUM(cr.audio_size_bytes), 0) AS size_bytes,
+                       COALESCE(SUM(cr.call_duration), 0)   AS duration_seconds
+                FROM call_records cr
+                         JOIN employees e ON cr.employee_id = e.employee_id
+                WHERE e.company_id = ?
+                GROUP BY cr.storage_tier
+                """,
+                (company_id,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    # Columns get_call_records can return: output name -> SQL expression
+    CALL_RECORD_FIELDS = {
+        "call_id": "cr.call_id",
+        "employee_id": "cr.employee_id",
+        "call_timestamp": "cr.call_timestamp",
+        "call_ts": "cr.call_ts",
+        "call_duration": "cr.call_duration",
+        "talk_duration": "cr.talk_duration",
+        "transcription": "cr.transcription",
+        "audio_file_path": "cr.audio_file_path",
+        "sentiment": "cr.sentiment",
+        "conflict_score": "cr.conflict_score",
+        "conflict_segment_start": "cr.conflict_segment_start",
+        "conflict_segment_end": "cr.conflict_segment_end",
+        "category_name": "c.category_name",
+        "employee_username": "e.user_username",
+        "employee_first_name": "e.first_name",
+        "employee_last_name": "e.last_name",
+    }
+
+    SPEAKER_ROLES = ("agent", "customer")
+
+    def _call_records_query(
+            self,
+            company_id: int,
+            start_time: str,
+            end_time: str,
+            employee_id_filter: Optional[int] = None,
+            fields: Optional[List[str]] = None,
+            after: Optional[Tuple[int, int]] = None,
+            limit: Optional[int] = None,
+            negative_role: Optional[str] = None
+    ) -> Tuple[str, tuple]:
+        """Builds the call records query, newest first, keyed on (call_ts, call_id) for keyset paging."""
+        unknown = set(fields or []) - set(self.CALL_RECORD_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown call record fields: {', '.join(sorted(unknown))}.")
+        if negative_role is not None and negative_role not in self.SPEAKER_ROLES:
+            raise ValueError(f"Invalid speaker role '{negative_role}'. Use one of: {', '.join(self.SPEAKER_ROLES)}.")
+        # call_id and call_ts are always returned: they identify the row and form the page cursor
+        selected = ["call_id", "call_ts"] + [f for f in (fields or self.CALL_RECORD_FIELDS)
+                                             if f not in ("call_id", "call_ts")]
+        columns = ", ".join(f"{self.CALL_RECORD_FIELDS[f]} AS {f}" for f in selected)
+        category_join = ("LEFT JOIN categories c ON cr.category_id = c.category_id"
+                         if "category_name" in selected else "")
+
+        query = f"""
+                SELECT {columns}
+                FROM call_records cr
+                         JOIN employees e ON cr.employee_id = e.employee_id
+                         {category_join}
+                WHERE e.company_id = ?
+                  AND cr.call_ts BETWEEN ? AND ?
+                """
+        params: List[any] = [company_id, unix_seconds(start_time), unix_seconds(end_time)]  # Type 'any' for params list
+
+        if employee_id_filter is not None:
+            query += " AND cr.employee_id = ?"
+            params.append(employee_id_filter)
+        if negative_role is not None:
+            query += """ AND EXISTS (SELECT 1 FROM call_segments s
+                                     WHERE s.call_id = cr.call_id AND s.role = ? AND s.sentiment = 'Negative')"""
+            params.append(negative_role)
+        if after is not None:
+            query += " AND (cr.call_ts < ? OR (cr.call_ts = ? AND cr.call_id < ?))"
+            params.extend([after[0], after[0], after[1]])
+
+        query += " ORDER BY cr.call_ts DESC, cr.call_id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return query, tuple(params)
+
     def get_call_records(
+            self,
+            company_id: int,
+            start_time: str,
+            end_time: str,
+            employee_id_filter: Optional[int] = None,
+            fields: Optional[List[str]] = None,
+            after: Optional[Tuple[int, int]] = None,
+            limit: Optional[int] = None,
+            negative_role: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Retrieves a company's call records in a time range, newest first.
+
+        Args:
+            fields: Columns to return (see CALL_RECORD_FIELDS); all of them when None.
+                call_id and call_ts are always included.
+            after: (call_ts, call_id) of the last row of the previous page.
+            limit: Maximum number of rows to return.
+            negative_role: Only calls with a Negative turn by this speaker role (see SPEAKER_ROLES).
+        """
+        query, params = self._call_records_query(
+            company_id, start_time, end_time, employee_id_filter, fields, after, limit, negative_role
+        )
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def iter_call_records(
+            self,
+            company_id: int,
+            start_time: str,
+            end_time: str,
+            employee_id_filter: Optional[int] = None,
+            fields: Optional[List[str]] = None,
+            batch_size: int = 500,
+            negative_role: Optional[str] = None
+    ) -> Iterator[List[Dict]]:
+        """
+        Streams the call records of get_call_records in batches of `batch_size` rows. The rows are
+        read on a connection of their own, outside the read pool, held until the generator is
+        exhausted or closed: a slow consumer never keeps the pooled readers from other requests.
+        """
+        query, params = self._call_records_query(company_id, start_time, end_time, employee_id_filter, fields,
+                                                 negative_role=negative_role)
+        with self._get_dedicated_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+
+    def search_call_transcriptions(
+            self,
+            company_id: int,
+            query: str,
+            start_time: Optional[str] = None,
+            end_time: Optional[str] = None,
+            employee_id_filter: Optional[int] = None,
+            limit: int = 50,
+            offset: int = 0,
+            snippet_tokens: int = 16
+    ) -> List[Dict]:
+        """
+        Full-text search over a company's call transcriptions, best matches (BM25) first.
+        `query` uses the FTS5 query syntax (terms, "phrases", prefix*, AND/OR/NOT); an invalid
+        query raises sqlite3.OperationalError. Each row has a snippet with the matches in [brackets].
+        """
+        sql = """
+              SELECT cr.call_id,
+                     cr.employee_id,
+                     cr.call_timestamp,
+                     cr.call_ts,
+                     cr.call_duration,
+                     cr.sentiment,
+                     cr.conflict_score,
+                     e.first_name AS employee_first_name,
+                     e.last_name  AS employee_last_name,
+                     snippet(call_transcripts_fts, 0, '[', ']', '...', ?) AS snippet,
+                     bm25(call_transcripts_fts) AS score
+              FROM call_transcripts_fts
+                       JOIN call_records cr ON cr.call_id = call_transcripts_fts.rowid
+                       JOIN employees e ON cr.employee_id = e.employee_id
+              WHERE call_transcripts_fts MATCH ?
+                AND e.company_id = ?
+              """
+        params: List[any] = [snippet_tokens, query, company_id]
+
+        if start_time is not None:
+            sql += " AND cr.call_ts >= ?"
+            params.append(unix_seconds(start_time))
+        if end_time is not None:
+            sql += " AND cr.call_ts <= ?"
+            params.append(unix_seconds(end_time))
+        if employee_id_filter is not None:
+            sql += " AND cr.employee_id = ?"
+            params.append(employee_id_filter)
+
+        sql += " ORDER BY call_transcripts_fts.rank LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, tuple(params))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_call_transcription(self, company_id: int, call_id: int) -> Optional[Dict]:
+        """Fetches the transcription and conflict segment of a call belonging to the company."""
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT cr.call_id, cr.transcription, cr.sentiment, cr.conflict_score,
+                       cr.conflict_segment_start, cr.conflict_segment_end
+                FROM call_records cr
+                         JOIN employees e ON cr.employee_id = e.employee_id
+                WHERE cr.call_id = ? AND e.company_id = ?
+                """,
+                (call_id, company_id)
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def replace_call_segments(self, call_id: int, segments: List[Dict]):
+        """
+        Stores the speaker turns of a call, in order, replacing those of an earlier attempt.
+        Each segment has text, speaker, role, start_ms, end_ms, sentiment and negative_score.
+        """
+        with self._get_connection() as conn:
+            conn.execute("DELETE FROM call_segments WHERE call_id = ?", (call_id,))
+            conn.executemany(
+                """
+                INSERT INTO call_segments (call_id, turn_index, speaker, role, start_ms, end_ms, text, sentiment,
+                                           negative_score)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(call_id, turn_index, segment.get('speaker'), segment.get('role'), segment.get('start_ms'),
+                  segment.get('end_ms'), segment['text'], segment.get('sentiment'), segment.get('negative_score'))
+                 for turn_index, segment in enumerate(segments)]
+            )
+
+    def get_call_segments(self, company_id: int, call_id: int) -> Optional[List[Dict]]:
+        """The speaker turns of a call belonging to the company, in order; None if there is no such call."""
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT s.turn_index, s.speaker, s.role, s.start_ms, s.end_ms, s.text, s.sentiment, s.negative_score
+                FROM call_records cr
+                         JOIN employees e ON cr.employee_id = e.employee_id
+                         LEFT JOIN call_segments s ON s.call_id = cr.call_id
+                WHERE cr.call_id = ? AND e.company_id = ?
+                ORDER BY s.turn_index
+                """,
+                (call_id, company_id)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return None
+            return [dict(row) for row in rows if row['turn_index'] is not None]
+
+    def get_speaker_conflict_metrics(
             self,
             company_id: int,
             start_time: str,
             end_time: str,
             employee_id_filter: Optional[int] = None
     ) -> List[Dict]:
+        """
+        Conflict metrics per speaker role over a company's diarized calls in a time range: calls,
+        turns, talk time, Negative turns, calls with a Negative turn by that role (and their
+        percentage) and the mean negative score of the role's turns.
+        """
         query = """
-                SELECT cr.call_id, \
-                       cr.employee_id, \
-                       cr.call_timestamp, \
-                       cr.call_duration, \
-                       cr.transcription, \
-                       cr.audio_file_path, \
-                       cr.sentiment, \
-                       c.category_name, \
-                       e.user_username      AS employee_username, \
-                       e.first_name         AS employee_first_name, \
-                       e.last_name          AS employee_last_name
+                SELECT s.role,
+                       COUNT(DISTINCT s.call_id)                                          AS calls,
+                       COUNT(*)                                                           AS turns,
+                       COALESCE(SUM(s.end_ms - s.start_ms), 0) / 1000.0                   AS talk_seconds,
+                       SUM(s.sentiment IS 'Negative')                                     AS negative_turns,
+                       COUNT(DISTINCT CASE WHEN s.sentiment = 'Negative' THEN s.call_id END) AS negative_calls,
+                       AVG(s.negative_score)                                              AS avg_negative_score
                 FROM call_records cr
                          JOIN employees e ON cr.employee_id = e.employee_id
-                         LEFT JOIN categories c ON cr.category_id = c.category_id
-                WHERE e.company_id = ? \
-                  AND cr.call_timestamp BETWEEN ? AND ? \
+                         JOIN call_segments s ON s.call_id = cr.call_id
+                WHERE e.company_id = ?
+                  AND cr.call_ts BETWEEN ? AND ?
+                  AND s.role IS NOT NULL
                 """
-        params: List[any] = [company_id, start_time, end_time]  # Type 'any' for params list
-
+        params: List[any] = [company_id, unix_seconds(start_time), unix_seconds(end_time)]
         if employee_id_filter is not None:
             query += " AND cr.employee_id = ?"
             params.append(employee_id_filter)
+        query += " GROUP BY s.role ORDER BY s.role"
+
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, tuple(params))
+            rows = [dict(row) for row in cursor.fetchall()]
+        for row in rows:
+            row['negative_call_percentage'] = (row['negative_calls'] / row['calls']) * 100.0 if row['calls'] else 0.0
+        return rows
 
-        query += " ORDER BY cr.call_timestamp DESC"
+    SECONDS_PER_DAY = 86400
 
-        with self._get_connection() as conn:
+    # Grouping accepted by get_call_record_stats: group key -> (select expressions, joins, group by)
+    STATS_GROUPS = {
+        "employee": ("u.employee_id, e.first_name AS employee_first_name, e.last_name AS employee_last_name",
+                     "JOIN employees e ON u.employee_id = e.employee_id", "u.employee_id"),
+        "category": ("u.category_id, c.category_name",
+                     "LEFT JOIN categories c ON u.category_id = c.category_id", "u.category_id"),
+        "day": ("u.day", "", "u.day"),
+    }
+
+    def get_call_record_stats(
+            self,
+            company_id: int,
+            start_time: str,
+            end_time: str,
+            employee_id_filter: Optional[int] = None,
+            group_by: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Aggregates a company's calls in a time range: number of calls, total duration and the
+        percentage of conflictive (Negative) calls. Returns one row, or one row per employee,
+        category or day (UTC) when group_by is given.
+
+        Whole UTC days inside the range are read from the call_stats_daily rollup; only the
+        partial days at either end are aggregated from call_records.
+        """
+        if group_by is not None and group_by not in self.STATS_GROUPS:
+            raise ValueError(f"Invalid group_by '{group_by}'. Use one of: {', '.join(self.STATS_GROUPS)}.")
+        group_columns, group_joins, group_clause = self.STATS_GROUPS[group_by] if group_by else ("", "", "")
+
+        start_ts, end_ts = unix_seconds(start_time), unix_seconds(end_time)
+        if start_ts > end_ts:
+            return [] if group_by else [{"total_calls": 0, "total_duration_seconds": 0, "conflict_calls": 0,
+                                         "conflict_percentage": 0.0}]
+
+        # [start_ts, end_ts] is split into [start_ts, full_start) + whole days + [full_end, end_ts]
+        end_exclusive = end_ts + 1
+        full_start = -(-start_ts // self.SECONDS_PER_DAY) * self.SECONDS_PER_DAY
+        full_end = end_exclusive // self.SECONDS_PER_DAY * self.SECONDS_PER_DAY
+        if full_start >= full_end:
+            full_start = full_end = end_exclusive
+
+        employee_clause = " AND {}.employee_id = ?" if employee_id_filter is not None else ""
+        employee_params = [employee_id_filter] if employee_id_filter is not None else []
+        raw_branch = f"""
+            SELECT cr.employee_id, cr.category_id, date(cr.call_ts, 'unixepoch') AS day,
+                   1 AS total_calls, cr.call_duration AS total_duration_seconds,
+                   cr.sentiment IS 'Negative' AS conflict_calls
+            FROM call_records cr
+                     JOIN employees e ON cr.employee_id = e.employee_id
+            WHERE e.company_id = ? AND cr.call_ts >= ? AND cr.call_ts < ?{employee_clause.format('cr')}
+            """
+        query = f"""
+            SELECT {group_columns + ',' if group_columns else ''}
+                   COALESCE(SUM(u.total_calls), 0)            AS total_calls,
+                   COALESCE(SUM(u.total_duration_seconds), 0) AS total_duration_seconds,
+                   COALESCE(SUM(u.conflict_calls), 0)         AS conflict_calls
+            FROM (SELECT s.employee_id, NULLIF(s.category_id, 0) AS category_id, s.day,
+                         s.total_calls, s.total_duration_seconds, s.negative_calls AS conflict_calls
+                  FROM call_stats_daily s
+                  WHERE s.company_id = ? AND s.day >= ? AND s.day < ?{employee_clause.format('s')}
+                  UNION ALL {raw_branch}
+                  UNION ALL {raw_branch}) u
+                     {group_joins}
+            """
+        params: List[any] = [
+            company_id, self._utc_day(full_start), self._utc_day(full_end), *employee_params,
+            company_id, start_ts, full_start, *employee_params,
+            company_id, full_end, end_exclusive, *employee_params,
+        ]
+        if group_clause:
+            query += f" GROUP BY {group_clause} ORDER BY {group_clause}"
+
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, tuple(params))
-            return [dict(row) for row in cursor.fetchall()]
+            rows = [dict(row) for row in cursor.fetchall()]
 
-    @staticmethod
-    def count_calls(records: List[Dict]) -> int:
-        return len(records)
+        for row in rows:
+            total = row['total_calls']
+            row['conflict_percentage'] = (row['conflict_calls'] / total) * 100.0 if total else 0.0
+        return rows
 
     @staticmethod
-    def sum_call_durations(records: List[Dict]) -> int:
-        return sum(r.get('call_duration', 0) for r in records if r.get('call_duration') is not None)
+    def _utc_day(epoch_seconds: int) -> str:
+        return datetime.fromtimestamp(epoch_seconds, timezone.utc).date().isoformat()
 
-    @staticmethod
-    def calculate_conflict_percentage(records: List[Dict]) -> float:
-        total = len(records)
-        if total == 0:
-            return 0.0
-        conflicts = sum(1 for r in records if r.get('sentiment') == 'Negative')
-        return (conflicts / total) * 100.0
+    def rebuild_call_stats_daily(self) -> int:
+        """Recomputes the call_stats_daily rollup from call_records. Returns the number of rollup rows."""
+        with self._get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM call_stats_daily")
+            cursor = conn.execute(
+                """
+                INSERT INTO call_stats_daily (company_id, day, employee_id, category_id, total_calls,
+                                              total_duration_seconds, positive_calls, neutral_calls, negative_calls)
+                SELECT e.company_id, date(cr.call_ts, 'unixepoch'), cr.employee_id, IFNULL(cr.category_id, 0),
+                       COUNT(*), SUM(cr.call_duration), SUM(cr.sentiment IS 'Positive'),
+                       SUM(cr.sentiment IS 'Neutral'), SUM(cr.sentiment IS 'Negative')
+                FROM call_records cr
+                         JOIN employees e ON cr.employee_id = e.employee_id
+                WHERE cr.call_ts IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+                """
+            )
+            return cursor.rowcount
+
+    def reconcile_call_stats_daily(self) -> List[Dict]:
+        """
+        Compares the call_stats_daily rollup with an aggregate of call_records and returns the
+        rows that differ (source 'rollup' or 'call_records'); an empty list means they agree.
+        """
+        raw_aggregate = """
+            SELECT e.company_id, date(cr.call_ts, 'unixepoch') AS day, cr.employee_id,
+                   IFNULL(cr.category_id, 0) AS category_id, COUNT(*) AS total_calls,
+                   SUM(cr.call_duration) AS total_duration_seconds, SUM(cr.sentiment IS 'Positive') AS positive_calls,
+                   SUM(cr.sentiment IS 'Neutral') AS neutral_calls, SUM(cr.sentiment IS 'Negative') AS negative_calls
+            FROM call_records cr
+                     JOIN employees e ON cr.employee_id = e.employee_id
+            WHERE cr.call_ts IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+        """
+        rollup = """
+            SELECT company_id, day, employee_id, category_id, total_calls, total_duration_seconds,
+                   positive_calls, neutral_calls, negative_calls
+            FROM call_stats_daily
+        """
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT 'rollup' AS source, * FROM ({rollup} EXCEPT {raw_aggregate})
+                UNION ALL
+                SELECT 'call_records' AS source, * FROM ({raw_aggregate} EXCEPT {rollup})
+                """
+            )
+            return [dict(row) for row in cursor.fetchall()]
 
-    def get_user_last_updated(self, username: str) -> Optional[datetime]:
+    def get_user_last_updated(self, username: str, use_cache: bool = True) -> Optional[datetime]:
         """
         Fetches the last_updated timestamp for a user.
+        use_cache=False skips the cache lookup (the result is still cached).
         """
-        with self._get_connection() as conn:
+        self.sync_lookup_caches()
+        if use_cache:
+            hit, last_updated = self.user_last_updated_cache.lookup(username)
+            if hit:
+                return last_updated
+        generation = self.user_last_updated_cache.generation
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT last_updated FROM users WHERE username = ?", (username,))
             result = cursor.fetchone()
-            if result and result[0]:
-                try:
-                    return datetime.fromisoformat(result[0])
-                except ValueError:
-                    return None  # Handle potential issues with the stored format
-            return None
+        last_updated = None
+        if result and result[0]:
+            try:
+                last_updated = datetime.fromisoformat(result[0])
+            except ValueError:
+                last_updated = None  # Handle potential issues with the stored format
+        self.user_last_updated_cache.set(username, last_updated, generation)
+        return last_updated
 
-    def update_user(self, username: str, password_hash: str, last_updated: datetime = datetime.now(timezone.utc)):
+    def update_user(self, username: str, password_hash: str, last_updated: Optional[datetime] = None):
         """
         Updates a user's password and last_updated timestamp.
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE users SET password_hash=?, last_updated=? WHERE username=?",
-                       (password_hash, last_updated.isoformat(), username))
-        conn.commit()
+        last_updated = last_updated or datetime.now(timezone.utc)
+        with self._get_connection() as conn:
+            conn.execute("UPDATE users SET password = ?, last_updated = ? WHERE username = ?",
+                         (password_hash, last_updated, username))
+        self.user_last_updated_cache.invalidate(username)
 
     def get_summary_at_day(self, company_id: int, summary_day: str) -> Optional[str]:
         """Retrieves a daily summary for a specific company and day."""
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT summary FROM daily_summary WHERE company_id = ? AND day = ?",
@@ -452,7 +1261,7 @@ class Database:
                 """
         params = (employee_id,)
 
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             row = cursor.fetchone()
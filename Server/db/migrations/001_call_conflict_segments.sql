@@ -0,0 +1,5 @@
+-- Chunked conflict detection: score of the most negative segment and its
+-- character offsets in the transcription.
+ALTER TABLE call_records ADD COLUMN conflict_score REAL;
+ALTER TABLE call_records ADD COLUMN conflict_segment_start INTEGER;
+ALTER TABLE call_records ADD COLUMN conflict_segment_end INTEGER;
@@ -0,0 +1,2 @@
+-- SHA-256 of the uploaded audio, computed while the upload is streamed to disk.
+ALTER TABLE call_records ADD COLUMN audio_sha256 TEXT;
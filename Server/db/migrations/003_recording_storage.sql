@@ -0,0 +1,5 @@
+-- Recording storage tiers: 'original' (as uploaded), 'opus' (archived master),
+-- 'opus-cold' (low bitrate after the cold-tier age) and 'deleted' (past retention).
+ALTER TABLE call_records ADD COLUMN audio_size_bytes INTEGER;
+ALTER TABLE call_records ADD COLUMN storage_tier TEXT NOT NULL DEFAULT 'original'
+    CHECK(storage_tier IN ('original', 'opus', 'opus-cold', 'deleted'));
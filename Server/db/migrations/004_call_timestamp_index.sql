@@ -0,0 +1,16 @@
+-- Sortable integer call time (Unix epoch seconds, UTC) for range filters and ordering;
+-- call_timestamp keeps the ISO 8601 string as sent by the client.
+ALTER TABLE call_records ADD COLUMN call_ts INTEGER;
+UPDATE call_records SET call_ts = CAST(strftime('%s', call_timestamp) AS INTEGER);
+
+-- Company/employee time-range queries: employees of a company, then each employee's calls by time.
+-- The trailing columns let the stats queries run from the index alone.
+CREATE INDEX IF NOT EXISTS idx_employees_company ON employees(company_id);
+CREATE INDEX IF NOT EXISTS idx_call_records_employee_ts
+    ON call_records(employee_id, call_ts, call_duration, sentiment, category_id);
+CREATE INDEX IF NOT EXISTS idx_call_records_storage ON call_records(storage_tier, call_ts);
+
+-- Login and ownership lookups
+CREATE INDEX IF NOT EXISTS idx_employees_username ON employees(user_username);
+CREATE INDEX IF NOT EXISTS idx_companies_admin ON companies(admin_username);
+CREATE INDEX IF NOT EXISTS idx_categories_company ON categories(company_id);
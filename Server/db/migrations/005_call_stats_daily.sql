@@ -0,0 +1,107 @@
+-- Daily call statistics per company, employee and category (0 = uncategorized), by UTC day.
+-- Kept up to date by the triggers below; Database.rebuild_call_stats_daily() recomputes it.
+CREATE TABLE IF NOT EXISTS call_stats_daily (
+    company_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    employee_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL DEFAULT 0,
+    total_calls INTEGER NOT NULL DEFAULT 0,
+    total_duration_seconds INTEGER NOT NULL DEFAULT 0,
+    positive_calls INTEGER NOT NULL DEFAULT 0,
+    neutral_calls INTEGER NOT NULL DEFAULT 0,
+    negative_calls INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (company_id, day, employee_id, category_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_call_stats_daily_insert
+AFTER INSERT ON call_records
+WHEN NEW.call_ts IS NOT NULL
+BEGIN
+    INSERT INTO call_stats_daily (company_id, day, employee_id, category_id, total_calls, total_duration_seconds,
+                                  positive_calls, neutral_calls, negative_calls)
+    SELECT e.company_id, date(NEW.call_ts, 'unixepoch'), NEW.employee_id, IFNULL(NEW.category_id, 0), 1,
+           NEW.call_duration, NEW.sentiment IS 'Positive', NEW.sentiment IS 'Neutral', NEW.sentiment IS 'Negative'
+    FROM employees e
+    WHERE e.employee_id = NEW.employee_id
+    ON CONFLICT (company_id, day, employee_id, category_id) DO UPDATE SET
+        total_calls = total_calls + excluded.total_calls,
+        total_duration_seconds = total_duration_seconds + excluded.total_duration_seconds,
+        positive_calls = positive_calls + excluded.positive_calls,
+        neutral_calls = neutral_calls + excluded.neutral_calls,
+        negative_calls = negative_calls + excluded.negative_calls;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_call_stats_daily_delete
+AFTER DELETE ON call_records
+WHEN OLD.call_ts IS NOT NULL
+BEGIN
+    UPDATE call_stats_daily
+    SET total_calls = total_calls - 1,
+        total_duration_seconds = total_duration_seconds - OLD.call_duration,
+        positive_calls = positive_calls - (OLD.sentiment IS 'Positive'),
+        neutral_calls = neutral_calls - (OLD.sentiment IS 'Neutral'),
+        negative_calls = negative_calls - (OLD.sentiment IS 'Negative')
+    WHERE company_id = (SELECT company_id FROM employees WHERE employee_id = OLD.employee_id)
+      AND day = date(OLD.call_ts, 'unixepoch')
+      AND employee_id = OLD.employee_id
+      AND category_id = IFNULL(OLD.category_id, 0);
+    DELETE FROM call_stats_daily
+    WHERE employee_id = OLD.employee_id AND day = date(OLD.call_ts, 'unixepoch') AND total_calls <= 0;
+END;
+
+-- Also fires for the SET NULL applied to category_id when a category is deleted
+CREATE TRIGGER IF NOT EXISTS trg_call_stats_daily_update
+AFTER UPDATE OF employee_id, category_id, call_ts, call_duration, sentiment ON call_records
+BEGIN
+    UPDATE call_stats_daily
+    SET total_calls = total_calls - 1,
+        total_duration_seconds = total_duration_seconds - OLD.call_duration,
+        positive_calls = positive_calls - (OLD.sentiment IS 'Positive'),
+        neutral_calls = neutral_calls - (OLD.sentiment IS 'Neutral'),
+        negative_calls = negative_calls - (OLD.sentiment IS 'Negative')
+    WHERE OLD.call_ts IS NOT NULL
+      AND company_id = (SELECT company_id FROM employees WHERE employee_id = OLD.employee_id)
+      AND day = date(OLD.call_ts, 'unixepoch')
+      AND employee_id = OLD.employee_id
+      AND category_id = IFNULL(OLD.category_id, 0);
+    DELETE FROM call_stats_daily
+    WHERE OLD.call_ts IS NOT NULL
+      AND employee_id = OLD.employee_id AND day = date(OLD.call_ts, 'unixepoch') AND total_calls <= 0;
+    INSERT INTO call_stats_daily (company_id, day, employee_id, category_id, total_calls, total_duration_seconds,
+                                  positive_calls, neutral_calls, negative_calls)
+    SELECT e.company_id, date(NEW.call_ts, 'unixepoch'), NEW.employee_id, IFNULL(NEW.category_id, 0), 1,
+           NEW.call_duration, NEW.sentiment IS 'Positive', NEW.sentiment IS 'Neutral', NEW.sentiment IS 'Negative'
+    FROM employees e
+    WHERE e.employee_id = NEW.employee_id AND NEW.call_ts IS NOT NULL
+    ON CONFLICT (company_id, day, employee_id, category_id) DO UPDATE SET
+        total_calls = total_calls + excluded.total_calls,
+        total_duration_seconds = total_duration_seconds + excluded.total_duration_seconds,
+        positive_calls = positive_calls + excluded.positive_calls,
+        neutral_calls = neutral_calls + excluded.neutral_calls,
+        negative_calls = negative_calls + excluded.negative_calls;
+END;
+
+-- Calls deleted through the employees cascade can no longer resolve their company above
+CREATE TRIGGER IF NOT EXISTS trg_call_stats_daily_employee_delete
+AFTER DELETE ON employees
+BEGIN
+    DELETE FROM call_stats_daily WHERE employee_id = OLD.employee_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_call_stats_daily_employee_company
+AFTER UPDATE OF company_id ON employees
+BEGIN
+    UPDATE call_stats_daily SET company_id = NEW.company_id WHERE employee_id = OLD.employee_id;
+END;
+
+CREATE INDEX IF NOT EXISTS idx_call_stats_daily_employee ON call_stats_daily(employee_id, day);
+
+INSERT INTO call_stats_daily (company_id, day, employee_id, category_id, total_calls, total_duration_seconds,
+                              positive_calls, neutral_calls, negative_calls)
+SELECT e.company_id, date(cr.call_ts, 'unixepoch'), cr.employee_id, IFNULL(cr.category_id, 0), COUNT(*),
+       SUM(cr.call_duration), SUM(cr.sentiment IS 'Positive'), SUM(cr.sentiment IS 'Neutral'),
+       SUM(cr.sentiment IS 'Negative')
+FROM call_records cr
+         JOIN employees e ON cr.employee_id = e.employee_id
+WHERE cr.call_ts IS NOT NULL
+GROUP BY 1, 2, 3, 4;
@@ -0,0 +1,33 @@
+-- Full-text index over call transcriptions (external content: the text lives only in call_records).
+CREATE VIRTUAL TABLE IF NOT EXISTS call_transcripts_fts USING fts5(
+    transcription,
+    content = 'call_records',
+    content_rowid = 'call_id',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_call_transcripts_fts_insert
+AFTER INSERT ON call_records
+WHEN NEW.transcription IS NOT NULL
+BEGIN
+    INSERT INTO call_transcripts_fts (rowid, transcription) VALUES (NEW.call_id, NEW.transcription);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_call_transcripts_fts_delete
+AFTER DELETE ON call_records
+WHEN OLD.transcription IS NOT NULL
+BEGIN
+    INSERT INTO call_transcripts_fts (call_transcripts_fts, rowid, transcription)
+    VALUES ('delete', OLD.call_id, OLD.transcription);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_call_transcripts_fts_update
+AFTER UPDATE OF transcription ON call_records
+BEGIN
+    INSERT INTO call_transcripts_fts (call_transcripts_fts, rowid, transcription)
+    SELECT 'delete', OLD.call_id, OLD.transcription WHERE OLD.transcription IS NOT NULL;
+    INSERT INTO call_transcripts_fts (rowid, transcription)
+    SELECT NEW.call_id, NEW.transcription WHERE NEW.transcription IS NOT NULL;
+END;
+
+INSERT INTO call_transcripts_fts (call_transcripts_fts) VALUES ('rebuild');
@@ -0,0 +1,3 @@
+-- Seconds of speech in a call, measured by voice activity detection before transcription
+-- (call_duration stays the full length of the recording). NULL until measured.
+ALTER TABLE call_records ADD COLUMN talk_duration INTEGER CHECK(talk_duration >= 0);
@@ -0,0 +1,16 @@
+-- Speaker turns of a call from diarized transcription, with their time in the recording (ms)
+-- and their sentiment. role is 'agent' (the employee) or 'customer'; NULL when the
+-- speech-to-text engine does not separate speakers.
+CREATE TABLE IF NOT EXISTS call_segments (
+    call_id INTEGER NOT NULL,
+    turn_index INTEGER NOT NULL,
+    speaker TEXT,
+    role TEXT CHECK(role IN ('agent', 'customer')),
+    start_ms INTEGER,
+    end_ms INTEGER,
+    text TEXT NOT NULL,
+    sentiment TEXT CHECK(sentiment IN ('Positive', 'Negative', 'Neutral')),
+    negative_score REAL,
+    PRIMARY KEY (call_id, turn_index),
+    FOREIGN KEY (call_id) REFERENCES call_records(call_id) ON DELETE CASCADE
+) WITHOUT ROWID;
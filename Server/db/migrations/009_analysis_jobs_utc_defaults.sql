@@ -0,0 +1,24 @@
+-- created_at/updated_at defaulted to strftime(..., 'now', 'utc'), which shifts the already-UTC
+-- 'now' by the host's offset, while the job UPDATEs stamp plain UTC. SQLite can't change a
+-- column default in place, so the table is rebuilt with the corrected defaults.
+CREATE TABLE analysis_jobs_new (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    call_id INTEGER NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'claimed', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_expires_at REAL,
+    last_error TEXT,
+    created_at DATETIME DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    updated_at DATETIME DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    FOREIGN KEY (call_id) REFERENCES call_records(call_id)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+INSERT INTO analysis_jobs_new (job_id, call_id, status, attempts, lease_expires_at, last_error, created_at, updated_at)
+SELECT job_id, call_id, status, attempts, lease_expires_at, last_error, created_at, updated_at
+FROM analysis_jobs;
+
+DROP TABLE analysis_jobs;
+ALTER TABLE analysis_jobs_new RENAME TO analysis_jobs;
+
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs(status, lease_expires_at);
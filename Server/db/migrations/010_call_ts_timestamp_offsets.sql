@@ -0,0 +1,8 @@
+-- call_ts used to be computed with strftime('%s', call_timestamp), which is NULL for ISO 8601 values
+-- the upload accepts but SQLite can't parse (e.g. +0000 offsets, or basic format 20250101T100000Z).
+-- unix_seconds() is the Python parser registered while migrations run; the call_stats_daily update
+-- trigger adds the recovered calls to the rollup.
+UPDATE call_records
+SET call_ts = unix_seconds(call_timestamp)
+WHERE call_ts IS NULL
+  AND call_timestamp IS NOT NULL;
@@ -0,0 +1,3 @@
+-- Lease (epoch seconds) of the process moving a recording to another storage tier, so concurrent
+-- storage sweeps and the analysis pipeline never transcode or delete the same file. NULL when free.
+ALTER TABLE call_records ADD COLUMN storage_claimed_until REAL;
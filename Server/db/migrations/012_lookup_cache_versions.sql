@@ -0,0 +1,57 @@
+-- Change counters of the tables behind the in-process lookup caches. Bumped by the triggers below on
+-- every write, whichever process makes it; each process compares them with the versions its cached
+-- entries were read at and drops the caches of tables that changed.
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO cache_versions (name) VALUES ('users'), ('employees'), ('categories');
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_versions_users_insert
+AFTER INSERT ON users
+BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_versions_users_update
+AFTER UPDATE ON users
+BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_versions_users_delete
+AFTER DELETE ON users
+BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_versions_employees_update
+AFTER UPDATE OF company_id ON employees
+BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'employees';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_versions_employees_delete
+AFTER DELETE ON employees
+BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'employees';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_versions_categories_insert
+AFTER INSERT ON categories
+BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'categories';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_versions_categories_update
+AFTER UPDATE ON categories
+BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'categories';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_versions_categories_delete
+AFTER DELETE ON categories
+BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'categories';
+END;
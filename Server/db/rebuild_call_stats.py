@@ -0,0 +1,26 @@
+import argparse
+import sys
+
+from config import config
+from db.database import Database
+
+# Run from the Server directory: python -m db.rebuild_call_stats [--check]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or verify the call_stats_daily rollup.")
+    parser.add_argument("--check", action="store_true",
+                        help="Only compare the rollup with call_records; exit with 1 if they differ.")
+    args = parser.parse_args()
+
+    database = Database(db_path=config.DATABASE_PATH, schema_path=config.SCHEMA_PATH)
+    if args.check:
+        mismatches = database.reconcile_call_stats_daily()
+        for row in mismatches:
+            print(row)
+        print(f"{len(mismatches)} mismatching rollup rows.")
+        sys.exit(1 if mismatches else 0)
+
+    print("Rebuilding call_stats_daily...")
+    rows = database.rebuild_call_stats_daily()
+    print(f"call_stats_daily rebuilt with {rows} rows.")
@@ -67,4 +67,19 @@ CREATE TABLE IF NOT EXISTS daily_summary (
     FOREIGN KEY (company_id) REFERENCES companies(company_id)
         ON DELETE CASCADE ON UPDATE CASCADE,
     UNIQUE (day, company_id)
-);
\ No newline at end of file
+);
+
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    call_id INTEGER NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'claimed', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_expires_at REAL,
+    last_error TEXT,
+    created_at DATETIME DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    updated_at DATETIME DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    FOREIGN KEY (call_id) REFERENCES call_records(call_id)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs(status, lease_expires_at);
@@ -5,7 +5,7 @@ from config import config
 app = create_app(config_object=config)
 
 if __name__ == '__main__':
-    # Use Gunicorn or Waitress in production instead of app.run
+    # Development server; run asgi.py in production
     app.run(
         host=app.config['HOST'],
         port=app.config['PORT'],
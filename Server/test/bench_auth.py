@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Run from the Server directory: python test/bench_auth.py
+# Measures the per-request cost of token_required and check_admin_of_employee_company with the
+# auth lookup cache disabled (AUTH_CACHE_TTL_SECONDS=0) and enabled. Each configuration runs in a
+# fresh interpreter against a scratch database.
+
+MEASURE_SCRIPT = r"""
+import json, os, sys, time
+from flask import jsonify
+import app
+from app.extensions import db_service
+from app.auth.decorators import token_required, check_admin_of_employee_company
+
+requests = int(sys.argv[1])
+flask_app = app.create_app()
+
+@flask_app.route('/bench/open')
+async def bench_open():
+    return jsonify({"ok": True})
+
+@flask_app.route('/bench/token')
+@token_required
+async def bench_token():
+    return jsonify({"ok": True})
+
+@flask_app.route('/bench/employees/<int:employee_id>')
+@check_admin_of_employee_company(employee_id_arg_name='employee_id')
+async def bench_employee(employee_id):
+    return jsonify({"ok": True})
+
+db_service.add_company("Auth Bench", "2030-01-01", "auth-bench-admin", "password")
+db_service.add_employee(1, "auth-bench-employee", "password", "Auth", "Bench")
+time.sleep(1.1)  # tokens issued in the same second as the user's last update are rejected
+client = flask_app.test_client()
+token = client.post('/login', json={'username': 'auth-bench-admin', 'password': 'password'}).get_json()['token']
+headers = {'Authorization': f'Bearer {token}'}
+
+def per_request_us(path, use_headers):
+    for _ in range(50):
+        client.get(path, headers=headers if use_headers else None)
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(path, headers=headers if use_headers else None)
+        assert response.status_code == 200, response.get_json()
+    return (time.perf_counter() - start) / requests * 1e6
+
+open_us = per_request_us('/bench/open', False)
+token_us = per_request_us('/bench/token', True)
+employee_us = per_request_us('/bench/employees/1', True)
+print(json.dumps({
+    "unauthenticated_us": round(open_us, 1),
+    "token_required_overhead_us": round(token_us - open_us, 1),
+    "company_check_overhead_us": round(employee_us - open_us, 1),
+    "caches": db_service.cache_stats(),
+}))
+"""
+
+
+def measure(cache_ttl_seconds: float, requests: int) -> dict:
+    server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(filter(None, [server_dir, os.environ.get("PYTHONPATH")])),
+            DATABASE_PATH=os.path.join(tmp_dir, "auth.sqlite"),
+            SCHEMA_PATH=os.path.join(server_dir, "db", "schema.sql"),
+            RECORDINGS_DIR=os.path.join(tmp_dir, "recordings"),
+            RUN_ANALYSIS_WORKERS="false",
+            AUTH_CACHE_TTL_SECONDS=str(cache_ttl_seconds),
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", MEASURE_SCRIPT, str(requests)],
+            cwd=server_dir, env=env, capture_output=True, text=True, check=True
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure per-request authentication overhead.")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    for label, ttl in (("cache disabled", 0), ("cache enabled", 30)):
+        result = measure(ttl, args.requests)
+        print(f"{label:>15}: token_required +{result['token_required_overhead_us']:.0f} us/request, "
+              f"token_required + company check +{result['company_check_overhead_us']:.0f} us/request "
+              f"(unauthenticated request {result['unauthenticated_us']:.0f} us)")
+        print(f"{'':>15}  hit rates: " + ", ".join(
+            f"{name} {stats['hit_rate']:.0%}" for name, stats in result["caches"].items()))
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+
+# Run from the Server directory: python test/bench_categorize.py --calls 200 --batch-sizes 1 4 8
+# Offline comparison of call categorization request counts and prompt size per batch size. The
+# LLM is replaced by a stand-in that answers the structured-output request after a fixed latency
+# and counts prompt tokens (about 4 characters per token), so no API key or network is needed.
+# Calls of --companies companies are categorized by --threads worker threads, as in the pipeline.
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+TMP_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_PATH", os.path.join(TMP_DIR, "categorize.sqlite"))
+os.environ.setdefault("SCHEMA_PATH", os.path.join(SERVER_DIR, "db", "schema.sql"))
+os.environ.setdefault("RUN_ANALYSIS_WORKERS", "false")
+
+from app import tasks  # noqa: E402
+from app.batching import MicroBatcher  # noqa: E402
+from app.extensions import db_service  # noqa: E402
+
+WORDS = ("reembolso garantía pedido factura entrega producto cliente pantalla soporte cuenta contraseña "
+         "cargo tarjeta envío devolución técnico problema plataforma ayuda").split()
+
+
+class StandInModel:
+    """Answers categorization requests with random valid ids after `latency` seconds."""
+
+    def __init__(self, latency: float, seed: int):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+
+    def generate_content(self, prompt: str, generation_config=None):
+        time.sleep(self.latency)
+        category_ids = [c["id"] for c in json.loads(re.search(r"^Categories: (\[.*\])$", prompt, re.M).group(1))]
+        calls = re.findall(r"^Call (\d+): ", prompt.split("Here is actual input:")[1], re.M)
+        with self.lock:
+            self.requests += 1
+            self.prompt_tokens += len(prompt) // 4
+            answer = [{"call": int(n), "category_id": self.rng.choice(category_ids + [0])} for n in calls]
+        return type("Response", (), {"text": json.dumps(answer), "usage_metadata": None})()
+
+
+def run(calls: list, batch_size: int, threads: int, latency: float) -> dict:
+    model = StandInModel(latency, seed=batch_size)
+    tasks.get_gemini = lambda: model
+    tasks.category_batcher = MicroBatcher(tasks._categorize_batch, max_batch_size=batch_size,
+                                          max_wait_seconds=latency, producers=threads, name=f"Bench{batch_size}")
+    pending = list(calls)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                company_id, text = pending.pop()
+            tasks.categorize_call(company_id, text)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return {"elapsed": time.perf_counter() - start, "requests": model.requests, "prompt_tokens": model.prompt_tokens}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare LLM requests and prompt tokens of batched categorization.")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--companies", type=int, default=2)
+    parser.add_argument("--categories", type=int, default=8, help="Categories per company.")
+    parser.add_argument("--words", type=int, default=300, help="Words per transcription.")
+    parser.add_argument("--threads", type=int, default=8, help="Worker threads categorizing calls.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stand-in LLM latency per request (s).")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for c in range(args.companies):
+        db_service.add_company(f"Bench {c}", "2030-01-01", f"bench-admin-{c}", "password")
+        for k in range(args.categories):
+            # Category names are unique across companies
+            db_service.add_category(c + 1, f"Category {c}-{k}", " ".join(rng.choices(WORDS, k=12)))
+    calls = [(rng.randint(1, args.companies), " ".join(rng.choices(WORDS, k=args.words))) for _ in range(args.calls)]
+
+    for batch_size in args.batch_sizes:
+        result = run(calls, batch_size, args.threads, args.latency)
+        print(f"batch {batch_size:>3}: {result['requests']:5d} requests  "
+              f"{result['prompt_tokens']:9d} prompt tokens  {result['prompt_tokens'] / args.calls:7.0f} per call  "
+              f"{args.calls / result['elapsed']:6.1f} calls/s")
@@ -0,0 +1,166 @@
+import argparse
+import json
+import multiprocessing
+import queue
+import resource
+import statistics
+import sys
+import time
+
+from tools.conflict_detection import ConflictDetector
+from tools.inference_backends import BACKENDS
+
+# Run from the Server directory: PYTHONPATH=. python test/bench_conflict_detection.py
+# Each backend runs in its own process; non-torch backends are checked for parity
+# against the fp32 PyTorch reference. Exits with status 1 when a backend crashes, times out
+# or is outside its parity tolerance; backends whose dependencies are missing are skipped.
+
+# --- Configuration ---
+# Fixed corpus so results are comparable between runs and backends.
+DEFAULT_CORPUS = [
+    "Hola, buenas tardes. Quería saber el estado de mi pedido, lo hice hace una semana.",
+    "Claro, con gusto le ayudo. ¿Me puede dar su número de orden por favor?",
+    "¡Esto es inaceptable! Llevo tres semanas esperando y nadie me da una respuesta.",
+    "Le pido una disculpa, entiendo su molestia. Voy a escalar su caso de inmediato.",
+    "No me interesa su disculpa, quiero mi dinero de vuelta hoy mismo o voy a demandar.",
+    "Perfecto, ya quedó registrado el cambio de dirección. ¿Hay algo más en lo que pueda ayudarle?",
+    "Muchas gracias por su paciencia, que tenga un excelente día.",
+    "La tarjeta gráfica llegó dañada y el soporte técnico me colgó dos veces.",
+]
+REPEATS = 5
+
+# Minimum label agreement and maximum probability difference against the fp32 PyTorch reference
+PARITY_TOLERANCES = {
+    "torch-int8": {"label_agreement": 0.875, "max_probability_difference": 0.1},
+    "onnx": {"label_agreement": 1.0, "max_probability_difference": 0.001},
+    "onnx-int8": {"label_agreement": 0.875, "max_probability_difference": 0.1},
+}
+
+
+def run_backend(backend: str, corpus: list, batch_size: int, result_queue):
+    """
+    Loads one backend in a fresh process and measures it, so the memory figures
+    of different backends don't contaminate each other.
+    """
+    start = time.perf_counter()
+    try:
+        detector = ConflictDetector(max_batch_size=batch_size, backend=backend)
+    except ImportError as e:
+        result_queue.put({"backend": backend, "skipped": str(e)})
+        return
+    load_seconds = time.perf_counter() - start
+
+    # Warm-up run (first inference allocates buffers)
+    detector.analyze_batch(corpus[:1])
+
+    latencies = []
+    for _ in range(REPEATS):
+        for text in corpus:
+            start = time.perf_counter()
+            detector.analyze_batch([text])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        detector.analyze_batch(corpus)
+    batch_seconds = time.perf_counter() - start
+
+    translations = detector._translate_batch(corpus)
+    result_queue.put({
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "latency_p95_ms": round(sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000, 1),
+        "throughput_texts_per_s": round(len(corpus) * REPEATS / batch_seconds, 2),
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "labels": detector.detect_conflict_batch(corpus),
+        "probabilities": detector._classify_batch(translations),
+    })
+
+
+def parity_against(reference: dict, candidate: dict) -> dict:
+    """Compares a backend's outputs against the fp32 PyTorch reference."""
+    total = len(reference["labels"])
+    label_agreement = sum(r == c for r, c in zip(reference["labels"], candidate["labels"])) / total
+    max_difference = max(
+        abs(r - c)
+        for ref, cand in zip(reference["probabilities"], candidate["probabilities"])
+        for r, c in zip(ref, cand)
+    )
+    return {"label_agreement": label_agreement, "max_probability_difference": round(max_difference, 4)}
+
+
+def parity_failures(backend: str, parity: dict) -> list:
+    """The parity figures of a backend that are outside its tolerance."""
+    tolerance = PARITY_TOLERANCES[backend]
+    failures = []
+    if parity["label_agreement"] < tolerance["label_agreement"]:
+        failures.append(f"label agreement {parity['label_agreement']:.3f} < {tolerance['label_agreement']}")
+    if parity["max_probability_difference"] > tolerance["max_probability_difference"]:
+        failures.append(f"max probability difference {parity['max_probability_difference']} > "
+                        f"{tolerance['max_probability_difference']}")
+    return failures
+
+
+def wait_for_result(process, result_queue, timeout: float):
+    """The result a backend process put on the queue; None if it exited without one or timed out."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return result_queue.get(timeout=1)
+        except queue.Empty:
+            if not process.is_alive():
+                # The result may still be in the queue's pipe when the process exits
+                try:
+                    return result_queue.get(timeout=1)
+                except queue.Empty:
+                    return None
+    process.terminate()
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ConflictDetector inference backends.")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--corpus", help="Text file with one Spanish transcription per line.")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds allowed per backend.")
+    args = parser.parse_args()
+
+    corpus = DEFAULT_CORPUS
+    if args.corpus:
+        with open(args.corpus, "r", encoding="utf-8") as f:
+            corpus = [line.strip() for line in f if line.strip()]
+
+    # The reference backend always runs first so every other backend can be checked against it
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    failed = False
+    for backend in backends:
+        result_queue = context.Queue()
+        process = context.Process(target=run_backend, args=(backend, corpus, args.batch_size, result_queue))
+        process.start()
+        result = wait_for_result(process, result_queue, args.timeout)
+        process.join()
+        if result is None:
+            result = {"backend": backend, "error": f"no result (exit code {process.exitcode})"}
+            failed = True
+        if "labels" not in result:
+            print(json.dumps(result))
+            if backend == "torch":
+                sys.exit("The PyTorch reference backend did not run; nothing to compare against.")
+            continue
+        results[backend] = result
+
+    for backend, result in results.items():
+        summary = {k: v for k, v in result.items() if k not in ("labels", "probabilities")}
+        if backend != "torch":
+            summary["parity"] = parity_against(results["torch"], result)
+            failures = parity_failures(backend, summary["parity"])
+            if failures:
+                summary["parity_failures"] = failures
+                failed = True
+        print(json.dumps(summary))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,130 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Run from the Server directory: python test/bench_db_executor.py --concurrency 32
+# Serves a dashboard-style request (call totals plus per-employee groups) from concurrent client
+# threads, the way a threaded WSGI server runs async views, and compares issuing the queries with
+# run_blocking_io (asyncio.to_thread), with AsyncDatabase one call at a time and with
+# AsyncDatabase.batch. Reports throughput, latency percentiles and the peak thread count.
+# Everything runs in one process, so --concurrency models the request threads of one server
+# worker; with hundreds of threads the numbers mostly measure GIL contention.
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+TMP_DIR = tempfile.mkdtemp()
+os.environ.update(
+    DATABASE_PATH=os.path.join(TMP_DIR, "executor.sqlite"),
+    SCHEMA_PATH=os.path.join(SERVER_DIR, "db", "schema.sql"),
+    RECORDINGS_DIR=os.path.join(TMP_DIR, "recordings"),
+    RUN_ANALYSIS_WORKERS="false",
+)
+
+from flask import jsonify  # noqa: E402
+import app  # noqa: E402
+from app.extensions import db_service, async_db  # noqa: E402
+from app.utils import run_blocking_io  # noqa: E402
+
+START, END = "2026-01-01T00:00:00Z", "2026-03-31T23:59:59Z"
+flask_app = app.create_app()
+
+
+@flask_app.route('/bench/to_thread')
+async def bench_to_thread():
+    totals = await run_blocking_io(db_service.get_call_record_stats, 1, START, END)
+    groups = await run_blocking_io(db_service.get_call_record_stats, 1, START, END, None, "employee")
+    return jsonify({"totals": totals, "groups": groups})
+
+
+@flask_app.route('/bench/async_db')
+async def bench_async_db():
+    totals = await async_db.get_call_record_stats(1, START, END)
+    groups = await async_db.get_call_record_stats(1, START, END, None, "employee")
+    return jsonify({"totals": totals, "groups": groups})
+
+
+@flask_app.route('/bench/batch')
+async def bench_batch():
+    totals, groups = await async_db.batch(
+        partial(db_service.get_call_record_stats, 1, START, END),
+        partial(db_service.get_call_record_stats, 1, START, END, None, "employee")
+    )
+    return jsonify({"totals": totals, "groups": groups})
+
+
+def populate(calls: int, seed: int):
+    rng = random.Random(seed)
+    db_service.add_company("Executor Bench", "2030-01-01", "executor-admin", "password")
+    for i in range(20):
+        db_service.add_employee(1, f"executor-{i}", "password", "Executor", str(i))
+    base = 1767225600  # 2026-01-01T00:00:00Z
+    with db_service._get_connection() as conn:
+        conn.executemany(
+            """
+            INSERT INTO call_records (employee_id, call_timestamp, call_ts, call_duration, audio_file_path,
+                                      transcription, sentiment)
+            VALUES (?, strftime('%Y-%m-%dT%H:%M:%SZ', ?, 'unixepoch'), ?, ?, ?, '', ?)
+            """,
+            [(rng.randint(1, 20), ts, ts, rng.randint(10, 900), f"executor-{i}.ogg",
+              rng.choice(["Positive", "Neutral", "Negative"]))
+             for i, ts in enumerate(base + rng.randrange(90 * 86400) for _ in range(calls))]
+        )
+
+
+def run(path: str, concurrency: int, requests: int) -> dict:
+    client = flask_app.test_client()
+    peak_threads = threading.active_count()
+    sampling = True
+
+    def sample_threads():
+        nonlocal peak_threads
+        while sampling:
+            peak_threads = max(peak_threads, threading.active_count())
+            time.sleep(0.001)
+
+    def one_request(_):
+        start = time.perf_counter()
+        response = client.get(path)
+        assert response.status_code == 200, response.get_json()
+        return (time.perf_counter() - start) * 1000
+
+    sampler = threading.Thread(target=sample_threads, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as clients:
+        latencies = sorted(clients.map(one_request, range(requests)))
+    elapsed = time.perf_counter() - start
+    sampling = False
+    sampler.join()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "max_ms": latencies[-1],
+        "peak_threads": peak_threads - concurrency,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare database executors for async views under concurrency.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    populate(args.calls, args.seed)
+    for label, path in (("to_thread", "/bench/to_thread"), ("async_db", "/bench/async_db"),
+                        ("async_db.batch", "/bench/batch")):
+        run(path, args.concurrency, min(200, args.requests))  # warm-up
+        result = run(path, args.concurrency, args.requests)
+        print(f"{label:>15}: {result['rps']:7.0f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+              f"p99 {result['p99_ms']:7.1f} ms  max {result['max_ms']:7.1f} ms  peak threads besides clients {result['peak_threads']}")
+    db_service.close()
@@ -0,0 +1,187 @@
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Run from the Server directory: python test/bench_http_server.py --duration 20
+# Starts the API with the Flask development server (run.py) and with the production ASGI server
+# (asgi.py, uvicorn), each against the same scratch database, and drives both with keep-alive
+# clients issuing a dashboard mix (paged call records, stats, employees). Reports requests per
+# second and latency percentiles per server. Needs uvicorn (requirements.txt).
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from db.database import Database  # noqa: E402
+
+REQUEST_MIX = [
+    "/companies/1/call_records?start_time=2026-01-01T00:00:00Z&end_time=2026-03-31T23:59:59Z&limit=50",
+    "/companies/1/call_records/stats?start_time=2026-01-01T00:00:00Z&end_time=2026-03-31T23:59:59Z",
+    "/companies/1/call_records/stats?start_time=2026-01-01T00:00:00Z&end_time=2026-03-31T23:59:59Z"
+    "&group_by=employee",
+    "/companies/1/employees",
+]
+
+
+def populate(db_path: str, calls: int, seed: int):
+    rng = random.Random(seed)
+    db = Database(db_path=db_path, schema_path=os.path.join(SERVER_DIR, "db", "schema.sql"))
+    db.add_company("Load Test", "2030-01-01", "load-admin", "password")
+    for i in range(20):
+        db.add_employee(1, f"load-{i}", "password", "Load", str(i))
+    base = 1767225600  # 2026-01-01T00:00:00Z
+    with db._get_connection() as conn:
+        conn.executemany(
+            """
+            INSERT INTO call_records (employee_id, call_timestamp, call_ts, call_duration, audio_file_path,
+                                      transcription, sentiment)
+            VALUES (?, strftime('%Y-%m-%dT%H:%M:%SZ', ?, 'unixepoch'), ?, ?, ?, 'transcription', ?)
+            """,
+            [(rng.randint(1, 20), ts, ts, rng.randint(10, 900), f"load-{i}.ogg",
+              rng.choice(["Positive", "Neutral", "Negative"]))
+             for i, ts in enumerate(base + rng.randrange(90 * 86400) for _ in range(calls))]
+        )
+    db.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(command: list, port: int, env: dict) -> subprocess.Popen:
+    server = subprocess.Popen(command, cwd=SERVER_DIR, env=dict(env, PORT=str(port)),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError(f"{' '.join(command)} exited with code {server.returncode}")
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"{' '.join(command)} did not start listening on port {port}")
+
+
+def login(port: int) -> str:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("POST", "/login", body=json.dumps({"username": "load-admin", "password": "password"}),
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    token = json.loads(response.read())["token"]
+    conn.close()
+    return token
+
+
+def client_process(port: int, token: str, threads: int, duration: float, seed: int, results):
+    """Runs `threads` keep-alive clients until the deadline; sends back latencies and error count."""
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(thread_seed: int):
+        rng = random.Random(thread_seed)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        headers = {"Authorization": f"Bearer {token}"}
+        local_latencies, local_errors = [], 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", rng.choice(REQUEST_MIX), headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                continue
+            local_latencies.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    workers = [threading.Thread(target=client, args=(seed * 1000 + i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put((latencies, errors[0]))
+
+
+def run_load(port: int, processes: int, threads: int, duration: float) -> dict:
+    token = login(port)
+    results = multiprocessing.Queue()
+    clients = [multiprocessing.Process(target=client_process, args=(port, token, threads, duration, i, results))
+               for i in range(processes)]
+    for client in clients:
+        client.start()
+    latencies, errors = [], 0
+    for _ in clients:
+        client_latencies, client_errors = results.get()
+        latencies.extend(client_latencies)
+        errors += client_errors
+    for client in clients:
+        client.join()
+    latencies.sort()
+    return {
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the development server with the ASGI server under load.")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--client-threads", type=int, default=16, help="Keep-alive connections per client process.")
+    parser.add_argument("--web-workers", type=int, default=2, help="Server processes for asgi.py.")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "load.sqlite")
+        populate(db_path, args.calls, args.seed)
+        # Tokens issued in the same second as the users were created are rejected as outdated
+        time.sleep(1.1)
+        env = dict(
+            os.environ,
+            DATABASE_PATH=db_path,
+            SCHEMA_PATH=os.path.join(SERVER_DIR, "db", "schema.sql"),
+            RECORDINGS_DIR=os.path.join(tmp_dir, "recordings"),
+            RUN_ANALYSIS_WORKERS="false",
+            FLASK_DEBUG="false",
+            WEB_WORKERS=str(args.web_workers),
+        )
+        servers = [
+            ("run.py (Flask dev server)", [sys.executable, "run.py"]),
+            (f"asgi.py (uvicorn, {args.web_workers} workers)", [sys.executable, "asgi.py"]),
+        ]
+        for label, command in servers:
+            port = free_port()
+            server = start_server(command, port, env)
+            try:
+                run_load(port, args.client_processes, args.client_threads, min(3.0, args.duration))  # warm-up
+                result = run_load(port, args.client_processes, args.client_threads, args.duration)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=60)
+            print(f"{label:<34} {result['rps']:7.0f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+                  f"p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}")
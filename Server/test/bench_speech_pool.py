@@ -0,0 +1,92 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+# Run from the Server directory: python test/bench_speech_pool.py --files 64 --sessions 1 4 16
+# Offline load test of the speech recognition session pool, using the local stand-in recognizer
+# (no Azure credentials or network). Generates silent WAV files with known transcripts, submits
+# all of them at once and reports throughput (seconds of audio per second), the latency from
+# submission to result (including the wait for a free session) and any wrong or timed-out results.
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from tools.speech_to_text import SpeechToTextService, local_session_factory  # noqa: E402
+
+
+def write_files(directory: str, files: int, seconds: float, sample_rate: int = 16000) -> list:
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f"call-{i}.wav")
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(b"\0\0" * int(seconds * sample_rate))
+        with open(os.path.splitext(path)[0] + '.txt', 'w', encoding='utf-8') as f:
+            f.write(" ".join(f"call{i}word{w}" for w in range(20)))
+        paths.append(path)
+    return paths
+
+
+def run(paths: list, sessions: int, realtime_factor: float, timeout_seconds: float) -> dict:
+    service = SpeechToTextService(local_session_factory(realtime_factor, chunk_seconds=1.0),
+                                  max_sessions=sessions, session_timeout_seconds=timeout_seconds)
+    latencies, results = [], {}
+    lock = threading.Lock()
+    all_done = threading.Event()
+
+    def on_complete(path, submitted_at, future):
+        with lock:
+            latencies.append(time.perf_counter() - submitted_at)
+            results[path] = future.result()
+            if len(results) == len(paths):
+                all_done.set()
+
+    start = time.perf_counter()
+    for path in paths:
+        submitted_at = time.perf_counter()
+        # Blocks while every session is busy
+        service.transcribe(path, callback=lambda future, p=path, t=submitted_at: on_complete(p, t, future))
+    all_done.wait()
+    elapsed = time.perf_counter() - start
+
+    wrong = 0
+    for i, path in enumerate(paths):
+        text, error, _ = results[path]
+        expected = " ".join(f"call{i}word{w}" for w in range(20))
+        wrong += int(error is None and text != expected)
+    latencies.sort()
+    stats = service.stats()
+    return {
+        "elapsed": elapsed,
+        "p50_s": statistics.median(latencies),
+        "p99_s": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        "wrong": wrong,
+        "timeouts": stats["timeouts"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the speech recognition session pool offline.")
+    parser.add_argument("--files", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10.0, help="Audio length of each file.")
+    parser.add_argument("--realtime-factor", type=float, default=0.1,
+                        help="Stand-in recognition time per second of audio (Azure is about 1.0).")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-session timeout in seconds.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = write_files(tmp_dir, args.files, args.seconds)
+        audio_seconds = args.files * args.seconds
+        for sessions in args.sessions:
+            result = run(paths, sessions, args.realtime_factor, args.timeout)
+            print(f"{sessions:>3} sessions: {audio_seconds / result['elapsed']:8.1f} s of audio/s  "
+                  f"latency p50 {result['p50_s']:6.2f}s  p99 {result['p99_s']:6.2f}s  "
+                  f"wrong {result['wrong']}  timeouts {result['timeouts']}")
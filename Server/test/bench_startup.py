@@ -0,0 +1,57 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Run from the Server directory: python test/bench_startup.py
+# Each measurement runs in a fresh interpreter, like a new gunicorn worker would.
+
+MEASURE_SCRIPT = r"""
+import json, sys, time
+start = time.perf_counter()
+import app
+import_seconds = time.perf_counter() - start
+
+start = time.perf_counter()
+flask_app = app.create_app()
+create_app_seconds = time.perf_counter() - start
+
+client = flask_app.test_client()
+start = time.perf_counter()
+response = client.post('/login', json={'username': 'startup-benchmark', 'password': 'invalid'})
+first_request_seconds = time.perf_counter() - start
+
+print(json.dumps({
+    "import_seconds": round(import_seconds, 3),
+    "create_app_seconds": round(create_app_seconds, 3),
+    "first_request_seconds": round(first_request_seconds, 3),
+    "first_request_status": response.status_code,
+    "torch_imported": "torch" in sys.modules,
+    "transformers_imported": "transformers" in sys.modules,
+}))
+"""
+
+
+def measure_startup() -> dict:
+    """Starts a fresh interpreter, imports the app and times its first request."""
+    server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [server_dir, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE_SCRIPT],
+        cwd=server_dir, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure app import time and first-request latency.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [measure_startup() for _ in range(args.runs)]
+    for run in runs:
+        print(json.dumps(run))
+    for key in ("import_seconds", "create_app_seconds", "first_request_seconds"):
+        values = sorted(run[key] for run in runs)
+        print(f"{key}: min {values[0]:.3f}s, median {values[len(values) // 2]:.3f}s, max {values[-1]:.3f}s")
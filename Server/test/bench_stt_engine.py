@@ -0,0 +1,107 @@
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import wave
+
+# Run from the Server directory: python test/bench_stt_engine.py --corpus /data/stt-corpus --sessions 1 2 4
+# Throughput of a local speech-to-text engine over a fixed audio corpus (every audio file in
+# --corpus, in name order, so runs are comparable). Each file is transcribed through
+# SpeechToTextService like an uploaded call, with --sessions calls at a time. Reports the
+# real-time factor (processing seconds per second of audio, lower is faster) for the whole run
+# and per core (RTF x cores used: the CPU-seconds spent per second of audio). The whisper
+# engine needs faster-whisper and downloads the model into --model-dir on first use.
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from tools.speech_to_text import (  # noqa: E402
+    SpeechToTextService,
+    WhisperEngine,
+    local_session_factory,
+    whisper_session_factory
+)
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.ogg', '.flac', '.m4a', '.webm')
+
+
+def audio_seconds(path: str) -> float:
+    """Duration of an audio file; formats other than WAV are probed with ffprobe (installed with ffmpeg)."""
+    if path.lower().endswith('.wav'):
+        with wave.open(path, 'rb') as wav:
+            return wav.getnframes() / wav.getframerate()
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip())
+
+
+def build_factory(args, sessions: int):
+    if args.engine == "local":
+        return local_session_factory(args.realtime_factor)
+    cpu_threads = args.threads or max(1, (os.cpu_count() or 1) // sessions)
+    engine = WhisperEngine(args.model, compute_type=args.compute_type, cpu_threads=cpu_threads,
+                           num_workers=sessions, batch_size=args.batch_size, beam_size=args.beam_size,
+                           language=args.language, download_root=args.model_dir)
+    # Load the model outside the timed run
+    engine.load()
+    return whisper_session_factory(engine)
+
+
+def run(paths: list, sessions: int, factory) -> dict:
+    service = SpeechToTextService(factory, max_sessions=sessions, session_timeout_seconds=24 * 3600)
+    results = {}
+    lock = threading.Lock()
+    all_done = threading.Event()
+
+    def on_complete(path, future):
+        with lock:
+            results[path] = future.result()
+            if len(results) == len(paths):
+                all_done.set()
+
+    start = time.perf_counter()
+    for path in paths:
+        service.transcribe(path, callback=lambda future, p=path: on_complete(p, future))
+    all_done.wait()
+    return {
+        "elapsed": time.perf_counter() - start,
+        "errors": sum(1 for result in results.values() if result.error_code),
+        "words": sum(len(result.text.split()) for result in results.values() if result.text),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Real-time factor per core of a local speech-to-text engine.")
+    parser.add_argument("--corpus", required=True, help="Directory of audio files to transcribe.")
+    parser.add_argument("--engine", choices=["whisper", "local"], default="whisper")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--model-dir", default=os.path.join(SERVER_DIR, "models", "whisper"))
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="Threads per session; 0 splits the cores between the sessions.")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--beam-size", type=int, default=1)
+    parser.add_argument("--language", default="en-US")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--realtime-factor", type=float, default=0.1, help="Pacing of the local stand-in.")
+    args = parser.parse_args()
+
+    paths = sorted(os.path.join(args.corpus, name) for name in os.listdir(args.corpus)
+                   if name.lower().endswith(AUDIO_EXTENSIONS))
+    if not paths:
+        sys.exit(f"No audio files in {args.corpus}")
+    total_audio = sum(audio_seconds(path) for path in paths)
+    print(f"Corpus: {len(paths)} files, {total_audio / 60:.1f} min of audio, {os.cpu_count()} cores")
+
+    for sessions in args.sessions:
+        factory = build_factory(args, sessions)
+        result = run(paths, sessions, factory)
+        cores = min(os.cpu_count() or 1, sessions * (args.threads or max(1, (os.cpu_count() or 1) // sessions)))
+        rtf = result["elapsed"] / total_audio
+        print(f"{sessions:>3} sessions: RTF {rtf:6.3f}  ({1 / rtf:6.1f}x real time)  "
+              f"RTF/core {rtf * cores:6.3f} on {cores} cores  "
+              f"words {result['words']}  errors {result['errors']}")
@@ -0,0 +1,136 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Run from the Server directory: python test/bench_transcript_search.py --rows 1000000
+# Builds a scratch database with synthetic transcriptions (indexed by the FTS5 triggers as they
+# are inserted) and times company-scoped searches against a LIKE scan of the same data.
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from db.database import Database  # noqa: E402
+
+COMPANIES = 10
+EMPLOYEES_PER_COMPANY = 20
+YEAR_START = 1767225600  # 2026-01-01T00:00:00Z
+# Rare words are planted in a small share of calls so that selective searches have matches
+RARE_WORDS = ["refund", "lawyer", "cancellation", "supervisor", "chargeback"]
+
+QUERIES = [
+    ("common term", "account", {}),
+    ("rare term", "chargeback", {}),
+    ("phrase", '"speak to a supervisor"', {}),
+    ("prefix", "cancel*", {}),
+    ("boolean", "refund AND lawyer", {}),
+    ("rare term, one month", "refund", {"start_time": "2026-03-01T00:00:00Z", "end_time": "2026-03-31T23:59:59Z"}),
+    ("rare term, one employee", "refund", {"employee_id_filter": 1}),
+]
+
+
+def build_vocabulary(size: int, rng: random.Random) -> list:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = {"account", "payment", "order", "delivery", "problem", "thanks", "please", "speak", "to", "a"}
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 9))))
+    return sorted(words)
+
+
+def transcripts(rows: int, words_per_call: int, rng: random.Random):
+    vocabulary = build_vocabulary(5000, rng)
+    # Zipf-like weights: a few very common words and a long tail
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    for _ in range(rows):
+        words = rng.choices(vocabulary, weights=weights, k=words_per_call)
+        if rng.random() < 0.01:
+            words.insert(rng.randrange(len(words)), rng.choice(RARE_WORDS))
+        if rng.random() < 0.002:
+            words.extend(["i", "want", "to", "speak", "to", "a", "supervisor"])
+        yield " ".join(words)
+
+
+def populate(db: Database, rows: int, words_per_call: int, seed: int) -> float:
+    rng = random.Random(seed)
+    for company in range(1, COMPANIES + 1):
+        db.add_company(f"Company {company}", "2030-01-01", f"bench-admin-{company}", "password")
+        for i in range(EMPLOYEES_PER_COMPANY):
+            db.add_employee(company, f"bench-{company}-{i}", "password", "Bench", str(i))
+
+    start = time.perf_counter()
+    batch = []
+    for call_id, text in enumerate(transcripts(rows, words_per_call, rng), start=1):
+        call_ts = YEAR_START + rng.randrange(365 * 86400)
+        batch.append((rng.randint(1, COMPANIES * EMPLOYEES_PER_COMPANY), call_ts, call_ts,
+                      rng.randint(10, 900), text, f"bench-{call_id}.ogg", rng.choice(["Positive", "Neutral", "Negative"])))
+        if len(batch) == 10000 or call_id == rows:
+            with db._get_connection() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO call_records (employee_id, call_timestamp, call_ts, call_duration, transcription,
+                                              audio_file_path, sentiment)
+                    VALUES (?, strftime('%Y-%m-%dT%H:%M:%SZ', ?, 'unixepoch'), ?, ?, ?, ?, ?)
+                    """,
+                    batch
+                )
+            batch = []
+    return time.perf_counter() - start
+
+
+def like_search(db: Database, company_id: int, term: str) -> list:
+    with db._get_read_connection() as conn:
+        return conn.execute(
+            """
+            SELECT cr.call_id
+            FROM call_records cr
+                     JOIN employees e ON cr.employee_id = e.employee_id
+            WHERE e.company_id = ? AND cr.transcription LIKE ?
+            LIMIT 50
+            """,
+            (company_id, f"%{term}%")
+        ).fetchall()
+
+
+def time_call(func, repeats: int) -> dict:
+    timings, result = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": statistics.median(timings), "max_ms": max(timings), "results": len(result)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark full-text search over call transcriptions.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--words-per-call", type=int, default=80)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--skip-like", action="store_true", help="Skip the LIKE baseline (slow at 1M rows).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "search.sqlite")
+        db = Database(db_path=db_path, schema_path=os.path.join(SERVER_DIR, "db", "schema.sql"))
+        load_seconds = populate(db, args.rows, args.words_per_call, args.seed)
+        with db._get_connection() as conn:
+            conn.execute("INSERT INTO call_transcripts_fts (call_transcripts_fts) VALUES ('optimize')")
+        with db._get_connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size_mb = os.path.getsize(db_path) / 1024 / 1024
+        print(f"Inserted and indexed {args.rows} transcriptions in {load_seconds:.1f}s "
+              f"({args.rows / load_seconds:.0f} rows/s); database size {size_mb:.0f} MB.")
+
+        for name, query, filters in QUERIES:
+            stats = time_call(lambda: db.search_call_transcriptions(1, query, limit=50, **filters), args.repeats)
+            print(f"FTS5  {name:<26} p50 {stats['p50_ms']:8.1f} ms  max {stats['max_ms']:8.1f} ms  "
+                  f"{stats['results']} results")
+        if not args.skip_like:
+            for term in ("chargeback", "speak to a supervisor"):
+                stats = time_call(lambda: like_search(db, 1, term), max(1, args.repeats // 2))
+                print(f"LIKE  {term:<26} p50 {stats['p50_ms']:8.1f} ms  max {stats['max_ms']:8.1f} ms  "
+                      f"{stats['results']} results")
+        db.close()
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+
+# Run from the Server directory: python -m pytest test/test_asgi.py
+# Sends requests through FlaskAsgiApp the way uvicorn does (scope, receive, send), against a
+# small Flask app, and checks the request, the response and the event loop of async views.
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_PATH", os.path.join(TMP_DIR, "asgi.sqlite"))
+os.environ.setdefault("SCHEMA_PATH", os.path.join(SERVER_DIR, "db", "schema.sql"))
+os.environ.setdefault("RECORDINGS_DIR", os.path.join(TMP_DIR, "recordings"))
+os.environ.setdefault("RUN_ANALYSIS_WORKERS", "false")
+
+import pytest  # noqa: E402
+from flask import Flask, Response, jsonify, request  # noqa: E402
+
+from app.asgi import FlaskAsgiApp  # noqa: E402
+
+
+MAX_CONTENT_LENGTH = 1024
+
+
+def build_app(closed: threading.Event) -> Flask:
+    app = Flask(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = MAX_CONTENT_LENGTH
+
+    @app.route("/echo/<name>", methods=["POST"])
+    def echo(name):
+        return jsonify({
+            "name": name,
+            "args": request.args.to_dict(),
+            "body": request.get_data(as_text=True),
+            "content_type": request.content_type,
+            "forwarded": request.headers.get("X-Forwarded-For"),
+            "remote_addr": request.remote_addr,
+        })
+
+    @app.route("/upload", methods=["POST"])
+    def upload():
+        return jsonify({"size": len(request.get_data())})
+
+    @app.route("/async_form", methods=["POST"])
+    async def async_form():
+        await asyncio.sleep(0)
+        return jsonify({"form": request.form.to_dict(), "json": request.get_json(silent=True)})
+
+    @app.route("/stream")
+    def stream():
+        def lines():
+            try:
+                for i in range(3):
+                    yield f"line {i}\n"
+            finally:
+                closed.set()
+        return Response(lines(), mimetype="text/plain")
+
+    @app.route("/loop")
+    async def loop():
+        await asyncio.sleep(0)
+        return jsonify({"loop": id(asyncio.get_running_loop()), "thread": threading.current_thread().name})
+
+    return app
+
+
+async def call(application, method: str, path: str, query: bytes = b"", headers=(), body_chunks=(b"",),
+               unread: list = None):
+    """
+    Runs one request through the ASGI app; returns the response start and body messages.
+    The body messages the app did not receive are left in `unread`.
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query, "root_path": "",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "client": ("10.0.0.7", 51234), "server": ("testserver", 5000),
+    }
+    messages = unread if unread is not None else []
+    messages.extend({"type": "http.request", "body": chunk, "more_body": i < len(body_chunks) - 1}
+                    for i, chunk in enumerate(body_chunks))
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await application(scope, receive, send)
+    return sent[0], sent[1:]
+
+
+@pytest.fixture
+def closed():
+    return threading.Event()
+
+
+@pytest.fixture
+def application(closed):
+    application = FlaskAsgiApp(build_app(closed), threads=2, shutdown_drain_seconds=0)
+    yield application
+    application._executor.shutdown(wait=True)
+
+
+def test_request_reaches_the_wsgi_app(application):
+    start, body = asyncio.run(call(
+        application, "POST", "/echo/café", query=b"x=1&y=two",
+        headers=[("content-type", "text/plain"), ("x-forwarded-for", "a"), ("x-forwarded-for", "b")],
+        body_chunks=[b"hello ", b"world"],
+    ))
+    assert start["type"] == "http.response.start"
+    assert start["status"] == 200
+    assert (b"content-type", b"application/json") in start["headers"]
+    assert body[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+    assert json.loads(b"".join(message["body"] for message in body)) == {
+        "name": "café",
+        "args": {"x": "1", "y": "two"},
+        "body": "hello world",
+        "content_type": "text/plain",
+        "forwarded": "a,b",
+        "remote_addr": "10.0.0.7",
+    }
+
+
+def test_upload_is_read_as_it_arrives(application):
+    unread = []
+    start, body = asyncio.run(call(application, "POST", "/upload", body_chunks=[b"x" * 100] * 10, unread=unread))
+    assert start["status"] == 200
+    assert json.loads(b"".join(message["body"] for message in body)) == {"size": 1000}
+    assert unread == []
+
+
+@pytest.mark.parametrize("content_type, body, expected", [
+    ("application/x-www-form-urlencoded", b"a=1&b=two", {"form": {"a": "1", "b": "two"}, "json": None}),
+    ("application/json", b'{"a": 1}', {"form": {}, "json": {"a": 1}}),
+])
+def test_async_views_get_the_body_read_on_the_pool_thread(application, content_type, body, expected):
+    start, sent = asyncio.run(call(application, "POST", "/async_form", headers=[("content-type", content_type)],
+                                   body_chunks=[body[:4], body[4:]]))
+    assert start["status"] == 200
+    assert json.loads(b"".join(message["body"] for message in sent)) == expected
+
+
+@pytest.mark.parametrize("declared_length", [True, False], ids=["content-length", "chunked"])
+def test_oversized_upload_is_rejected_before_the_whole_body_is_read(application, declared_length):
+    chunks = [b"x" * 256] * 40
+    headers = [("content-length", str(len(chunks) * 256))] if declared_length else []
+    unread = []
+    start, body = asyncio.run(call(application, "POST", "/upload", headers=headers, body_chunks=chunks,
+                                   unread=unread))
+    assert start["status"] == 413
+    # The declared length is refused without reading; a chunked body once it passes the limit
+    received = len(chunks) - len(unread)
+    assert received == 0 if declared_length else received == MAX_CONTENT_LENGTH // 256 + 1
+
+
+def test_streamed_response_is_sent_in_chunks_and_closed(application, closed):
+    start, body = asyncio.run(call(application, "GET", "/stream"))
+    assert start["status"] == 200
+    assert [message["body"] for message in body if message["body"]] == [b"line 0\n", b"line 1\n", b"line 2\n"]
+    assert all(message["more_body"] for message in body[:-1])
+    assert closed.is_set()
+
+
+def test_not_found_is_answered(application):
+    start, body = asyncio.run(call(application, "GET", "/missing"))
+    assert start["status"] == 404
+    assert body[-1]["more_body"] is False
+
+
+def test_async_views_run_on_the_server_event_loop(application):
+    async def run():
+        start, body = await call(application, "GET", "/loop")
+        return start, json.loads(b"".join(message["body"] for message in body)), id(asyncio.get_running_loop())
+
+    start, result, server_loop = asyncio.run(run())
+    assert start["status"] == 200
+    assert result["loop"] == server_loop
+    assert result["thread"] == threading.main_thread().name
+
+
+def test_lifespan_startup_is_acknowledged(application):
+    async def run():
+        messages = [{"type": "lifespan.startup"}]
+        sent = []
+        received = asyncio.Event()
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            received.set()
+            # The server sends lifespan.shutdown on exit; not part of this test
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        task = asyncio.create_task(application({"type": "lifespan"}, receive, send))
+        await received.wait()
+        task.cancel()
+        return sent
+
+    assert asyncio.run(run()) == [{"type": "lifespan.startup.complete"}]
@@ -0,0 +1,54 @@
+import asyncio
+import os
+from functools import partial
+
+import pytest
+
+from db.async_database import AsyncDatabase
+from db.database import Database
+
+# Run from the Server directory: python -m pytest test/test_async_database.py
+# AsyncDatabase.batch() runs its calls in one read snapshot, so it only accepts reads.
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def async_db(tmp_path):
+    db = Database(db_path=str(tmp_path / "async.sqlite"), schema_path=os.path.join(SERVER_DIR, "db", "schema.sql"))
+    db.add_company("Async Check", "2030-01-01", "async-admin", "password")
+    async_db = AsyncDatabase(db, max_workers=2)
+    yield async_db
+    async_db.close()
+    db.close()
+
+
+def test_batch_reads_share_a_snapshot(async_db):
+    db = async_db.db
+
+    def add_category_from_another_thread():
+        # Committed while the batch's snapshot is open; not visible to its later reads
+        asyncio.run(async_db.add_category(1, "Billing", None))
+
+    before, _, after = asyncio.run(async_db.batch(
+        partial(db.get_categories_by_company, 1, use_cache=False),
+        add_category_from_another_thread,
+        partial(db.get_categories_by_company, 1, use_cache=False),
+    ))
+    assert before == after == []
+    assert [c["category_name"] for c in db.get_categories_by_company(1, use_cache=False)] == ["Billing"]
+
+
+def test_batch_refuses_writes(async_db):
+    db = async_db.db
+    with pytest.raises(RuntimeError, match="read snapshot"):
+        asyncio.run(async_db.batch(partial(db.add_category, 1, "Billing", None)))
+    assert db.get_categories_by_company(1, use_cache=False) == []
+
+
+def test_write_then_read_sees_the_write(async_db):
+    async def add_and_read():
+        await async_db.add_company("Second", "2030-01-01", "second-admin", "password")
+        return await async_db.get_company_by_admin(admin_username="second-admin")
+
+    assert asyncio.run(add_and_read())["company_name"] == "Second"
@@ -0,0 +1,107 @@
+import os
+import random
+
+import pytest
+
+from db.database import Database, unix_seconds
+
+# Run from the Server directory: python -m pytest test/test_call_stats_rollup.py
+# Applies a random mix of call inserts, analysis updates and category/employee/call deletes to a
+# scratch database, checking after each step that the call_stats_daily rollup matches
+# call_records, and that get_call_record_stats returns the same numbers as an aggregate of the
+# raw table.
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALLS = 2000
+RANGES = 300
+SEED = 7
+
+
+def random_timestamp(rng: random.Random) -> str:
+    return (f"2026-0{rng.randint(1, 3)}-{rng.randint(1, 28):02d}"
+            f"T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+            f"{rng.choice(['Z', '+03:00', '-05:00', '+0000'])}")
+
+
+def insert_calls(db: Database, rng: random.Random, calls: int):
+    db.add_company("Rollup Check", "2030-01-01", "rollup-admin", "password")
+    for i in range(4):
+        db.add_employee(1, f"rollup-employee-{i}", "password", "Rollup", str(i))
+    db.add_category(1, "Billing", None)
+    db.add_category(1, "Support", None)
+    for i in range(calls):
+        db.add_call_record(rng.randint(1, 4), random_timestamp(rng), 0, None, f"rollup-{i}.m4a", None)
+
+
+def update_calls(db: Database, rng: random.Random, calls: int):
+    for call_id in range(1, calls + 1):
+        db.update_call_duration(call_id, rng.randint(1, 900))
+        if rng.random() < 0.8:
+            db.update_call_analysis(call_id, "text", rng.choice(["Negative", "Neutral", "Positive"]),
+                                    rng.choice([None, 1, 2]))
+
+
+def delete_calls(db: Database):
+    db.delete_category(1, 1)
+    db.delete_employee(2)
+    with db._get_connection() as conn:
+        conn.execute("DELETE FROM call_records WHERE call_id % 7 = 0")
+
+
+def raw_stats(db: Database, start: str, end: str, employee_id, by_day: bool) -> list:
+    query = f"""
+        SELECT {"date(cr.call_ts, 'unixepoch') AS day," if by_day else ""}
+               COUNT(*), COALESCE(SUM(cr.call_duration), 0), COALESCE(SUM(cr.sentiment IS 'Negative'), 0)
+        FROM call_records cr
+                 JOIN employees e ON cr.employee_id = e.employee_id
+        WHERE e.company_id = 1
+          AND cr.call_ts BETWEEN ? AND ?
+          {"AND cr.employee_id = ?" if employee_id else ""}
+        {"GROUP BY day ORDER BY day" if by_day else ""}
+    """
+    params = (unix_seconds(start), unix_seconds(end)) + ((employee_id,) if employee_id else ())
+    with db._get_read_connection() as conn:
+        return [tuple(row) for row in conn.execute(query, params)]
+
+
+def assert_stats_match_raw(db: Database, rng: random.Random, ranges: int):
+    for _ in range(ranges):
+        start, end = sorted([random_timestamp(rng), random_timestamp(rng)], key=unix_seconds)
+        employee_id = rng.choice([None, 1, 3])
+        by_day = rng.random() < 0.5
+        rows = db.get_call_record_stats(1, start, end, employee_id, "day" if by_day else None)
+        stats = [((row['day'],) if by_day else ()) +
+                 (row['total_calls'], row['total_duration_seconds'], row['conflict_calls']) for row in rows]
+        assert stats == raw_stats(db, start, end, employee_id, by_day), \
+            f"stats {start}..{end} employee={employee_id} by_day={by_day}"
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(db_path=str(tmp_path / "rollup.sqlite"),
+                        schema_path=os.path.join(SERVER_DIR, "db", "schema.sql"))
+    yield database
+    database.close()
+
+
+def test_rollup_follows_inserts_updates_and_deletes(db):
+    rng = random.Random(SEED)
+    insert_calls(db, rng, CALLS)
+    assert db.reconcile_call_stats_daily() == []
+    update_calls(db, rng, CALLS)
+    assert db.reconcile_call_stats_daily() == []
+    delete_calls(db)
+    assert db.reconcile_call_stats_daily() == []
+    assert_stats_match_raw(db, rng, RANGES)
+
+
+def test_rebuilt_rollup_matches_call_records(db):
+    rng = random.Random(SEED)
+    insert_calls(db, rng, CALLS)
+    update_calls(db, rng, CALLS)
+    delete_calls(db)
+    with db._get_connection() as conn:
+        conn.execute("DELETE FROM call_stats_daily")
+    assert db.rebuild_call_stats_daily() > 0
+    assert db.reconcile_call_stats_daily() == []
+    assert_stats_match_raw(db, rng, RANGES)
@@ -0,0 +1,96 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from db.database import Database
+
+# Run from the Server directory: python -m pytest test/test_lookup_caches.py
+# Two Database objects on one file stand in for two processes (e.g. two web workers): writes made
+# through one must reach the lookup caches of the other within its sync interval.
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(SERVER_DIR, "db", "schema.sql")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "caches.sqlite")
+    db = Database(db_path=path, schema_path=SCHEMA_PATH)
+    db.add_company("Cache Check", "2030-01-01", "cache-admin", "password")
+    db.add_company("Other Company", "2030-01-01", "other-admin", "password")
+    db.add_employee(1, "cache-employee", "password", "Cache", "Check")
+    db.add_category(1, "Billing", None)
+    db.close()
+    return path
+
+
+def open_database(path: str, sync_seconds: float) -> Database:
+    return Database(db_path=path, schema_path=SCHEMA_PATH, lookup_cache_sync_seconds=sync_seconds)
+
+
+@pytest.fixture
+def reader(db_path):
+    """The process serving cached lookups; it only checks for other processes' writes when forced."""
+    db = open_database(db_path, sync_seconds=3600)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def writer(db_path):
+    db = open_database(db_path, sync_seconds=3600)
+    yield db
+    db.close()
+
+
+def test_user_update_reaches_the_other_process(reader, writer):
+    before = reader.get_user_last_updated("cache-employee")
+    changed_at = datetime.now(timezone.utc) + timedelta(seconds=5)
+    writer.update_user("cache-employee", "new-hash", changed_at)
+
+    # Within the sync interval the cached value may still be served...
+    assert reader.get_user_last_updated("cache-employee") == before
+    assert reader.lookup_caches_current()
+    # ...and is dropped by the next check
+    reader.sync_lookup_caches(force=True)
+    assert reader.get_user_last_updated("cache-employee") == changed_at
+
+
+def test_employee_changes_reach_the_other_process(reader, writer):
+    employee_id = writer.get_employees_by_company(1)[0]["employee_id"]
+    assert reader.get_company_id_by_employee_id(employee_id) == 1
+    with writer._get_connection() as conn:
+        conn.execute("UPDATE employees SET company_id = 2 WHERE employee_id = ?", (employee_id,))
+    reader.sync_lookup_caches(force=True)
+    assert reader.get_company_id_by_employee_id(employee_id) == 2
+
+    writer.delete_employee(employee_id)
+    reader.sync_lookup_caches(force=True)
+    assert reader.get_company_id_by_employee_id(employee_id) is None
+    assert reader.get_user_last_updated("cache-employee") is None
+
+
+def test_category_delete_reaches_the_other_process(reader, writer):
+    [category] = reader.get_categories_by_company(1)
+    writer.delete_category(1, category["category_id"])
+    reader.sync_lookup_caches(force=True)
+    assert reader.get_categories_by_company(1) == []
+
+
+def test_unrelated_writes_keep_the_caches(reader, writer):
+    reader.get_categories_by_company(1)
+    writer.add_call_record(1, "2026-01-01T10:00:00Z", 60, None, "call.m4a", None)
+    reader.sync_lookup_caches(force=True)
+    assert reader.company_categories_cache.lookup(1)[0]
+
+
+def test_without_a_sync_interval_every_lookup_sees_other_writes(db_path, writer):
+    reader = open_database(db_path, sync_seconds=0)
+    try:
+        [category] = reader.get_categories_by_company(1)
+        assert not reader.lookup_caches_current()
+        writer.delete_category(1, category["category_id"])
+        assert reader.get_categories_by_company(1) == []
+    finally:
+        reader.close()
@@ -0,0 +1,185 @@
+import os
+import re
+import sqlite3
+
+import pytest
+
+from db.database import Database
+
+# Run from the Server directory: python -m pytest test/test_query_plans.py
+# Calls every Database query method against a scratch database, captures the SQL it runs and
+# fails if the EXPLAIN QUERY PLAN of any statement scans a whole table or index instead of
+# searching it.
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statements that read a whole table on purpose
+ALLOWED_SCANS = {
+    # Runs once at worker start-up
+    "requeue_unfinished_analysis_jobs",
+    # Counts every job; served by the covering status index
+    "count_analysis_jobs_by_status",
+    # Maintenance commands over the whole rollup
+    "reconcile_call_stats_daily",
+    "rebuild_call_stats_daily",
+    # Reads the few rows of cache_versions
+    "sync_lookup_caches",
+}
+
+EXPLAINED_STATEMENT = re.compile(r"^\s*(SELECT|UPDATE|DELETE|INSERT|WITH)\b", re.IGNORECASE)
+# Virtual tables (FTS5) report "SCAN <name> VIRTUAL TABLE INDEX ..." for their own index lookups
+TABLE_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\S+)(?!\S| VIRTUAL TABLE)")
+# Statements FTS5 runs against its own shadow tables
+FTS_INTERNAL = re.compile(r"'main'\.'\w+'")
+# Subqueries in FROM; scanning their (already filtered) rows is expected
+SUBQUERY = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\S+)")
+
+
+def seed(db: Database):
+    db.add_company("Plan Check", "2030-01-01", "plan-admin", "password")
+    db.add_employee(1, "plan-employee", "password", "Plan", "Check")
+    db.add_category(1, "Billing", "Billing questions")
+    for i in range(20):
+        db.add_call_record(1, f"2026-01-{i + 1:02d}T10:00:00Z", 60, None, f"plan-{i}.m4a", None)
+
+
+def query_calls(db: Database):
+    """Every Database method that issues SQL, with representative arguments."""
+    return [
+        ("sync_lookup_caches", lambda: db.sync_lookup_caches(force=True)),
+        ("get_user", lambda: db.get_user("plan-employee")),
+        ("get_user_details_for_login", lambda: db.get_user_details_for_login("plan-employee", "password")),
+        ("is_user_admin", lambda: db.is_user_admin("plan-admin")),
+        ("get_company_by_id", lambda: db.get_company_by_id(1)),
+        ("get_company_id_by_employee_id", lambda: db.get_company_id_by_employee_id(1)),
+        ("get_company_by_admin", lambda: db.get_company_by_admin("plan-admin")),
+        ("get_employees_by_company", lambda: db.get_employees_by_company(1)),
+        ("get_categories_by_company", lambda: db.get_categories_by_company(1)),
+        ("get_call_records", lambda: db.get_call_records(1, "2026-01-01T00:00:00Z", "2026-02-01T00:00:00Z")),
+        ("get_call_records (employee)",
+         lambda: db.get_call_records(1, "2026-01-01T00:00:00Z", "2026-02-01T00:00:00Z", 1)),
+        ("get_call_record_stats",
+         lambda: db.get_call_record_stats(1, "2026-01-01T00:00:00Z", "2026-02-01T00:00:00Z")),
+        ("get_call_record_stats (day)",
+         lambda: db.get_call_record_stats(1, "2026-01-01T00:00:00Z", "2026-02-01T00:00:00Z", 1, "day")),
+        ("get_call_record_stats (category)",
+         lambda: db.get_call_record_stats(1, "2026-01-01T00:00:00Z", "2026-02-01T00:00:00Z", None, "category")),
+        ("reconcile_call_stats_daily", lambda: db.reconcile_call_stats_daily()),
+        ("rebuild_call_stats_daily", lambda: db.rebuild_call_stats_daily()),
+        ("get_call_records (page)",
+         lambda: db.get_call_records(1, "2026-01-01T00:00:00Z", "2026-02-01T00:00:00Z", None,
+                                     ["call_timestamp", "sentiment"], (1767657600, 5), 50)),
+        ("get_call_records (agent negative)",
+         lambda: db.get_call_records(1, "2026-01-01T00:00:00Z", "2026-02-01T00:00:00Z",
+                                     negative_role="agent")),
+        ("get_call_transcription", lambda: db.get_call_transcription(1, 1)),
+        ("search_call_transcriptions",
+         lambda: db.search_call_transcriptions(1, "hello", "2026-01-01T00:00:00Z", "2026-02-01T00:00:00Z", 1)),
+        ("update_call_duration", lambda: db.update_call_duration(1, 61)),
+        ("update_call_talk_duration", lambda: db.update_call_talk_duration(1, 42)),
+        ("replace_call_segments", lambda: db.replace_call_segments(
+            1, [{"text": "hola", "speaker": "Guest-1", "role": "agent", "start_ms": 0, "end_ms": 900}])),
+        ("get_call_segments", lambda: db.get_call_segments(1, 1)),
+        ("get_speaker_conflict_metrics",
+         lambda: db.get_speaker_conflict_metrics(1, "2026-01-01T00:00:00Z", "2026-02-01T00:00:00Z", 1)),
+        ("update_call_analysis", lambda: db.update_call_analysis(1, "hello", "Neutral", None)),
+        ("claim_analysis_jobs", lambda: db.claim_analysis_jobs(4, 60)),
+        ("renew_analysis_job_leases", lambda: db.renew_analysis_job_leases([2, 3], 60)),
+        ("complete_analysis_job", lambda: db.complete_analysis_job(2)),
+        ("fail_analysis_job", lambda: db.fail_analysis_job(3, "error", 3)),
+        ("release_analysis_jobs", lambda: db.release_analysis_jobs([4])),
+        ("requeue_unfinished_analysis_jobs", lambda: db.requeue_unfinished_analysis_jobs()),
+        ("get_analysis_job", lambda: db.get_analysis_job(2)),
+        ("count_analysis_jobs_by_status", lambda: db.count_analysis_jobs_by_status()),
+        ("claim_recording", lambda: db.claim_recording(1, "original", 60)),
+        ("release_recording_claim", lambda: db.release_recording_claim(1)),
+        ("update_recording_storage", lambda: db.update_recording_storage(1, "plan-0.ogg", 100, "opus")),
+        ("get_recordings_to_archive", lambda: db.get_recordings_to_archive(10)),
+        ("get_recordings_older_than", lambda: db.get_recordings_older_than("opus", 90, 10)),
+        ("get_storage_usage", lambda: db.get_storage_usage(1)),
+        ("get_user_last_updated", lambda: db.get_user_last_updated("plan-employee")),
+        ("update_user", lambda: db.update_user("plan-employee", "hash")),
+        ("add_or_update_daily_summary", lambda: db.add_or_update_daily_summary(1, "2026-01-01", "summary")),
+        ("get_summary_at_day", lambda: db.get_summary_at_day(1, "2026-01-01")),
+        ("update_daily_summary", lambda: db.update_daily_summary(1, "2026-01-01", "summary")),
+        ("get_company_id_by_emp_id", lambda: db.get_company_id_by_emp_id(1)),
+        ("delete_category", lambda: db.delete_category(1, 1)),
+    ]
+
+
+def capture_statements(db: Database) -> list:
+    """Runs every query method and returns (method, sql) for the statements it executed."""
+    captured, current = [], {"method": None}
+    pool = db._pool
+    connect = pool._connect
+
+    def traced_connect(read_only):
+        conn = connect(read_only)
+        conn.set_trace_callback(lambda sql: captured.append((current["method"], sql)))
+        return conn
+
+    # Connections opened so far were not traced
+    pool.close()
+    pool._connect = traced_connect
+    for method, call in query_calls(db):
+        current["method"] = method
+        call()
+    return [(method, sql) for method, sql in captured
+            if EXPLAINED_STATEMENT.match(sql) and not FTS_INTERNAL.search(sql)]
+
+
+def query_plan(conn: sqlite3.Connection, sql: str) -> list:
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def find_table_scans(db_path: str, statements: list) -> list:
+    conn = sqlite3.connect(db_path)
+    failures = []
+    for method, sql in statements:
+        plan = query_plan(conn, sql)
+        subqueries = {match.group(1) for match in map(SUBQUERY.match, plan) if match}
+        scans = [detail for detail in plan
+                 if TABLE_SCAN.match(detail) and TABLE_SCAN.match(detail).group(1) not in subqueries]
+        if scans and method not in ALLOWED_SCANS:
+            failures.append((method, " ".join(sql.split()), scans))
+    conn.close()
+    return failures
+
+
+@pytest.fixture(scope="module")
+def captured(tmp_path_factory):
+    """The scratch database path and the (method, sql) statements run by every query method."""
+    db_path = str(tmp_path_factory.mktemp("plans") / "plans.sqlite")
+    # The lookup caches are synced once, explicitly, instead of by whichever query comes first
+    db = Database(db_path=db_path, schema_path=os.path.join(SERVER_DIR, "db", "schema.sql"),
+                  lookup_cache_sync_seconds=3600)
+    seed(db)
+    statements = capture_statements(db)
+    db.close()
+    return db_path, statements
+
+
+def test_no_full_table_scans(captured):
+    db_path, statements = captured
+    failures = find_table_scans(db_path, statements)
+    assert not failures, "\n".join(f"{method}: {'; '.join(scans)}\n    {sql}" for method, sql, scans in failures)
+
+
+@pytest.mark.parametrize("method", [
+    "get_call_records",
+    "get_call_records (employee)",
+    "get_call_records (page)",
+    "get_call_record_stats",
+    "search_call_transcriptions",
+    "get_speaker_conflict_metrics",
+])
+def test_call_time_ranges_use_employee_time_index(captured, method):
+    db_path, statements = captured
+    conn = sqlite3.connect(db_path)
+    plans = [query_plan(conn, sql) for name, sql in statements if name == method]
+    conn.close()
+    assert plans
+    for plan in plans:
+        assert any("idx_call_records_employee_ts (employee_id=? AND call_ts>? AND call_ts<?)" in detail
+                   for detail in plan), plan
+        assert not any(re.match(r"SCAN (cr|call_records)\b", detail) for detail in plan), plan
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+# Run from the Server directory: python -m pytest test/test_recording_storage.py
+# Runs concurrent storage sweeps (as every worker process does) over a scratch database with a
+# stand-in encoder, checking that each recording is transcoded and deleted by exactly one of them.
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_PATH", os.path.join(TMP_DIR, "storage.sqlite"))
+os.environ.setdefault("SCHEMA_PATH", os.path.join(SERVER_DIR, "db", "schema.sql"))
+os.environ.setdefault("RECORDINGS_DIR", os.path.join(TMP_DIR, "recordings"))
+os.environ.setdefault("RUN_ANALYSIS_WORKERS", "false")
+
+import pytest  # noqa: E402
+
+from app import storage  # noqa: E402
+from db.database import Database  # noqa: E402
+
+CALLS = 20
+SWEEPS = 4
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    db = Database(db_path=str(tmp_path / "storage.sqlite"), schema_path=os.path.join(SERVER_DIR, "db", "schema.sql"))
+    db.add_company("Storage Check", "2030-01-01", "storage-admin", "password")
+    db.add_employee(1, "storage-employee", "password", "Storage", "Check")
+    for i in range(CALLS):
+        path = tmp_path / f"call-{i}.m4a"
+        path.write_bytes(b"audio")
+        call_id = db.add_call_record(1, "2020-01-01T10:00:00Z", 60, None, str(path), None)
+        db.update_call_analysis(call_id, "text", "Neutral", None)
+    for job in db.claim_analysis_jobs(CALLS, 60):
+        db.complete_analysis_job(job["job_id"])
+    monkeypatch.setattr(storage, "db_service", db)
+    # Only the archive step unless a test enables the others
+    monkeypatch.setattr(storage.config, "RECORDING_COLD_AFTER_DAYS", 0)
+    monkeypatch.setattr(storage.config, "RECORDING_RETENTION_DAYS", 0)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def transcoded(monkeypatch):
+    """Counts the transcodes of each source file; slow enough for the sweeps to overlap."""
+    counts = Counter()
+    lock = threading.Lock()
+
+    def transcode_to_opus(source_path, target_path, bitrate):
+        with lock:
+            counts[source_path] += 1
+        time.sleep(0.01)
+        with open(target_path, "wb") as f:
+            f.write(b"opus")
+
+    monkeypatch.setattr(storage, "transcode_to_opus", transcode_to_opus)
+    return counts
+
+
+def run_concurrent_sweeps() -> list:
+    results = [None] * SWEEPS
+
+    def sweep(i):
+        results[i] = storage.apply_retention_tiers()
+
+    threads = [threading.Thread(target=sweep, args=(i,)) for i in range(SWEEPS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def tiers(db: Database) -> Counter:
+    with db._get_read_connection() as conn:
+        return Counter(row[0] for row in conn.execute("SELECT storage_tier FROM call_records"))
+
+
+def test_each_recording_is_archived_by_one_sweep(db, transcoded):
+    results = run_concurrent_sweeps()
+    assert sum(result["opus"] for result in results) == CALLS
+    assert set(transcoded.values()) == {1}
+    assert tiers(db) == {"opus": CALLS}
+    for record in db.get_recordings_older_than("opus", 0, CALLS):
+        assert open(record["audio_file_path"], "rb").read() == b"opus"
+        assert not os.path.exists(os.path.splitext(record["audio_file_path"])[0] + ".m4a")
+
+
+def test_each_recording_is_deleted_by_one_sweep(db, transcoded, monkeypatch):
+    storage.apply_retention_tiers()
+    monkeypatch.setattr(storage.config, "RECORDING_RETENTION_DAYS", 1)
+    results = run_concurrent_sweeps()
+    assert sum(result["deleted"] for result in results) == CALLS
+    assert tiers(db) == {"deleted": CALLS}
+
+
+def test_claims_are_exclusive_until_released(db):
+    assert db.claim_recording(1, "original", 60)
+    assert not db.claim_recording(1, "original", 60)
+    assert not db.claim_recording(2, "opus", 60)
+    db.release_recording_claim(1)
+    assert db.claim_recording(1, "original", 60)
+    db.update_recording_storage(1, "call-1.ogg", 4, "opus")
+    assert not db.claim_recording(1, "original", 60)
+    assert db.claim_recording(1, "opus", 60)
+    # An expired claim (its process died) can be taken over
+    assert db.claim_recording(2, "original", -1)
+    assert db.claim_recording(2, "original", 60)
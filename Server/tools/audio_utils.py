@@ -1,4 +1,5 @@
 from pydub import AudioSegment
+from pydub.utils import mediainfo
 
 
 def convert_m4a_to_wav(input_file, output_file=None):
@@ -34,3 +35,147 @@ def convert_m4a_to_wav(input_file, output_file=None):
         raise FileNotFoundError(f"Input file {input_file} does not exist.")
     except Exception as e:
         raise Exception(f"An error occurred during conversion: {e}")
+
+
+def probe_duration_seconds(input_file):
+    """
+    Reads the duration of an audio file from its container headers with ffprobe,
+    without decoding the audio.
+
+    Args:
+        input_file (str): Path to the audio file.
+
+    Returns:
+        float: Duration in seconds.
+
+    Raises:
+        ValueError: If ffprobe reports no duration for the file.
+    """
+    info = mediainfo(input_file)
+    try:
+        return float(info['duration'])
+    except (KeyError, ValueError):
+        raise ValueError(f"Could not read the duration of {input_file}")
+
+
+def convert_to_wav(input_file, output_file, sample_rate=16000, channels=1):
+    """
+    Decodes any ffmpeg-supported audio file and writes it as 16-bit PCM WAV,
+    resampled to the format preferred by the speech-to-text engine.
+
+    Args:
+        input_file (str): Path to the input audio file.
+        output_file (str): Path to save the output WAV file.
+        sample_rate (int, optional): Output sample rate in Hz. Defaults to 16 kHz.
+        channels (int, optional): Output channel count. Defaults to mono.
+
+    Returns:
+        str: Path to the converted WAV file.
+    """
+    audio = AudioSegment.from_file(input_file)
+    audio = audio.set_frame_rate(sample_rate).set_channels(channels).set_sample_width(2)
+    audio.export(output_file, format="wav")
+    return output_file
+
+
+def transcode_to_opus(input_file, output_file, bitrate="32k"):
+    """
+    Encodes an audio file as mono Opus in an OGG container, tuned for speech.
+
+    Args:
+        input_file (str): Path to the input audio file.
+        output_file (str): Path to save the OGG file.
+        bitrate (str, optional): Target bitrate, e.g. "32k".
+
+    Returns:
+        str: Path to the OGG file.
+    """
+    audio = AudioSegment.from_file(input_file).set_channels(1)
+    audio.export(output_file, format="ogg", codec="libopus", bitrate=bitrate,
+                 parameters=["-application", "voip"])
+    return output_file
+
+
+def detect_speech(audio, frame_ms=30, silence_thresh_dbfs=-40.0, min_silence_ms=1000):
+    """
+    Finds the speech in a recording with an energy-based voice activity detector: a frame is
+    voiced when its loudness is above silence_thresh_dbfs, and pauses shorter than
+    min_silence_ms are kept inside the surrounding speech.
+
+    Args:
+        audio (AudioSegment): The recording.
+        frame_ms (int, optional): Analysis frame length in milliseconds.
+        silence_thresh_dbfs (float, optional): Loudness (dBFS) below which a frame is silent.
+        min_silence_ms (int, optional): Shortest silence that separates two speech ranges.
+
+    Returns:
+        list: (start_ms, end_ms) of each speech range, in order.
+    """
+    ranges = []
+    start = end = None
+    for position in range(0, len(audio), frame_ms):
+        if audio[position:position + frame_ms].dBFS <= silence_thresh_dbfs:
+            continue
+        if start is None or position - end >= min_silence_ms:
+            if start is not None:
+                ranges.append((start, end))
+            start = position
+        end = min(position + frame_ms, len(audio))
+    if start is not None:
+        ranges.append((start, end))
+    return ranges
+
+
+def remove_silence(input_file, output_file, frame_ms=30, silence_thresh_dbfs=-40.0, min_silence_ms=1000,
+                   padding_ms=200):
+    """
+    Writes a WAV file with only the speech of a recording: leading and trailing silence is
+    trimmed and every silence of min_silence_ms or more is cut down to 2 * padding_ms.
+
+    Args:
+        input_file (str): Path to the input WAV file.
+        output_file (str): Path to save the output WAV file (may be the input file).
+        frame_ms, silence_thresh_dbfs, min_silence_ms: See detect_speech.
+        padding_ms (int, optional): Silence kept before and after each speech range.
+
+    Returns:
+        tuple: (talk_seconds, total_seconds, kept_ranges): the speech and total length of the
+            input recording, and the (start_ms, end_ms) ranges of the input that were kept, in
+            the order they appear in the output (see speech_time_to_source).
+    """
+    audio = AudioSegment.from_wav(input_file)
+    ranges = detect_speech(audio, frame_ms, silence_thresh_dbfs, min_silence_ms)
+
+    # Joined in one step: concatenating AudioSegments one by one copies the audio each time
+    pieces = []
+    kept_ranges = []
+    previous_end = 0
+    for start, end in ranges:
+        start = max(previous_end, start - padding_ms)
+        previous_end = min(len(audio), end + padding_ms)
+        pieces.append(audio[start:previous_end].raw_data)
+        kept_ranges.append((start, previous_end))
+    audio._spawn(b"".join(pieces)).export(output_file, format="wav")
+
+    talk_ms = sum(end - start for start, end in ranges)
+    return talk_ms / 1000.0, len(audio) / 1000.0, kept_ranges
+
+
+def speech_time_to_source(seconds, kept_ranges):
+    """
+    Maps a time in the output of remove_silence back to the same instant in the input recording.
+
+    Args:
+        seconds (float): Time in the speech-only audio.
+        kept_ranges (list): The kept_ranges returned by remove_silence.
+
+    Returns:
+        float: Time in the input recording, in seconds.
+    """
+    position_ms = seconds * 1000
+    output_start = 0
+    for start, end in kept_ranges:
+        if position_ms <= output_start + (end - start):
+            return (start + position_ms - output_start) / 1000.0
+        output_start += end - start
+    return kept_ranges[-1][1] / 1000.0 if kept_ranges else seconds
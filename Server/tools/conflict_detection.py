@@ -1,23 +1,68 @@
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+# torch and transformers are imported inside ConflictDetector so that importing this
+# module (e.g. from the web process) does not load them.
+
+
+# Sentence boundaries: whitespace after terminal punctuation (incl. ellipsis)
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?\u2026])\s+')
+
+
+@dataclass
+class ConflictAnalysis:
+    """Call-level conflict verdict aggregated from per-chunk sentiment."""
+    label: str
+    # Negative probability of the most negative chunk
+    negative_score: float
+    # Character offsets of the most negative chunk in the analyzed text
+    segment_start: Optional[int]
+    segment_end: Optional[int]
+    chunk_count: int
+    # (label, negative_score) of each turn, for conversations analyzed as speaker turns
+    turn_sentiments: Optional[List[Tuple[str, float]]] = None
 
 
 class ConflictDetector:
-    def __init__(self):
-        """Initializes the translation and sentiment analysis pipelines."""
+    def __init__(
+            self,
+            max_batch_size: int = 8,
+            max_chunk_tokens: int = 256,
+            negative_threshold: float = 0.7,
+            backend: str = "torch",
+            onnx_model_dir: str = "models/onnx"
+    ):
+        """
+        Initializes the translation and sentiment analysis models.
+
+        Args:
+            max_batch_size (int): Maximum number of texts run through each model in one forward pass.
+            max_chunk_tokens (int): Maximum translation tokens per chunk of a long conversation.
+            negative_threshold (float): A call is labeled Negative when any chunk's negative
+                probability reaches this value.
+            backend (str): Inference backend, one of tools.inference_backends.BACKENDS.
+            onnx_model_dir (str): Where exported ONNX graphs are cached for the onnx backends.
+        """
+        from transformers import AutoTokenizer
+        from tools.inference_backends import load_translation_model, load_sentiment_model
+
+        self.max_batch_size = max(1, max_batch_size)
+        self.negative_threshold = negative_threshold
+
         # Load tokenizer and model for translator
         translation_model_name = "Helsinki-NLP/opus-mt-es-en"
         self.translation_tokenizer = AutoTokenizer.from_pretrained(translation_model_name)
-        self.translator = pipeline(
-            "translation_es_to_en",
-            model=translation_model_name,
-            tokenizer=self.translation_tokenizer
-        )
+        self.translation_model = load_translation_model(translation_model_name, backend, onnx_model_dir)
+        # Leave room for the special tokens the tokenizer appends
+        self.max_chunk_tokens = min(max_chunk_tokens, self.translation_tokenizer.model_max_length - 2)
 
         # Load tokenizer and model for sentiment analysis
         sentiment_model_name = "cardiffnlp/twitter-roberta-base-sentiment"
-        sentiment_tokenizer = AutoTokenizer.from_pretrained(sentiment_model_name)
-        sentiment_model = AutoModelForSequenceClassification.from_pretrained(sentiment_model_name)
-        self.sentiment_analyzer = pipeline("sentiment-analysis", model=sentiment_model, tokenizer=sentiment_tokenizer)
+        self.sentiment_tokenizer = AutoTokenizer.from_pretrained(sentiment_model_name)
+        self.sentiment_model = load_sentiment_model(sentiment_model_name, backend, onnx_model_dir)
+        self.backend = backend
 
         # Map label IDs to human-readable form
         self.label_map = {
@@ -26,44 +71,230 @@ class ConflictDetector:
             "LABEL_2": "Positive"
         }
 
+    def _translate_batch(self, texts: List[str]) -> List[str]:
+        """Translates a batch of Spanish texts to English in a single padded generate call."""
+        import torch
+
+        inputs = self.translation_tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.translation_tokenizer.model_max_length
+        )
+        with torch.no_grad():
+            outputs = self.translation_model.generate(**inputs)
+        return self.translation_tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def _classify_batch(self, texts: List[str]) -> List[List[float]]:
+        """Runs the sentiment model on a batch of English texts. Returns the probabilities of each label id."""
+        import torch
+
+        inputs = self.sentiment_tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.sentiment_tokenizer.model_max_length
+        )
+        with torch.no_grad():
+            return self.sentiment_model(**inputs).logits.softmax(dim=-1).tolist()
+
+    def _label_probabilities(self, probabilities: List[float]) -> dict:
+        id2label = self.sentiment_model.config.id2label
+        return {self.label_map.get(id2label[i], id2label[i]): p for i, p in enumerate(probabilities)}
+
+    def _count_tokens(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        encoded = self.translation_tokenizer(texts, add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def _split_into_chunks(self, conversation: str) -> List[Tuple[int, int]]:
+        """
+        Splits a conversation into chunks of whole sentences that fit in max_chunk_tokens.
+        Sentences longer than the limit are split at word boundaries.
+        Returns the (start, end) character offsets of each chunk.
+        """
+        sentences = []
+        start = len(conversation) - len(conversation.lstrip())
+        for boundary in SENTENCE_BOUNDARY.finditer(conversation):
+            sentences.append((start, boundary.start()))
+            start = boundary.end()
+        sentences.append((start, len(conversation.rstrip())))
+        sentences = [(start, end) for start, end in sentences if end > start]
+        if not sentences:
+            return []
+
+        pieces = []
+        for (start, end), tokens in zip(sentences, self._count_tokens([conversation[s:e] for s, e in sentences])):
+            if tokens <= self.max_chunk_tokens:
+                pieces.append((start, end, tokens))
+                continue
+            words = [(m.start() + start, m.end() + start) for m in re.finditer(r'\S+', conversation[start:end])]
+            word_tokens = self._count_tokens([conversation[s:e] for s, e in words])
+            pieces.extend((s, e, max(1, t)) for (s, e), t in zip(words, word_tokens))
+
+        chunks = []
+        chunk_start, chunk_end, chunk_tokens = pieces[0]
+        for start, end, tokens in pieces[1:]:
+            if chunk_tokens + tokens > self.max_chunk_tokens:
+                chunks.append((chunk_start, chunk_end))
+                chunk_start, chunk_tokens = start, 0
+            chunk_end = end
+            chunk_tokens += tokens
+        chunks.append((chunk_start, chunk_end))
+        return chunks
+
+    def _split_into_turn_chunks(self, turns: List[str]) -> Tuple[str, List[Tuple[int, int]], List[int]]:
+        """
+        Chunks a conversation given as speaker turns: every chunk lies within one turn (long
+        turns are split like a conversation). Returns the turns joined by spaces, the chunk
+        offsets in that text and the turn index of each chunk.
+        """
+        spans, owners = [], []
+        offset = 0
+        for turn_index, turn in enumerate(turns):
+            for start, end in self._split_into_chunks(turn):
+                spans.append((offset + start, offset + end))
+                owners.append(turn_index)
+            offset += len(turn) + 1
+        return " ".join(turns), spans, owners
+
+    def analyze_batch(self, conversations: List[Union[str, List[str]]]) -> List[ConflictAnalysis]:
+        """
+        Analyzes a list of conversations. Each conversation is split into sentence chunks, all
+        chunks of all conversations are translated and classified together in padded batches,
+        and the per-chunk sentiment is combined into one verdict per conversation.
+
+        A conversation given as a list of speaker turns is chunked within its turns, so the same
+        pass also yields the sentiment of each turn (ConflictAnalysis.turn_sentiments); its
+        segment offsets refer to the turns joined by spaces.
+
+        Args:
+            conversations (List[Union[str, List[str]]]): Conversation texts in Spanish, or the
+                texts of their turns.
+
+        Returns:
+            List[ConflictAnalysis]: One analysis per conversation, in the same order as the input.
+        """
+        texts, spans, turn_owners = [], [], []
+        for conversation in conversations:
+            if isinstance(conversation, str):
+                texts.append(conversation)
+                spans.append(self._split_into_chunks(conversation))
+                turn_owners.append(None)
+            else:
+                text, conv_spans, owners = self._split_into_turn_chunks(conversation)
+                texts.append(text)
+                spans.append(conv_spans)
+                turn_owners.append((len(conversation), owners))
+        chunks = [(i, texts[i][start:end]) for i, conv_spans in enumerate(spans) for start, end in conv_spans]
+
+        # Batch chunks of similar length together to minimise padding
+        order = sorted(range(len(chunks)), key=lambda c: len(chunks[c][1]))
+        chunk_probabilities = [None] * len(chunks)
+        for start in range(0, len(order), self.max_batch_size):
+            batch_indices = order[start:start + self.max_batch_size]
+            translated = self._translate_batch([chunks[c][1] for c in batch_indices])
+            for c, probabilities in zip(batch_indices, self._classify_batch(translated)):
+                chunk_probabilities[c] = self._label_probabilities(probabilities)
+
+        analyses = []
+        offset = 0
+        for conv_spans, owners in zip(spans, turn_owners):
+            conv_probabilities = chunk_probabilities[offset:offset + len(conv_spans)]
+            offset += len(conv_spans)
+            analysis = self._aggregate(conv_spans, conv_probabilities)
+            print(f"Sentiment: {analysis.label} over {analysis.chunk_count} chunks "
+                  f"(most negative chunk: {analysis.negative_score:.4f})")
+            if owners is not None:
+                turn_count, chunk_turns = owners
+                turn_chunks = [[] for _ in range(turn_count)]
+                for c, turn_index in enumerate(chunk_turns):
+                    turn_chunks[turn_index].append(c)
+                turn_analyses = [self._aggregate([conv_spans[c] for c in cs], [conv_probabilities[c] for c in cs])
+                                 for cs in turn_chunks]
+                analysis.turn_sentiments = [(turn.label, turn.negative_score) for turn in turn_analyses]
+            analyses.append(analysis)
+        return analyses
+
+    def _aggregate(self, spans: List[Tuple[int, int]], chunk_probabilities: List[dict]) -> ConflictAnalysis:
+        """
+        Combines chunk sentiment into a call-level verdict: Negative if any chunk is confidently
+        negative, otherwise the label with the highest length-weighted mean probability.
+        """
+        if not spans:
+            return ConflictAnalysis("Neutral", 0.0, None, None, 0)
+
+        worst = max(range(len(spans)), key=lambda c: chunk_probabilities[c].get("Negative", 0.0))
+        negative_score = chunk_probabilities[worst].get("Negative", 0.0)
+
+        if negative_score >= self.negative_threshold:
+            label = "Negative"
+        else:
+            weights = [end - start for start, end in spans]
+            totals = {}
+            for weight, probabilities in zip(weights, chunk_probabilities):
+                for chunk_label, p in probabilities.items():
+                    totals[chunk_label] = totals.get(chunk_label, 0.0) + weight * p
+            label = max(totals, key=totals.get)
+
+        return ConflictAnalysis(label, negative_score, spans[worst][0], spans[worst][1], len(spans))
+
+    def detect_conflict_batch(self, conversations: List[str]) -> List[str]:
+        """
+        Returns the sentiment label ("Negative", "Neutral" or "Positive") of each conversation,
+        in the same order as the input. See analyze_batch.
+        """
+        return [analysis.label for analysis in self.analyze_batch(conversations)]
+
     def detect_conflict(self, conversation: str) -> bool:
         """
-        Determines if a conversation contains conflict by translating each line
+        Determines if a conversation contains conflict by translating it
         to English and then analyzing its sentiment.
 
         Args:
             conversation (str): The conversation text in Spanish.
 
         Returns:
-            bool: True if conflict is detected, False otherwise.
+            The sentiment label, or False if the conversation could not be processed.
         """
-        # Get the maximum length for the translation model's input
-        max_translation_length = self.translation_tokenizer.model_max_length
-
         try:
-            # Encode the exchange to get token length and truncate if necessary.
-            # This prevents the "Token indices sequence length is longer..." error.
-            tokens = self.translation_tokenizer.encode(
-                conversation,
-                truncation=True,
-                max_length=max_translation_length
-            )
-
-            # Decode the tokens back to a string for translation
-            truncated_exchange = self.translation_tokenizer.decode(tokens, skip_special_tokens=True)
-
-            # Translate the exchange to English
-            translated = self.translator(truncated_exchange)[0]['translation_text']
-            print(f"Translated: {translated}")
-
-            # Analyze sentiment on the English text
-            sentiment = self.sentiment_analyzer(translated)[0]
-            label = self.label_map.get(sentiment['label'], sentiment['label'])
-            score = sentiment['score']
-            print(f"Sentiment: {label} (score: {score:.4f})")
-            # if label == "Negative" and score < 0.7:
-            #     label = "Neutral"
-            return label
+            return self.detect_conflict_batch([conversation])[0]
         except Exception as e:
             print(f"Error processing line: {conversation}\n{e}")
         return False
+
+
+# --- Process pool entry points ---
+# ConflictDetector is CPU bound, so the analysis workers run it in a separate
+# process pool. Each pool process loads its own copy of the models once.
+# The models are loaded on the first job (or by warm_up_worker), not when the pool starts.
+_worker_detector = None
+_worker_settings = {}
+
+
+def init_conflict_worker(max_batch_size: int = 8, max_chunk_tokens: int = 256, backend: str = "torch",
+                         onnx_model_dir: str = "models/onnx"):
+    """Process pool initializer: records the detector settings of the worker process."""
+    _worker_settings.update(max_batch_size=max_batch_size, max_chunk_tokens=max_chunk_tokens,
+                            backend=backend, onnx_model_dir=onnx_model_dir)
+
+
+def _get_worker_detector() -> ConflictDetector:
+    global _worker_detector
+    if _worker_detector is None:
+        _worker_detector = ConflictDetector(**_worker_settings)
+    return _worker_detector
+
+
+def warm_up_worker() -> int:
+    """Loads the models of the current pool process ahead of the first job. Returns the process id."""
+    _get_worker_detector()
+    return os.getpid()
+
+
+def analyze_batch_in_worker(conversations: List[Union[str, List[str]]]) -> List[ConflictAnalysis]:
+    """Runs analyze_batch on the detector owned by the current pool process."""
+    return _get_worker_detector().analyze_batch(conversations)
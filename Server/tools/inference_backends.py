@@ -0,0 +1,75 @@
+# tools/inference_backends.py
+import os
+import shutil
+
+import torch
+from transformers import AutoModelForSeq2SeqLM, AutoModelForSequenceClassification
+
+# torch:      fp32 PyTorch models (reference)
+# torch-int8: PyTorch models with dynamically quantized int8 Linear layers
+# onnx:       exported ONNX graphs run by ONNX Runtime
+# onnx-int8:  exported ONNX graphs with dynamically quantized int8 weights
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+
+def _onnx_export_dir(model_name: str, onnx_model_dir: str, quantized: bool) -> str:
+    directory = os.path.join(onnx_model_dir, model_name.replace("/", "--"))
+    return directory + "-int8" if quantized else directory
+
+
+def _load_onnx_model(ort_model_class, model_name: str, onnx_model_dir: str, quantized: bool):
+    """
+    Loads an ONNX Runtime model, exporting (and quantizing) it on first use.
+    Exported graphs are cached under onnx_model_dir.
+    """
+    export_dir = _onnx_export_dir(model_name, onnx_model_dir, quantized=False)
+    if not os.path.isdir(export_dir):
+        ort_model_class.from_pretrained(model_name, export=True).save_pretrained(export_dir)
+    if not quantized:
+        return ort_model_class.from_pretrained(export_dir)
+
+    quantized_dir = _onnx_export_dir(model_name, onnx_model_dir, quantized=True)
+    if not os.path.isdir(quantized_dir):
+        from optimum.onnxruntime import ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+        quantization_config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        # Seq2seq models are exported as several graphs (encoder, decoder, ...); quantize each one
+        for file_name in os.listdir(export_dir):
+            if file_name.endswith(".onnx"):
+                quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=file_name)
+                quantizer.quantize(save_dir=quantized_dir, quantization_config=quantization_config, file_suffix="")
+        for file_name in os.listdir(export_dir):
+            if file_name.endswith(".json"):
+                shutil.copy(os.path.join(export_dir, file_name), quantized_dir)
+    return ort_model_class.from_pretrained(quantized_dir)
+
+
+def _load_model(torch_model_class, ort_model_class_name: str, model_name: str, backend: str, onnx_model_dir: str):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'. Expected one of: {', '.join(BACKENDS)}")
+
+    if backend.startswith("onnx"):
+        try:
+            import optimum.onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx backends require 'optimum[onnxruntime]' to be installed.") from e
+        return _load_onnx_model(getattr(ort, ort_model_class_name), model_name, onnx_model_dir,
+                                quantized=backend == "onnx-int8")
+
+    model = torch_model_class.from_pretrained(model_name)
+    model.eval()
+    if backend == "torch-int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def load_translation_model(model_name: str, backend: str = "torch", onnx_model_dir: str = "models/onnx"):
+    """Loads a seq2seq translation model for the given backend."""
+    return _load_model(AutoModelForSeq2SeqLM, "ORTModelForSeq2SeqLM", model_name, backend, onnx_model_dir)
+
+
+def load_sentiment_model(model_name: str, backend: str = "torch", onnx_model_dir: str = "models/onnx"):
+    """Loads a sequence classification model for the given backend."""
+    return _load_model(AutoModelForSequenceClassification, "ORTModelForSequenceClassification",
+                       model_name, backend, onnx_model_dir)
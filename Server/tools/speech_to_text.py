@@ -1,67 +1,422 @@
 # tools/speech_to_text.py
 
+import functools
+import logging
+import os
 import threading
-import azure.cognitiveservices.speech as speech
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
 
+logger = logging.getLogger(__name__)
 
-class SpeechToTextService:
-    def __init__(self, speech_api_key: str, azure_service_region: str, lang: str):
-        self.speech_config = speech.SpeechConfig(
-            subscription=speech_api_key,
-            region=azure_service_region,
-            speech_recognition_language=lang
-        )
+# azure:   Azure Speech service (needs AZURE_SPEECH_API_KEY and AZURE_SERVICE_REGION)
+# whisper: local CPU transcription with faster-whisper
+# local:   offline stand-in that only paces WAV files, for load tests
+ENGINES = ("azure", "whisper", "local")
+
+# 100-nanosecond ticks per second (Azure result offsets and durations)
+TICKS_PER_SECOND = 10_000_000
+
+# Diarization roles: the employee recording the call speaks first
+AGENT_ROLE = "agent"
+CUSTOMER_ROLE = "customer"
+
+
+class TranscriptTurn(NamedTuple):
+    """One recognized utterance: its text, its time in the audio (seconds) and who said it."""
+    text: str
+    start: Optional[float] = None
+    end: Optional[float] = None
+    # Diarization label (e.g. "Guest-1"); None when the engine does not separate speakers
+    speaker: Optional[str] = None
 
-    def speech_to_text_from_file(self, audio_file_path: str, timeout_sec: float = 0.5):
-        """
-        Continuously recognize speech from the entire audio file.
-        Returns (full_text, error_code) where error_code is None on success.
-        """
-        audio_config = speech.audio.AudioConfig(filename=audio_file_path)
-        recognizer = speech.SpeechRecognizer(
-            speech_config=self.speech_config,
-            audio_config=audio_config
-        )
 
-        full_text_chunks = []
-        error_code = None
-        stop_recognition = threading.Event()
+class Transcription(NamedTuple):
+    """Result of a transcription session; error_code is None on success."""
+    text: Optional[str]
+    error_code: Optional[str]
+    turns: List[TranscriptTurn]
+
+
+# (full_text, error_code): error_code is None on success
+TranscriptionResult = Tuple[Optional[str], Optional[str]]
+# Builds a session for one file: factory(audio_file_path, on_turn, on_done). A session has
+# start() (returns once recognition is running) and stop(); it passes each recognized
+# TranscriptTurn to on_turn and calls on_done(error_code or None) when the file is finished,
+# from its own threads.
+SessionFactory = Callable[[str, Callable[[TranscriptTurn], None], Callable[[Optional[str]], None]], object]
+
+
+def assign_speaker_roles(turns: List[TranscriptTurn]) -> List[Optional[str]]:
+    """
+    Maps the anonymous diarization labels of a call to roles: the first speaker is the agent
+    (calls are recorded by the employee's phone, which answers or places the call), every
+    other speaker is a customer. Turns without a speaker get no role.
+    """
+    agent = next((turn.speaker for turn in turns if turn.speaker), None)
+    return [None if not turn.speaker else AGENT_ROLE if turn.speaker == agent else CUSTOMER_ROLE
+            for turn in turns]
+
+
+def _turn_from_result(result, speaker: Optional[str] = None) -> TranscriptTurn:
+    """Builds a turn from an Azure recognition result (offset and duration are in ticks)."""
+    start = result.offset / TICKS_PER_SECOND
+    return TranscriptTurn(result.text.strip(), start, start + result.duration / TICKS_PER_SECOND, speaker)
+
+
+class AzureRecognitionSession:
+    """
+    One continuous recognition of a file with the Azure Speech SDK. The SDK binds a recognizer
+    to its audio input, so each file gets its own recognizer; the SpeechConfig is shared.
+    Recognized phrases are passed to on_turn and the end of the session (or its error) to on_done,
+    both from SDK callback threads.
+    """
+
+    def __init__(self, speech_config, audio_file_path: str, on_turn, on_done):
+        import azure.cognitiveservices.speech as speech
+
+        self._recognizer = speech.SpeechRecognizer(
+            speech_config=speech_config,
+            audio_config=speech.audio.AudioConfig(filename=audio_file_path)
+        )
 
-        # Event handler: when a piece of speech is recognized
         def on_recognized(evt):
             if evt.result.reason == speech.ResultReason.RecognizedSpeech:
-                chunk = evt.result.text.strip()
-                if chunk:
-                    full_text_chunks.append(chunk)
-                    print(f"Chunk recognized: {chunk}")
+                turn = _turn_from_result(evt.result)
+                if turn.text:
+                    on_turn(turn)
+
+        def on_canceled(evt):
+            # A file input ends with a cancellation of reason EndOfStream
+            if evt.reason == speech.CancellationReason.Error:
+                on_done(f"Error: {evt.error_details}")
+            else:
+                on_done(None)
+
+        self._recognizer.recognized.connect(on_recognized)
+        self._recognizer.session_stopped.connect(lambda evt: on_done(None))
+        self._recognizer.canceled.connect(on_canceled)
 
-        # Event handler: session stopped
-        def on_session_stopped(evt):
-            print("Session stopped.")
-            stop_recognition.set()
+    def start(self):
+        self._recognizer.start_continuous_recognition()
+
+    def stop(self):
+        # Blocks until the SDK stopped; never called from an SDK callback thread
+        self._recognizer.stop_continuous_recognition()
+
+
+class AzureConversationSession:
+    """
+    Transcription of a file with speaker diarization (the SDK's ConversationTranscriber): like
+    AzureRecognitionSession, but each phrase is tagged with the speaker who said it.
+    """
+
+    def __init__(self, speech_config, audio_file_path: str, on_turn, on_done):
+        import azure.cognitiveservices.speech as speech
+
+        self._transcriber = speech.transcription.ConversationTranscriber(
+            speech_config=speech_config,
+            audio_config=speech.audio.AudioConfig(filename=audio_file_path)
+        )
+
+        def on_transcribed(evt):
+            if evt.result.reason == speech.ResultReason.RecognizedSpeech:
+                # Phrases the service could not attribute yet are labeled "Unknown"
+                speaker = evt.result.speaker_id if evt.result.speaker_id != "Unknown" else None
+                turn = _turn_from_result(evt.result, speaker)
+                if turn.text:
+                    on_turn(turn)
 
-        # Event handler: canceled/error
         def on_canceled(evt):
-            nonlocal error_code
-            print(f"Recognition canceled: {evt.reason}")
             if evt.reason == speech.CancellationReason.Error:
-                error_code = f"Error: {evt.error_details}"
-                print(f"Error details: {evt.error_details}")
-            stop_recognition.set()
+                on_done(f"Error: {evt.error_details}")
+            else:
+                on_done(None)
+
+        self._transcriber.transcribed.connect(on_transcribed)
+        self._transcriber.session_stopped.connect(lambda evt: on_done(None))
+        self._transcriber.canceled.connect(on_canceled)
+
+    def start(self):
+        self._transcriber.start_transcribing_async().get()
+
+    def stop(self):
+        self._transcriber.stop_transcribing_async().get()
+
+
+class WhisperEngine:
+    """
+    Local CPU transcription with faster-whisper (CTranslate2, int8-quantized weights by default).
+    Recordings are split into speech chunks by voice activity detection (Silero VAD) and the
+    chunks of a file are decoded in batches of batch_size, so a long call is transcribed in
+    parallel instead of as one sequential 30 s window after another. The model is loaded on
+    first use and shared by every session; num_workers sessions can decode at the same time,
+    each with cpu_threads threads.
+    """
+
+    def __init__(self, model: str = "small", compute_type: str = "int8", cpu_threads: int = 0,
+                 num_workers: int = 1, batch_size: int = 8, beam_size: int = 1,
+                 language: Optional[str] = None, download_root: Optional[str] = None):
+        self.model = model
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.num_workers = max(1, num_workers)
+        self.batch_size = max(1, batch_size)
+        self.beam_size = max(1, beam_size)
+        # Whisper takes a bare language code ("en-US" -> "en"); None detects it per file
+        self.language = language.split('-')[0].lower() if language else None
+        self.download_root = download_root
+        self._pipeline = None
+        self._load_lock = threading.Lock()
 
-        # Hook up events
-        recognizer.recognized.connect(on_recognized)
-        recognizer.session_stopped.connect(on_session_stopped)
-        recognizer.canceled.connect(on_canceled)
+    def load(self):
+        """Loads the model (done by the first transcription otherwise) and returns the pipeline."""
+        with self._load_lock:
+            if self._pipeline is None:
+                try:
+                    from faster_whisper import BatchedInferencePipeline, WhisperModel
+                except ImportError as e:
+                    raise ImportError(
+                        "The whisper speech-to-text engine requires 'faster-whisper' to be installed."
+                    ) from e
+                whisper_model = WhisperModel(
+                    self.model, device="cpu", compute_type=self.compute_type, cpu_threads=self.cpu_threads,
+                    num_workers=self.num_workers, download_root=self.download_root
+                )
+                self._pipeline = BatchedInferencePipeline(model=whisper_model)
+                logger.info(f"Loaded Whisper model '{self.model}' ({self.compute_type}).")
+            return self._pipeline
 
-        print(f"Starting continuous recognition on: {audio_file_path}")
-        recognizer.start_continuous_recognition()
+    def transcribe_segments(self, audio_file_path: str) -> Iterator[TranscriptTurn]:
+        """
+        Yields each recognized segment, in order, as the batches are decoded. Decoding stops
+        once the generator is closed. Whisper does not separate speakers.
+        """
+        segments, _ = self.load().transcribe(
+            audio_file_path, language=self.language, batch_size=self.batch_size, beam_size=self.beam_size,
+            vad_filter=True
+        )
+        for segment in segments:
+            text = segment.text.strip()
+            if text:
+                yield TranscriptTurn(text, segment.start, segment.end)
+
+
+class WhisperRecognitionSession:
+    """
+    One file transcribed by a WhisperEngine on its own thread. CTranslate2 can't interrupt a
+    batch being decoded, so stop() ends the session after the current batch and waits for it:
+    a timed-out session keeps its slot (and its CPU) until decoding has actually stopped.
+    """
+
+    def __init__(self, engine: WhisperEngine, audio_file_path: str, on_turn, on_done):
+        self.engine = engine
+        self.audio_file_path = audio_file_path
+        self._on_turn = on_turn
+        self._on_done = on_done
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="WhisperRecognitionSession")
+        self._thread.start()
+
+    def _run(self):
+        segments = self.engine.transcribe_segments(self.audio_file_path)
+        try:
+            for turn in segments:
+                if self._stopped.is_set():
+                    break
+                self._on_turn(turn)
+        except Exception as e:
+            logger.error(f"Whisper transcription of {self.audio_file_path} failed: {e}", exc_info=True)
+            self._on_done(f"Error: {e}")
+            return
+        finally:
+            segments.close()
+        self._on_done(None)
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+class LocalRecognitionSession:
+    """
+    Offline stand-in for AzureRecognitionSession, for load-testing concurrency without the
+    service. It "recognizes" a WAV file by emitting one chunk per chunk_seconds of audio, paced
+    at realtime_factor times the audio duration (1.0 is real time, like Azure). The text is read
+    from a transcript next to the audio (<name>.txt) if there is one. With diarization, the
+    chunks alternate between two speakers.
+    """
+
+    def __init__(self, audio_file_path: str, on_turn, on_done, realtime_factor: float = 1.0,
+                 chunk_seconds: float = 5.0, diarization: bool = False):
+        self.audio_file_path = audio_file_path
+        self.realtime_factor = realtime_factor
+        self.chunk_seconds = chunk_seconds
+        self.diarization = diarization
+        self._on_turn = on_turn
+        self._on_done = on_done
+        self._stopped = threading.Event()
+
+    def start(self):
+        with wave.open(self.audio_file_path, 'rb') as wav:
+            duration = wav.getnframes() / wav.getframerate()
+        transcript_path = os.path.splitext(self.audio_file_path)[0] + '.txt'
+        words = []
+        if os.path.exists(transcript_path):
+            with open(transcript_path, 'r', encoding='utf-8') as f:
+                words = f.read().split()
+        threading.Thread(target=self._run, args=(duration, words), daemon=True,
+                         name="LocalRecognitionSession").start()
+
+    def _run(self, duration: float, words: list):
+        chunks = max(1, int(-(-duration // self.chunk_seconds)))
+        words_per_chunk = -(-len(words) // chunks) if words else 0
+        for i in range(chunks):
+            chunk_duration = min(self.chunk_seconds, duration - i * self.chunk_seconds)
+            if self._stopped.wait(max(0.0, chunk_duration) * self.realtime_factor):
+                break
+            text = " ".join(words[i * words_per_chunk:(i + 1) * words_per_chunk]) if words else f"chunk {i + 1}"
+            if text:
+                start = i * self.chunk_seconds
+                speaker = f"Guest-{i % 2 + 1}" if self.diarization else None
+                self._on_turn(TranscriptTurn(text, start, start + chunk_duration, speaker))
+        self._on_done(None)
+
+    def stop(self):
+        self._stopped.set()
+
+
+def azure_session_factory(speech_api_key: str, azure_service_region: str, lang: str,
+                          diarization: bool = False) -> SessionFactory:
+    import azure.cognitiveservices.speech as speech
+
+    speech_config = speech.SpeechConfig(
+        subscription=speech_api_key,
+        region=azure_service_region,
+        speech_recognition_language=lang
+    )
+    session_class = AzureConversationSession if diarization else AzureRecognitionSession
+    return functools.partial(session_class, speech_config)
+
+
+def whisper_session_factory(engine: WhisperEngine) -> SessionFactory:
+    return functools.partial(WhisperRecognitionSession, engine)
+
+
+def local_session_factory(realtime_factor: float = 1.0, chunk_seconds: float = 5.0,
+                          diarization: bool = False) -> SessionFactory:
+    return functools.partial(LocalRecognitionSession, realtime_factor=realtime_factor, chunk_seconds=chunk_seconds,
+                             diarization=diarization)
+
+
+class SpeechToTextService:
+    """
+    Runs up to max_sessions recognition sessions at a time.
+
+    transcribe() blocks while every session slot is busy (backpressure on the callers) and
+    returns a Future resolved with a Transcription by the recognizer's own completion events.
+    A session that runs longer than session_timeout_seconds is stopped and resolved with a
+    timeout error and the text recognized so far. Sessions are stopped on separate threads,
+    since the SDK must not be stopped from its callback threads; the slot is freed only once
+    the session has stopped, so at most max_sessions are ever running.
+    """
+
+    def __init__(self, session_factory: SessionFactory, max_sessions: int = 4,
+                 session_timeout_seconds: float = 1800.0):
+        self._session_factory = session_factory
+        self.max_sessions = max(1, max_sessions)
+        self.session_timeout_seconds = session_timeout_seconds
+        self._slots = threading.BoundedSemaphore(self.max_sessions)
+        # One closer per slot: a session that takes a while to stop doesn't hold up the others
+        self._closer = ThreadPoolExecutor(max_workers=self.max_sessions, thread_name_prefix="SpeechSessionCloser")
+        self._stats_lock = threading.Lock()
+        self._stats = {"active": 0, "waiting": 0, "completed": 0, "errors": 0, "timeouts": 0}
+
+    def transcribe(self, audio_file_path: str,
+                   callback: Optional[Callable[[Future], None]] = None,
+                   acquire_timeout: Optional[float] = None) -> Future:
+        """
+        Starts recognizing the file once a session slot is free and returns a Future of its
+        Transcription (full text, error code and turns). `callback` is added to the Future and
+        runs on a recognizer thread, so it should be short. Raises TimeoutError if no slot frees
+        up within acquire_timeout.
+        """
+        self._count("waiting", 1)
+        acquired = self._slots.acquire(timeout=acquire_timeout)
+        self._count("waiting", -1)
+        if not acquired:
+            raise TimeoutError(f"No speech recognition session free after {acquire_timeout}s")
+        self._count("active", 1)
+
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        turns = []
+        finished = threading.Lock()
+        session = None
+        timer = None
+
+        def on_turn(turn: TranscriptTurn):
+            logger.debug(f"Turn recognized: {turn}")
+            turns.append(turn)
+
+        def on_done(error_code: Optional[str], timed_out: bool = False):
+            # The first completion event wins (a file ends with both canceled and session_stopped)
+            if not finished.acquire(blocking=False):
+                return
+            if timer is not None:
+                timer.cancel()
+            self._count("timeouts" if timed_out else "errors" if error_code else "completed", 1)
+            self._closer.submit(self._close, session)
+            full_text = " ".join(turn.text for turn in turns).strip() or None
+            future.set_result(Transcription(full_text, error_code, list(turns)))
+
+        try:
+            session = self._session_factory(audio_file_path, on_turn, on_done)
+            timer = threading.Timer(
+                self.session_timeout_seconds, on_done,
+                args=(f"Error: recognition timed out after {self.session_timeout_seconds:.0f}s", True)
+            )
+            timer.daemon = True
+            logger.info(f"Starting continuous recognition on: {audio_file_path}")
+            timer.start()
+            session.start()
+        except Exception as e:
+            if timer is not None:
+                timer.cancel()
+            if finished.acquire(blocking=False):
+                self._count("errors", 1)
+                self._closer.submit(self._close, session)
+                future.set_exception(e)
+        return future
+
+    def speech_to_text_from_file(self, audio_file_path: str) -> TranscriptionResult:
+        """
+        Recognizes the entire audio file and waits for the result.
+        Returns (full_text, error_code) where error_code is None on success.
+        """
+        text, error_code, _ = self.transcribe(audio_file_path).result()
+        return text, error_code
 
-        # Wait until session is stopped or canceled
-        while not stop_recognition.wait(timeout=timeout_sec):
-            pass
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self._stats, max_sessions=self.max_sessions)
 
-        recognizer.stop_continuous_recognition()
+    def _count(self, key: str, delta: int):
+        with self._stats_lock:
+            self._stats[key] += delta
 
-        full_text = " ".join(full_text_chunks).strip() or None
-        return full_text, error_code
+    def _close(self, session):
+        try:
+            if session is not None:
+                session.stop()
+        except Exception as e:
+            logger.warning(f"Could not stop recognition session: {e}")
+        finally:
+            self._count("active", -1)
+            self._slots.release()
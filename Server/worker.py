@@ -0,0 +1,29 @@
+# worker.py
+import logging
+import signal
+import threading
+
+from config import config
+from app.tasks import start_background_tasks, stop_background_tasks
+
+logger = logging.getLogger(__name__)
+
+if __name__ == '__main__':
+    # Standalone analysis worker: claims jobs from the shared analysis_jobs table and runs
+    # transcription, conflict detection and categorization. Run any number of these next to
+    # web processes started with RUN_ANALYSIS_WORKERS=False.
+    log_level = logging.DEBUG if config.DEBUG else logging.INFO
+    logging.basicConfig(level=log_level,
+                        format='%(asctime)s %(levelname)s %(name)s %(threadName)s : %(message)s')
+
+    start_background_tasks()
+    logger.info("Analysis worker started.")
+
+    stop_requested = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_requested.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_requested.set())
+    stop_requested.wait()
+
+    # Finish the jobs this process holds; the rest go back to the queue for the other workers
+    stop_background_tasks(config.SHUTDOWN_DRAIN_SECONDS)
+    logger.info("Analysis worker stopped.")